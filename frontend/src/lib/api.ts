@@ -63,11 +63,14 @@ export const logout = (): void => {
 // API endpoints
 export const endpoints = {
   acometidas: '/acometidas/',
+  catalogos: '/catalogos/',
   descuentos: '/descuentos/',
   dr: '/dr/',
+  importaciones: '/trabajos/importaciones/',
   instalaciones: '/instalaciones/',
   operadores: '/operadores/',
   productos: '/productos/',
   tecnicos: '/tecnicos/',
   tipodeordenes: '/tipodeordenes/',
+  trabajos: '/trabajos/',
 };
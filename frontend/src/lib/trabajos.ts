@@ -0,0 +1,35 @@
+import api, { endpoints } from './api';
+import { Trabajo } from '@/types';
+
+// Sube una planilla (XLSX / CSV) para importarla en segundo plano y espera
+// a que el trabajo termine, informando el avance en cada consulta.
+export const importarArchivo = async (
+  tipo: 'instalaciones' | 'productos',
+  archivo: File,
+  campos: Record<string, string> = {},
+  onAvance?: (trabajo: Trabajo) => void,
+): Promise<Trabajo> => {
+  const formData = new FormData();
+  formData.append('archivo', archivo);
+  formData.append('tipo', tipo);
+  Object.entries(campos).forEach(([nombre, valor]) => formData.append(nombre, valor));
+
+  const response = await api.post(endpoints.importaciones, formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  });
+  let trabajo: Trabajo = response.data;
+  const errores: any[] = [];
+
+  while (trabajo.estado === 'pendiente' || trabajo.estado === 'procesando') {
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+    // Solo se piden los errores que todavía no se recibieron
+    const estado = await api.get(`${endpoints.trabajos}${trabajo.id}/`, {
+      params: { errores_desde: errores.length },
+    });
+    trabajo = estado.data;
+    errores.push(...trabajo.errores);
+    trabajo.errores = errores;
+    onAvance?.(trabajo);
+  }
+  return trabajo;
+};
@@ -1,6 +1,5 @@
 import { useEffect, useState, useRef } from 'react';
 import { Plus, Search, Edit, Trash2, FileDown, Upload, ChevronDown, ChevronRight } from 'lucide-react';
-import * as XLSX from 'xlsx';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Card, CardContent, CardHeader } from '@/components/ui/card';
@@ -25,6 +24,7 @@ import api, { endpoints } from '@/lib/api';
 import { Instalacion, Tecnico, Operador, TipoOrden, Dr, Acometida } from '@/types';
 import { formatCurrency } from '@/lib/utils';
 import { exportToExcel, formatDateForExcel } from '@/lib/exportToExcel';
+import { importarArchivo } from '@/lib/trabajos';
 
 export default function Instalaciones() {
   const [instalaciones, setInstalaciones] = useState<Instalacion[]>([]);
@@ -42,6 +42,7 @@ export default function Instalaciones() {
   const [filterFechaInicio, setFilterFechaInicio] = useState('');
   const [filterFechaFin, setFilterFechaFin] = useState('');
   const [isImporting, setIsImporting] = useState(false);
+  const [importProgress, setImportProgress] = useState('');
   const [currentPage, setCurrentPage] = useState(1);
   const [totalPages, setTotalPages] = useState(1);
   const [totalCount, setTotalCount] = useState(0);
@@ -135,13 +136,10 @@ export default function Instalaciones() {
       console.log('Cargando TODAS las instalaciones con filtros:', filterParams);
       
       // Cargar TODOS los datos (sin paginación) para agrupar correctamente
-      const [instRes, tecRes, opRes, toRes, drRes, acoRes] = await Promise.all([
+      // Los catálogos del formulario llegan juntos en una sola petición
+      const [instRes, catRes] = await Promise.all([
         api.get(endpoints.instalaciones, { params: { ...filterParams, page_size: 50000 } }),
-        api.get(endpoints.tecnicos, { params: { page_size: 1000 } }),
-        api.get(endpoints.operadores, { params: { page_size: 1000 } }),
-        api.get(endpoints.tipodeordenes, { params: { page_size: 1000 } }),
-        api.get(endpoints.dr, { params: { page_size: 1000 } }),
-        api.get(endpoints.acometidas, { params: { page_size: 1000 } }),
+        api.get(endpoints.catalogos),
       ]);
       
       const allInstalaciones = instRes.data.results || [];
@@ -156,11 +154,11 @@ export default function Instalaciones() {
       setTotalCount(allInstalaciones.length);
       // Las páginas se calcularán basadas en grupos, no en instalaciones individuales
       setTotalPages(1); // Se actualizará después de agrupar
-      setTecnicos(tecRes.data.results || tecRes.data || []);
-      setOperadores(opRes.data.results || opRes.data || []);
-      setTiposOrden(toRes.data.results || toRes.data || []);
-      setDrs(drRes.data.results || drRes.data || []);
-      setAcometidas(acoRes.data.results || acoRes.data || []);
+      setTecnicos(catRes.data.tecnicos || []);
+      setOperadores(catRes.data.operadores || []);
+      setTiposOrden(catRes.data.tipodeordenes || []);
+      setDrs(catRes.data.dr || []);
+      setAcometidas(catRes.data.acometidas || []);
     } catch (error) {
       console.error('Error loading data:', error);
       setInstalaciones([]);
@@ -405,268 +403,46 @@ export default function Instalaciones() {
     fileInputRef.current?.click();
   };
 
-  const parseExcelDate = (excelDate: any): string => {
-    if (!excelDate) return '';
-    
-    // Si ya es una fecha en formato string
-    if (typeof excelDate === 'string') {
-      // Intentar parsear diferentes formatos
-      const dateFormats = [
-        /^(\d{1,2})\/(\d{1,2})\/(\d{4})$/, // DD/MM/YYYY
-        /^(\d{4})-(\d{1,2})-(\d{1,2})$/, // YYYY-MM-DD
-      ];
-      
-      for (const format of dateFormats) {
-        const match = excelDate.match(format);
-        if (match) {
-          if (format === dateFormats[0]) {
-            // DD/MM/YYYY
-            const [, day, month, year] = match;
-            return `${year}-${month.padStart(2, '0')}-${day.padStart(2, '0')}`;
-          } else {
-            // YYYY-MM-DD
-            return excelDate;
-          }
-        }
-      }
-    }
-    
-    // Si es un número serial de Excel
-    if (typeof excelDate === 'number') {
-      const date = new Date((excelDate - 25569) * 86400 * 1000);
-      const year = date.getFullYear();
-      const month = String(date.getMonth() + 1).padStart(2, '0');
-      const day = String(date.getDate()).padStart(2, '0');
-      return `${year}-${month}-${day}`;
-    }
-    
-    return '';
-  };
-
-  const findColumnValue = (row: any, possibleNames: string[]): any => {
-    // Buscar el valor en cualquiera de los nombres posibles de columna
-    for (const name of possibleNames) {
-      if (row.hasOwnProperty(name)) {
-        return row[name];
-      }
-      // Buscar sin distinguir mayúsculas/minúsculas
-      const keys = Object.keys(row);
-      const matchingKey = keys.find(key => key.toLowerCase() === name.toLowerCase());
-      if (matchingKey) {
-        return row[matchingKey];
-      }
-    }
-    return null;
-  };
-
   const handleFileUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
     const file = event.target.files?.[0];
     if (!file) return;
 
     setIsImporting(true);
+    setImportProgress('');
 
     try {
-      const data = await file.arrayBuffer();
-      const workbook = XLSX.read(data);
-      const worksheet = workbook.Sheets[workbook.SheetNames[0]];
-      const jsonData = XLSX.utils.sheet_to_json(worksheet);
-
-      console.log('Datos del Excel:', jsonData);
-      console.log('Primera fila:', jsonData[0]);
-      
-      // Mostrar todas las columnas disponibles
-      if (jsonData.length > 0) {
-        const primeraFila = jsonData[0] as Record<string, any>;
-        const columnas = Object.keys(primeraFila);
-        console.log('Columnas disponibles en el Excel:', columnas);
-        console.log('Total de columnas:', columnas.length);
-      }
-
-      if (jsonData.length === 0) {
-        alert('El archivo Excel está vacío o no tiene datos válidos.');
-        setIsImporting(false);
-        return;
-      }
-
-      // Mapear columnas del Excel a campos de instalación
-      const instalacionesData = jsonData.map((row: any, index: number) => {
-        try {
-          // Buscar valores SOLO de las columnas en amarillo que especificaste
-          const clienteValue = findColumnValue(row, ['Cliente', 'cliente', 'CLIENTE']);
-          const numeroOtValue = findColumnValue(row, ['Cod. cliente 1', 'COD. CLIENTE 1', 'Cod cliente 1']);
-          const fechaValue = findColumnValue(row, ['Fecha fin actuación', 'Fecha fin actuacion', 'FECHA FIN ACTUACION']);
-          const tecnicoValue = findColumnValue(row, ['Técnico cumplimentación', 'Tecnico cumplimentacion', 'TECNICO CUMPLIMENTACION']);
-          const serieValue = findColumnValue(row, ['N/S', 'N S', 'NS']);
-          const descripcionValue = findColumnValue(row, ['Descripción', 'Descripcion', 'DESCRIPCION']);
-          const categoriaValue = findColumnValue(row, ['Categoria', 'categoria', 'CATEGORIA', 'Categoría']);
-
-          // Log para debugging - mostrar valores extraídos
-          if (index < 3) {
-            console.log(`Fila ${index + 1} - Valores extraídos:`, {
-              cliente: clienteValue,
-              numeroOt: numeroOtValue,
-              fecha: fechaValue,
-              tecnico: tecnicoValue,
-              serie: serieValue,
-              descripcion: descripcionValue,
-              categoria: categoriaValue
-            });
-          }
-
-          // Buscar operador por nombre
-          const operador = operadores.find(
-            (op) => op.nombre_operador.toLowerCase() === String(clienteValue || '').toLowerCase().trim()
-          );
-
-          // Buscar técnico por nombre
-          // El Excel puede tener formatos como: "84128 - JEISON DUBAN LONDOÑO" o "1. Mauricio Espejo"
-          let tecnicoNombre = String(tecnicoValue || '').trim();
-          
-          // Remover números y guiones al inicio (ej: "84128 - JEISON DUBAN" → "JEISON DUBAN")
-          // o "1. Mauricio Espejo" → "Mauricio Espejo"
-          tecnicoNombre = tecnicoNombre.replace(/^\d+[\.\-\s]+/, '').trim();
-          
-          // Buscar técnico - comparar con nombre completo o buscar por coincidencia parcial
-          let tecnico = tecnicos.find(
-            (tec) => {
-              const nombreCompleto = `${tec.nombre} ${tec.apellido}`.toLowerCase();
-              const nombreExcel = tecnicoNombre.toLowerCase();
-              
-              // Comparación exacta
-              if (nombreCompleto === nombreExcel) return true;
-              
-              // Comparación sin el ID del técnico en el nombre del sistema
-              // Ej: "84128-Jeison Duban Londoño" vs "JEISON DUBAN LONDOÑO"
-              const nombreSinId = tec.nombre.replace(/^\d+[\-\s]+/, '').toLowerCase();
-              const nombreCompletoSinId = `${nombreSinId} ${tec.apellido}`.toLowerCase();
-              if (nombreCompletoSinId === nombreExcel) return true;
-              
-              // Buscar por apellido si el nombre contiene el apellido
-              if (nombreExcel.includes(tec.apellido.toLowerCase())) {
-                return true;
-              }
-              
-              return false;
-            }
-          );
-
-          // Valores por defecto para campos requeridos - buscar "No definido"
-          const defaultDrObj = drs.find(d => d.nombre_dr.toLowerCase().includes('no definido')) || drs[0];
-          const defaultAcometidaObj = acometidas.find(a => a.nombre_acometida.toLowerCase().includes('no definido')) || acometidas[0];
-          
-          const defaultDr = defaultDrObj?.id_dr || 1;
-          const defaultAcometida = defaultAcometidaObj?.id_acometida || 1;
-
-          // Parsear fecha o usar fecha actual si no hay
-          const fechaParsed = parseExcelDate(fechaValue);
-          const fechaFinal = fechaParsed || new Date().toISOString().split('T')[0];
-
-          const instalacionObj = {
-            fecha_instalacion: fechaFinal,                              // Fecha fin actuación → fecha_instalacion
-            id_tecnico: tecnico?.id_unico_tecnico || tecnicos[0]?.id_unico_tecnico,  // Técnico cumplimentación → id_tecnico
-            id_operador: operador?.id_ope || operadores[0]?.id_ope,    // Cliente → id_operador
-            direccion: 'NA',                                            // No viene del Excel, poner NA
-            numero_ot: String(numeroOtValue || 'NA'),                  // Cod. cliente 1 → numero_ot
-            producto_serie: String(serieValue || 'NA'),                // N/S → producto_serie (SOLO este campo)
-            categoria: String(categoriaValue || 'NA'),                 // Categoria → categoria
-            id_dr: defaultDr,
-            serie_dr: '',                                               // serie_dr vacío (no viene del Excel)
-            eq_reutilizado: 'NA',
-            eq_retirado: 'NA',
-            // id_tipo_orden se deja en blanco (null) al importar desde Excel
-            metros_cable: '0',
-            id_acometida: defaultAcometida,
-            observaciones: String(descripcionValue || 'NA'),           // Descripción → observaciones
-            valor_dr: defaultDrObj?.valor_dr || '0',
-            valor_orden: '0',
-            valor_orden_empresa: '0',
-            valor_dr_empresa: defaultDrObj?.valor_dr_empresa || '0',
-          };
-
-          if (index < 3) {
-            console.log(`Instalación generada fila ${index + 1}:`, instalacionObj);
-          }
-
-          return instalacionObj;
-        } catch (error) {
-          console.error(`Error procesando fila ${index + 1}:`, error);
-          return null;
-        }
-      }).filter(inst => inst !== null);
-
-      // Detectar duplicados por número OT para informar al usuario
-      const otMap = new Map<string, any[]>();
-      instalacionesData.forEach((inst: any, index: number) => {
-        const ot = inst.numero_ot;
-        if (!otMap.has(ot)) {
-          otMap.set(ot, []);
-        }
-        otMap.get(ot)!.push({ ...inst, filaOriginal: index + 1 });
-      });
-
-      // Identificar duplicados solo para informar
-      const duplicados: any[] = [];
-      
-      otMap.forEach((instalaciones, ot) => {
-        if (instalaciones.length > 1) {
-          duplicados.push({
-            numero_ot: ot,
-            cantidad: instalaciones.length,
-            instalaciones: instalaciones
-          });
-        }
+      // El archivo se procesa en el servidor (mismo mapeo de columnas que antes)
+      const trabajo = await importarArchivo('instalaciones', file, {}, (t) => {
+        setImportProgress(t.porcentaje !== null ? `${Math.floor(t.porcentaje)}%` : `${t.procesadas} filas`);
       });
 
-      console.log('Total de instalaciones a importar:', instalacionesData.length);
-      console.log('Grupos de duplicados encontrados:', duplicados.length);
-      
-      if (duplicados.length > 0) {
-        console.log('Duplicados encontrados:', duplicados);
-        let mensajeDuplicados = `Se encontraron ${duplicados.length} números de OT duplicados:\n\n`;
-        duplicados.forEach(dup => {
-          mensajeDuplicados += `• OT "${dup.numero_ot}": ${dup.cantidad} veces (filas: ${dup.instalaciones.map((i: any) => i.filaOriginal).join(', ')})\n`;
-        });
-        mensajeDuplicados += `\n\nSe importarán TODAS las instalaciones (${instalacionesData.length} en total).`;
-        mensajeDuplicados += `\nLas duplicadas se agruparán visualmente en el listado.`;
-        
-        alert(mensajeDuplicados);
-      }
-
-      // Importar TODAS las instalaciones, incluyendo duplicadas
-      const validInstalaciones = instalacionesData;
-
-      if (validInstalaciones.length === 0) {
-        alert('No se encontraron instalaciones para importar.');
-        setIsImporting(false);
+      if (trabajo.estado === 'error') {
+        alert(`Error al importar el archivo:\n${trabajo.mensaje}`);
         return;
       }
 
-      // Mostrar datos que se van a enviar
-      console.log('=== DATOS A ENVIAR AL BACKEND ===');
-      console.log('Total de instalaciones:', validInstalaciones.length);
-      console.log('Primera instalación completa:', validInstalaciones[0]);
-      
-      // Enviar al backend
-      const response = await api.post(endpoints.instalaciones + 'bulk-import/', {
-        instalaciones: validInstalaciones,
-      });
+      const result = trabajo.resultado;
+      const errores = trabajo.errores;
 
-      const result = response.data;
-      
       let message = `Importación completada:\n`;
       message += `Total procesadas: ${result.total}\n`;
       message += `Creadas exitosamente: ${result.creadas}\n`;
-      
-      if (result.errores && result.errores.length > 0) {
-        message += `\nErrores: ${result.errores.length}\n`;
-        result.errores.slice(0, 5).forEach((error: any) => {
+      if (trabajo.filas_por_segundo) {
+        message += `Velocidad: ${trabajo.filas_por_segundo} filas/s\n`;
+      }
+
+      // Solo se guardan los primeros errores; total_errores los cuenta a todos
+      const totalErrores = trabajo.total_errores ?? errores.length;
+      if (totalErrores > 0) {
+        message += `\nErrores: ${totalErrores}\n`;
+        errores.slice(0, 5).forEach((error: any) => {
           message += `- Fila ${error.fila}: ${error.error || JSON.stringify(error.errores)}\n`;
         });
-        if (result.errores.length > 5) {
-          message += `... y ${result.errores.length - 5} errores más\n`;
+        if (totalErrores > 5) {
+          message += `... y ${totalErrores - 5} errores más\n`;
         }
       }
-      
+
       alert(message);
       loadData();
     } catch (error: any) {
@@ -753,7 +529,7 @@ export default function Instalaciones() {
           <input
             ref={fileInputRef}
             type="file"
-            accept=".xlsx,.xls"
+            accept=".xlsx,.xls,.csv"
             onChange={handleFileUpload}
             style={{ display: 'none' }}
           />
@@ -764,7 +540,7 @@ export default function Instalaciones() {
             disabled={isImporting}
           >
             <Upload className="h-4 w-4" />
-            {isImporting ? 'Importando...' : 'Importar Excel'}
+            {isImporting ? `Importando... ${importProgress}` : 'Importar Excel'}
           </Button>
           <Button onClick={handleExportToExcel} variant="outline" className="gap-2">
             <FileDown className="h-4 w-4" />
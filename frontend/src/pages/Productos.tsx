@@ -8,7 +8,6 @@ import {
   Package,
   Upload,
 } from "lucide-react";
-import * as XLSX from "xlsx";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Card, CardContent, CardHeader } from "@/components/ui/card";
@@ -32,6 +31,7 @@ import { Pagination } from "@/components/ui/pagination";
 import api, { endpoints } from "@/lib/api";
 import { Producto, Tecnico, Operador } from "@/types";
 import { exportToExcel, formatDateForExcel } from "@/lib/exportToExcel";
+import { importarArchivo } from "@/lib/trabajos";
 
 export default function Productos() {
   const [productos, setProductos] = useState<Producto[]>([]);
@@ -43,6 +43,7 @@ export default function Productos() {
   const [editingItem, setEditingItem] = useState<Producto | null>(null);
   const [loading, setLoading] = useState(true);
   const [importing, setImporting] = useState(false);
+  const [importProgress, setImportProgress] = useState("");
   const [isImportDialogOpen, setIsImportDialogOpen] = useState(false);
   const [selectedOperador, setSelectedOperador] = useState("");
   const [currentPage, setCurrentPage] = useState(1);
@@ -202,81 +203,54 @@ export default function Productos() {
     if (!file || !selectedOperador) return;
 
     setImporting(true);
+    setImportProgress("");
     try {
-      const data = await file.arrayBuffer();
-      const workbook = XLSX.read(data);
-      const worksheet = workbook.Sheets[workbook.SheetNames[0]];
-      const jsonData = XLSX.utils.sheet_to_json(worksheet) as any[];
-
-      // Buscar o crear técnico "Stock"
-      let tecnicoStock = tecnicos.find(
+      // El archivo se procesa en el servidor: los productos quedan asignados al
+      // técnico "Stock" (se crea si no existe) y al operador seleccionado
+      const trabajo = await importarArchivo(
+        "productos",
+        file,
+        { id_operador: selectedOperador },
         (t) =>
-          t.nombre.toLowerCase() === "stock" ||
-          (t.nombre.toLowerCase() === "stock" &&
-            t.apellido.toLowerCase() === "stock"),
+          setImportProgress(
+            t.porcentaje !== null
+              ? `${Math.floor(t.porcentaje)}%`
+              : `${t.procesadas} filas`,
+          ),
       );
 
-      let idTecnicoStock: number;
-
-      if (!tecnicoStock) {
-        // Crear técnico Stock si no existe
-        try {
-          const response = await api.post(endpoints.tecnicos, {
-            nombre: "Stock",
-            apellido: "Stock",
-            id_tecnico: "STOCK001",
-          });
-          idTecnicoStock = response.data.id_unico_tecnico;
-        } catch (error) {
-          console.error("Error creando técnico Stock:", error);
-          alert(
-            "Error al crear el técnico Stock. Por favor, créalo manualmente.",
-          );
-          setImporting(false);
-          return;
-        }
-      } else {
-        idTecnicoStock = tecnicoStock.id_unico_tecnico;
+      if (trabajo.estado === "error") {
+        alert(`Error al importar el archivo:\n${trabajo.mensaje}`);
+        return;
       }
 
-      // Fecha actual en formato YYYY-MM-DD
-      const fechaActual = new Date().toISOString().split("T")[0];
+      const result = trabajo.resultado;
+      let message = `Importación completada:\n`;
+      message += `✓ ${result.creados} productos creados\n`;
+      message += `✓ ${result.actualizados} productos actualizados\n`;
+      message += `✗ ${result.duplicados} series repetidas en el archivo\n`;
+      message += `✗ ${result.invalidos} filas inválidas\n`;
 
-      // Mapear y crear productos con el operador seleccionado
-      const productosImportados = jsonData.map((row) => ({
-        categoria: row["Categoria"] || row["Categoría"] || "",
-        nombre_producto: row["Descripcion"] || row["Descripción"] || "",
-        producto_serie:
-          row["Nº serie"] || row["Nu serie"] || row["N° serie"] || "",
-        cantidad: parseInt(row["Cantidad"] || "0"),
-        id_tecnico: idTecnicoStock,
-        id_operador: parseInt(selectedOperador),
-        fecha_asignacion: fechaActual,
-      }));
-
-      // Enviar productos al backend
-      let exitosos = 0;
-      let fallidos = 0;
-
-      for (const producto of productosImportados) {
-        try {
-          await api.post(endpoints.productos, producto);
-          exitosos++;
-        } catch (error) {
-          console.error("Error importando producto:", producto, error);
-          fallidos++;
-        }
+      const invalidas = trabajo.errores.filter(
+        (fila: any) => fila.estado === "invalido",
+      );
+      invalidas.slice(0, 5).forEach((fila: any) => {
+        message += `- Fila ${fila.fila}: ${fila.error || JSON.stringify(fila.errores)}\n`;
+      });
+      if (invalidas.length > 5) {
+        message += `... y ${invalidas.length - 5} filas inválidas más\n`;
       }
 
-      alert(
-        `Importación completada:\n✓ ${exitosos} productos importados\n✗ ${fallidos} productos fallidos`,
-      );
+      alert(message);
       setIsImportDialogOpen(false);
       setSelectedOperador("");
       loadData();
-    } catch (error) {
+    } catch (error: any) {
       console.error("Error procesando archivo Excel:", error);
-      alert("Error al procesar el archivo Excel. Verifica el formato.");
+      alert(
+        error.response?.data?.error ||
+          "Error al procesar el archivo Excel. Verifica el formato.",
+      );
     } finally {
       setImporting(false);
       if (fileInputRef.current) {
@@ -312,12 +286,12 @@ export default function Productos() {
             disabled={importing}
           >
             <Upload className="h-4 w-4" />
-            {importing ? "Importando..." : "Importar Excel"}
+            {importing ? `Importando... ${importProgress}` : "Importar Excel"}
           </Button>
           <input
             ref={fileInputRef}
             type="file"
-            accept=".xlsx,.xls"
+            accept=".xlsx,.xls,.csv"
             onChange={handleImportExcel}
             className="hidden"
           />
@@ -80,7 +80,11 @@ export default function TiposOrden() {
   const handleDelete = async (id: number) => {
     if (window.confirm('¿Está seguro de eliminar este tipo de orden?')) {
       try {
-        await api.delete(`${endpoints.tipodeordenes}${id}/`);
+        const response = await api.delete(`${endpoints.tipodeordenes}${id}/`);
+        if (response.status === 202) {
+          // Con muchas instalaciones, el servidor lo elimina en segundo plano
+          alert('El tipo de orden tiene muchas instalaciones: se eliminará en unos minutos.');
+        }
         loadData();
       } catch (error) {
         console.error('Error deleting tipo de orden:', error);
@@ -77,3 +77,22 @@ export interface TipoOrden {
   valor_orden: string;
   valor_orden_empresa: string;
 }
+
+export interface Trabajo {
+  id: number;
+  tipo: string;
+  estado: 'pendiente' | 'procesando' | 'terminado' | 'error';
+  nombre_archivo: string;
+  total: number | null;
+  procesadas: number;
+  porcentaje: number | null;
+  filas_por_segundo: number | null;
+  resultado: Record<string, any>;
+  errores: any[];
+  total_errores?: number;
+  mensaje: string;
+  creado_en: string;
+  iniciado_en: string | null;
+  actualizado_en: string | null;
+  terminado_en: string | null;
+}
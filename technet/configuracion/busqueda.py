@@ -0,0 +1,75 @@
+"""
+Búsqueda para los listados grandes (instalaciones y productos).
+
+Mantiene la semántica de SearchFilter (icontains sobre search_fields, AND
+entre términos) para que SQLite y las bases de prueba funcionen igual; en
+PostgreSQL esas condiciones las resuelven los índices GIN pg_trgm de la
+migración 0005 y los resultados se ordenan por relevancia.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from rest_framework import filters
+
+# Un único término sin espacios y con algún dígito se trata como OT / serie
+PATRON_CODIGO = re.compile(r'^(?=.*\d)[\w\-./]+$')
+
+
+class BusquedaIndexadaFilter(filters.SearchFilter):
+    """
+    SearchFilter con dos añadidos configurables desde la vista:
+
+    - search_prefix_fields: columnas de código (numero_ot, producto_serie).
+      Con un único término con forma de código, entre los resultados de la
+      búsqueda normal van primero los que lo tienen exacto en una de esas
+      columnas y después los que empiezan por él (busqueda_exacta 0 / 1 / 2).
+    - search_rank_fields: columnas usadas para ordenar por similitud
+      trigram en PostgreSQL (por defecto, las de search_fields).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terminos = self.get_search_terms(request)
+        if not terminos:
+            return queryset
+
+        orden = list(queryset.query.order_by)
+        queryset = super().filter_queryset(request, queryset, view)
+        criterios = []
+
+        campos_prefijo = getattr(view, 'search_prefix_fields', ())
+        if campos_prefijo and len(terminos) == 1 and PATRON_CODIGO.match(terminos[0]):
+            termino = terminos[0]
+            queryset = queryset.annotate(
+                busqueda_exacta=Case(
+                    When(self._cualquiera(campos_prefijo, 'iexact', termino), then=Value(0)),
+                    When(self._cualquiera(campos_prefijo, 'istartswith', termino), then=Value(1)),
+                    default=Value(2),
+                    output_field=IntegerField(),
+                )
+            )
+            criterios.append('busqueda_exacta')
+
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import TrigramWordSimilarity
+
+            campos = getattr(view, 'search_rank_fields', None) or [
+                campo.lstrip('^=@$') for campo in self.get_search_fields(view, request)
+            ]
+            texto = ' '.join(terminos)
+            similitudes = [TrigramWordSimilarity(Value(texto), F(campo)) for campo in campos]
+            relevancia = Greatest(*similitudes) if len(similitudes) > 1 else similitudes[0]
+            queryset = queryset.annotate(relevancia=relevancia)
+            criterios.append('-relevancia')
+
+        if criterios:
+            queryset = queryset.order_by(*criterios, *orden)
+        return queryset
+
+    @staticmethod
+    def _cualquiera(campos, lookup, valor):
+        filtro = Q()
+        for campo in campos:
+            filtro |= Q(**{f'{campo}__{lookup}': valor})
+        return filtro
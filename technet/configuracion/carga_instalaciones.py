@@ -0,0 +1,342 @@
+"""
+Carga masiva de instalaciones históricas desde CSV (comando
+cargar_instalaciones), pensada para migraciones de millones de filas.
+
+1. El archivo se divide en bloques de bytes alineados a inicio de línea.
+2. Un pool de procesos parsea cada bloque: traduce los códigos de técnico
+   y los nombres de operador, DR y acometida a sus ids con diccionarios
+   cargados una sola vez, valida fecha, OT y metros, y carga las filas
+   válidas con COPY en una tabla de paso UNLOGGED (cada proceso con su
+   propia conexión).
+3. Una sola sentencia pasa la tabla de paso a instalaciones: crea los
+   productos que faltan, inserta las instalaciones y marca como
+   rechazadas las filas cuyo numero_ot ya existe o se repite en el
+   archivo (se conserva la primera). Si falla, no se inserta nada.
+
+Los campos con saltos de línea entre comillas no se admiten: un bloque
+puede empezar en medio de ellos.
+
+Este módulo se importa en los procesos del pool antes de django.setup()
+(arranque "spawn"), por eso los modelos se importan dentro de las funciones.
+"""
+import csv
+import datetime
+import io
+import os
+import re
+from decimal import Decimal, InvalidOperation
+
+import django
+from django.db import connection
+
+# Columnas de la tabla de paso, en el orden del COPY
+COLUMNAS_CARGA = (
+    'bloque', 'fila', 'fecha_instalacion', 'id_tecnico', 'id_operador', 'direccion',
+    'numero_ot', 'producto_serie', 'id_dr', 'eq_reutilizado', 'eq_retirado',
+    'metros_cable', 'id_acometida', 'observaciones', 'valor_dr', 'valor_dr_empresa',
+    'serie_dr', 'categoria',
+)
+
+# Columnas del CSV: las de instalaciones, con el código del técnico y los
+# nombres de operador, DR y acometida en lugar de sus ids
+OBLIGATORIAS = ('fecha_instalacion', 'tecnico', 'operador', 'numero_ot', 'producto_serie')
+OPCIONALES = (
+    'direccion', 'dr', 'acometida', 'metros_cable', 'eq_reutilizado', 'eq_retirado',
+    'observaciones', 'valor_dr', 'valor_dr_empresa', 'serie_dr', 'categoria',
+)
+
+_FECHA_DMY = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+_FECHA_ISO = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+
+# Estado de cada proceso del pool (ver iniciar_proceso)
+_contexto = {}
+
+
+def bloques(ruta, tamano):
+    """[(inicio, fin)] en bytes de los datos, cortados al final de una línea."""
+    total = os.path.getsize(ruta)
+    with open(ruta, 'rb') as archivo:
+        archivo.readline()  # encabezados
+        inicio = archivo.tell()
+        rangos = []
+        while inicio < total:
+            archivo.seek(min(inicio + tamano, total))
+            if archivo.tell() < total:
+                archivo.readline()
+            fin = archivo.tell()
+            rangos.append((inicio, fin))
+            inicio = fin
+    return rangos
+
+
+def encabezados(ruta, codificacion, delimitador):
+    """Nombres de las columnas del CSV, en minúsculas."""
+    with open(ruta, encoding=codificacion, newline='') as archivo:
+        fila = next(csv.reader(archivo, delimiter=delimitador), [])
+    return [columna.strip().lstrip('\ufeff').lower() for columna in fila]
+
+
+def referencias():
+    """Diccionarios código/nombre -> id de los catálogos, para los procesos del pool."""
+    from . import models
+
+    def por_nombre(filas):
+        diccionario = {}
+        for clave, valor in filas:
+            diccionario.setdefault(clave.strip().lower(), valor)
+        return diccionario
+
+    drs = por_nombre(
+        (dr.nombre_dr, (dr.id_dr, str(dr.valor_dr), str(dr.valor_dr_empresa)))
+        for dr in models.Dr.objects.order_by('id_dr')
+    )
+    acometidas = por_nombre(
+        models.Acometidas.objects.order_by('id_acometida').values_list('nombre_acometida', 'id_acometida')
+    )
+    return {
+        'tecnicos': {
+            codigo.strip(): pk
+            for codigo, pk in models.Tecnicos.objects.values_list('id_tecnico', 'id_unico_tecnico')
+        },
+        'operadores': por_nombre(
+            models.Operadores.objects.order_by('id_ope').values_list('nombre_operador', 'id_ope')
+        ),
+        'drs': drs,
+        'acometidas': acometidas,
+        # Para filas sin DR / acometida: el "No definido" de cada tabla
+        'dr_defecto': next((v for k, v in drs.items() if 'no definido' in k), next(iter(drs.values()), None)),
+        'acometida_defecto': next(
+            (v for k, v in acometidas.items() if 'no definido' in k), next(iter(acometidas.values()), None)
+        ),
+    }
+
+
+def crear_tabla(tabla):
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE UNLOGGED TABLE {tabla} (
+                bloque integer NOT NULL,
+                fila integer NOT NULL,
+                fecha_instalacion date NOT NULL,
+                id_tecnico integer NOT NULL,
+                id_operador integer NOT NULL,
+                direccion text NOT NULL,
+                numero_ot varchar(50) NOT NULL,
+                producto_serie varchar(100) NOT NULL,
+                id_dr integer NOT NULL,
+                eq_reutilizado varchar,
+                eq_retirado varchar,
+                metros_cable numeric(10, 2) NOT NULL,
+                id_acometida integer NOT NULL,
+                observaciones text,
+                valor_dr numeric(10, 2) NOT NULL,
+                valor_dr_empresa numeric(10, 2) NOT NULL,
+                serie_dr varchar,
+                categoria varchar,
+                motivo text
+            )
+        """)
+
+
+def eliminar_tabla(tabla):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {tabla}')
+
+
+def iniciar_proceso(contexto):
+    """Inicializador de cada proceso del pool."""
+    django.setup()
+    _contexto.update(contexto)
+
+
+def procesar_bloque(numero, inicio, fin):
+    """
+    Parsea el bloque `numero` (bytes inicio..fin) y carga sus filas válidas
+    en la tabla de paso. Devuelve (numero, líneas, cargadas, rechazos) con
+    los rechazos como [(línea dentro del bloque, motivo)].
+    """
+    with open(_contexto['ruta'], 'rb') as archivo:
+        archivo.seek(inicio)
+        datos = archivo.read(fin - inicio)
+    lineas = datos.count(b'\n') + (0 if datos.endswith(b'\n') else 1)
+    texto = io.StringIO(datos.decode(_contexto['codificacion']), newline='')
+    del datos
+
+    columnas = _contexto['encabezados']
+    salida = io.StringIO()
+    escritor = csv.writer(salida, quoting=csv.QUOTE_ALL)
+    cargadas = 0
+    rechazos = []
+    lector = csv.reader(texto, delimiter=_contexto['delimitador'])
+    for valores in lector:
+        if not any(valores):
+            continue
+        try:
+            escritor.writerow((numero, lector.line_num, *_convertir(dict(zip(columnas, valores)))))
+            cargadas += 1
+        except ValueError as e:
+            rechazos.append((lector.line_num, str(e)))
+
+    if cargadas:
+        salida.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {_contexto['tabla']} ({', '.join(COLUMNAS_CARGA)}) FROM STDIN WITH (FORMAT csv)",
+                salida,
+            )
+    return numero, lineas, cargadas, rechazos
+
+
+def _texto(fila, columna, defecto=''):
+    valor = (fila.get(columna) or '').strip()
+    return valor or defecto
+
+
+def _fecha(valor):
+    coincidencia = _FECHA_ISO.fullmatch(valor)
+    if coincidencia:
+        anio, mes, dia = coincidencia.groups()
+    else:
+        coincidencia = _FECHA_DMY.fullmatch(valor)
+        if not coincidencia:
+            raise ValueError(f'Fecha inválida: {valor!r}')
+        dia, mes, anio = coincidencia.groups()
+    try:
+        return datetime.date(int(anio), int(mes), int(dia)).isoformat()
+    except ValueError:
+        raise ValueError(f'Fecha inválida: {valor!r}') from None
+
+
+def _decimal(valor, columna):
+    try:
+        numero = Decimal(valor.replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f'{columna} inválido: {valor!r}') from None
+    if not numero.is_finite() or abs(numero) >= 10 ** 8:
+        raise ValueError(f'{columna} fuera de rango: {valor!r}')
+    return str(numero)
+
+
+def _convertir(fila):
+    """Valores de una fila del CSV en el orden de COLUMNAS_CARGA (sin bloque ni fila)."""
+    ref = _contexto['referencias']
+    for columna in OBLIGATORIAS:
+        if not _texto(fila, columna):
+            raise ValueError(f'Falta {columna}')
+
+    codigo = _texto(fila, 'tecnico')
+    id_tecnico = ref['tecnicos'].get(codigo)
+    if id_tecnico is None:
+        raise ValueError(f'Técnico desconocido: {codigo}')
+    operador = _texto(fila, 'operador')
+    id_operador = ref['operadores'].get(operador.lower())
+    if id_operador is None:
+        raise ValueError(f'Operador desconocido: {operador}')
+
+    nombre_dr = _texto(fila, 'dr')
+    dr = ref['drs'].get(nombre_dr.lower()) if nombre_dr else ref['dr_defecto']
+    if dr is None:
+        raise ValueError(f'DR desconocido: {nombre_dr}')
+    nombre_acometida = _texto(fila, 'acometida')
+    id_acometida = ref['acometidas'].get(nombre_acometida.lower()) if nombre_acometida else ref['acometida_defecto']
+    if id_acometida is None:
+        raise ValueError(f'Acometida desconocida: {nombre_acometida}')
+
+    numero_ot = _texto(fila, 'numero_ot')
+    if len(numero_ot) > 50:
+        raise ValueError(f'numero_ot demasiado largo: {numero_ot}')
+    serie = _texto(fila, 'producto_serie')
+    if len(serie) > 100:
+        raise ValueError(f'producto_serie demasiado largo: {serie}')
+
+    return (
+        _fecha(_texto(fila, 'fecha_instalacion')),
+        id_tecnico,
+        id_operador,
+        _texto(fila, 'direccion', 'NA'),
+        numero_ot,
+        serie,
+        dr[0],
+        _texto(fila, 'eq_reutilizado'),
+        _texto(fila, 'eq_retirado'),
+        _decimal(_texto(fila, 'metros_cable', '0'), 'metros_cable'),
+        id_acometida,
+        _texto(fila, 'observaciones'),
+        _decimal(_texto(fila, 'valor_dr', dr[1]), 'valor_dr'),
+        _decimal(_texto(fila, 'valor_dr_empresa', dr[2]), 'valor_dr_empresa'),
+        _texto(fila, 'serie_dr'),
+        _texto(fila, 'categoria'),
+    )
+
+
+def fusionar(tabla):
+    """
+    Pasa la tabla de paso a instalaciones en una sola sentencia y marca en
+    `motivo` las filas no insertadas. Devuelve la cantidad de rechazadas.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH numeradas AS (
+                SELECT c.*,
+                       row_number() OVER (PARTITION BY c.numero_ot ORDER BY c.bloque, c.fila) AS orden,
+                       EXISTS (SELECT 1 FROM instalaciones i WHERE i.numero_ot = c.numero_ot) AS existe
+                FROM {tabla} c
+            ),
+            nuevas AS (
+                SELECT * FROM numeradas WHERE orden = 1 AND NOT existe
+            ),
+            productos_creados AS (
+                INSERT INTO productos (categoria, nombre_producto, producto_serie, cantidad,
+                                       id_tecnico, fecha_asignacion)
+                SELECT DISTINCT ON (producto_serie)
+                       COALESCE(NULLIF(categoria, ''), 'NA'), 'Producto Importado', producto_serie, 1,
+                       id_tecnico, fecha_instalacion
+                FROM nuevas
+                ORDER BY producto_serie, bloque, fila
+                ON CONFLICT (producto_serie) DO NOTHING
+            ),
+            insertadas AS (
+                INSERT INTO instalaciones (
+                    fecha_instalacion, id_tecnico, id_operador, direccion, numero_ot,
+                    producto_serie, id_dr, eq_reutilizado, eq_retirado, id_tipo_orden,
+                    metros_cable, id_acometida, observaciones, valor_dr, valor_orden,
+                    valor_orden_empresa, valor_dr_empresa, serie_dr, categoria
+                )
+                SELECT fecha_instalacion, id_tecnico, id_operador, direccion, numero_ot,
+                       producto_serie, id_dr, eq_reutilizado, eq_retirado, NULL,
+                       metros_cable, id_acometida, observaciones, valor_dr, 0,
+                       0, valor_dr_empresa, serie_dr, categoria
+                FROM nuevas
+                ORDER BY bloque, fila
+                ON CONFLICT (numero_ot) DO NOTHING
+                RETURNING numero_ot
+            )
+            UPDATE {tabla} c
+            SET motivo = CASE
+                WHEN n.existe THEN 'numero_ot ' || n.numero_ot || ' ya existe'
+                WHEN n.orden > 1 THEN 'numero_ot ' || n.numero_ot || ' repetido en el archivo'
+                ELSE 'numero_ot ' || n.numero_ot || ' insertado por otra escritura durante la carga'
+            END
+            FROM numeradas n
+            LEFT JOIN insertadas i ON i.numero_ot = n.numero_ot
+            WHERE n.bloque = c.bloque AND n.fila = c.fila
+              AND (i.numero_ot IS NULL OR n.orden > 1)
+        """)
+        return cursor.rowcount
+
+
+def rechazos_fusion(tabla):
+    """Itera (bloque, fila, motivo) de las filas que no se insertaron."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT bloque, fila, motivo FROM {tabla} WHERE motivo IS NOT NULL ORDER BY bloque, fila')
+        while True:
+            filas = cursor.fetchmany(10000)
+            if not filas:
+                break
+            yield from filas
+
+
+def fechas_insertadas(tabla):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT DISTINCT fecha_instalacion FROM {tabla} WHERE motivo IS NULL')
+        return {fila[0] for fila in cursor.fetchall()}
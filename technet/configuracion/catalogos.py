@@ -0,0 +1,116 @@
+"""
+Caché en memoria del proceso de las tablas de referencia pequeñas.
+
+Los serializers de instalaciones y productos resuelven sus FK a técnicos,
+operadores, tipos de orden, DR y acometidas contra esta caché en lugar de
+hacer una consulta por campo. Cada tabla se carga completa la primera vez
+que se pide y se invalida:
+- en PostgreSQL, cuando su versión (configuracion.versiones) cambió desde
+  que se cargó: se compara una vez por petición y por lote de un trabajo
+  (revalidar), así un precio editado o una fila borrada desde otro proceso
+  no se usa en la siguiente escritura;
+- al guardar o borrar una fila por el ORM en este proceso (señales), otra
+  vez al confirmar la transacción;
+- a los CATALOGOS_CACHE_TTL segundos (0 = sin vencimiento), el único
+  límite en otras bases.
+
+Las instancias guardadas son compartidas entre hilos y peticiones; tabla()
+y obtener() devuelven copias, así modificar una (o asignarla a una FK, que
+le agrega caché de relaciones) no altera la caché.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+
+from . import models, versiones
+
+MODELOS = (
+    models.Tecnicos,
+    models.Operadores,
+    models.Tipodeordenes,
+    models.Dr,
+    models.Acometidas,
+)
+
+# modelo -> (cargada_en, versión al cargarla, {pk: instancia})
+_tablas = {}
+_candado = threading.Lock()
+# Versiones leídas en la petición o el lote actual de cada hilo
+_local = threading.local()
+
+
+def _vigente(entrada, version):
+    # Las versiones solo crecen: sirve una carga de la misma versión o posterior
+    if version is not None and (entrada[1] is None or entrada[1] < version):
+        return False
+    ttl = getattr(settings, 'CATALOGOS_CACHE_TTL', 300)
+    return not ttl or time.monotonic() - entrada[0] < ttl
+
+
+def revalidar(**kwargs):
+    """El próximo uso de la caché en este hilo vuelve a comparar las versiones."""
+    _local.versiones = None
+
+
+def _versiones():
+    # {tabla: versión} de los catálogos, leídas una vez desde el último revalidar()
+    if connection.vendor != 'postgresql':
+        return None
+    actuales = getattr(_local, 'versiones', None)
+    if actuales is None:
+        actuales = versiones.obtener([modelo._meta.db_table for modelo in MODELOS])
+        _local.versiones = actuales
+    return actuales
+
+
+def _guardadas(modelo):
+    # {pk: instancia} de la caché, compartido: no se entrega fuera del módulo
+    actuales = _versiones()
+    version = actuales[modelo._meta.db_table] if actuales else None
+    entrada = _tablas.get(modelo)
+    if entrada is not None and _vigente(entrada, version):
+        return entrada[2]
+    with _candado:
+        entrada = _tablas.get(modelo)
+        if entrada is None or not _vigente(entrada, version):
+            # La versión se leyó antes que las filas: si cambian entretanto,
+            # la próxima comparación vuelve a cargar
+            entrada = (time.monotonic(), version, {obj.pk: obj for obj in modelo.objects.all()})
+            _tablas[modelo] = entrada
+    return entrada[2]
+
+
+def tabla(modelo):
+    """{pk: instancia} de un catálogo (copias), desde la caché o cargado de la base."""
+    return {pk: copy.copy(instancia) for pk, instancia in _guardadas(modelo).items()}
+
+
+def obtener(modelo, pk):
+    """Copia de la instancia del catálogo con esa clave; KeyError si no existe."""
+    return copy.copy(_guardadas(modelo)[pk])
+
+
+def invalidar(modelo=None):
+    with _candado:
+        if modelo is None:
+            _tablas.clear()
+        else:
+            _tablas.pop(modelo, None)
+
+
+def _al_escribir(sender, **kwargs):
+    invalidar(sender)
+    # Una carga concurrente antes del commit leería los datos anteriores
+    transaction.on_commit(lambda: invalidar(sender))
+
+
+for _modelo in MODELOS:
+    post_save.connect(_al_escribir, sender=_modelo, dispatch_uid=f'catalogos_{_modelo.__name__}_save')
+    post_delete.connect(_al_escribir, sender=_modelo, dispatch_uid=f'catalogos_{_modelo.__name__}_delete')
+
+request_started.connect(revalidar, dispatch_uid='catalogos_revalidar')
@@ -0,0 +1,177 @@
+"""
+Escritura de instalaciones: el INSERT y el UPDATE que usan el alta y la
+edición por la API y el INSERT por lotes de la importación.
+
+Las sentencias devuelven la fila completa (las columnas del modelo, con las
+generadas total, instalacion_compartida y valor_total_empresa), así la
+respuesta se arma sin volver a leer la instalación: un alta o una edición
+validada es una sola ida y vuelta a la base.
+
+En PostgreSQL las sentencias se preparan (PREPARE) la primera vez que se
+usan en cada conexión y después solo se ejecutan (EXECUTE). Las sentencias
+preparadas no son transaccionales: sobreviven a un ROLLBACK y duran lo que
+la conexión. Por eso devuelven columnas nombradas y no RETURNING *: una
+columna agregada con la conexión abierta cambiaría el resultado del plan
+guardado ("cached plan must not change result type"). En otras bases se
+envía el SQL completo.
+"""
+from django.db import connection
+
+from . import models
+
+# Columnas que se escriben, con su tipo en PostgreSQL
+COLUMNAS = (
+    ('fecha_instalacion', 'date'),
+    ('id_tecnico', 'integer'),
+    ('id_operador', 'integer'),
+    ('direccion', 'text'),
+    ('numero_ot', 'text'),
+    ('producto_serie', 'text'),
+    ('id_dr', 'integer'),
+    ('eq_reutilizado', 'text'),
+    ('eq_retirado', 'text'),
+    ('id_tipo_orden', 'integer'),
+    ('metros_cable', 'numeric'),
+    ('id_acometida', 'integer'),
+    ('observaciones', 'text'),
+    ('valor_dr', 'numeric'),
+    ('valor_orden', 'numeric'),
+    ('valor_orden_empresa', 'numeric'),
+    ('valor_dr_empresa', 'numeric'),
+    ('serie_dr', 'text'),
+    ('categoria', 'text'),
+)
+_NOMBRES = ', '.join(columna for columna, _ in COLUMNAS)
+
+
+def _devueltas():
+    # Las columnas del modelo, las que lee _instancia
+    return ', '.join(campo.column for campo in models.Instalaciones._meta.concrete_fields)
+
+
+def _sql_crear(marcadores):
+    return (
+        f"INSERT INTO instalaciones ({_NOMBRES}) VALUES ({', '.join(marcadores)}) "
+        f"RETURNING {_devueltas()}"
+    )
+
+
+def _sql_actualizar(marcadores):
+    asignaciones = ', '.join(f'{columna} = {m}' for (columna, _), m in zip(COLUMNAS, marcadores))
+    return (
+        f"UPDATE instalaciones SET {asignaciones} WHERE id_instalacion = {marcadores[-1]} "
+        f"RETURNING {_devueltas()}"
+    )
+
+
+def _sql_insertar_varias(marcadores):
+    # Un arreglo por columna: el mismo texto sirve para cualquier cantidad de filas
+    return (
+        f"INSERT INTO instalaciones ({_NOMBRES}) SELECT * FROM unnest({', '.join(marcadores)}) "
+        f"ON CONFLICT (numero_ot) DO NOTHING RETURNING numero_ot"
+    )
+
+
+# nombre -> (armado del SQL, tipos de los parámetros)
+SENTENCIAS = {
+    'instalaciones_crear': (_sql_crear, [tipo for _, tipo in COLUMNAS]),
+    'instalaciones_actualizar': (_sql_actualizar, [tipo for _, tipo in COLUMNAS] + ['integer']),
+    'instalaciones_insertar_varias': (_sql_insertar_varias, [f'{tipo}[]' for _, tipo in COLUMNAS]),
+}
+
+
+def _preparadas():
+    # Nombres ya preparados en la conexión actual de psycopg2; si Django
+    # abrió otra conexión se empieza de cero
+    if getattr(connection, '_instalaciones_conexion', None) is not connection.connection:
+        connection._instalaciones_conexion = connection.connection
+        connection._instalaciones_preparadas = set()
+    return connection._instalaciones_preparadas
+
+
+def _ejecutar(cursor, nombre, parametros):
+    armar, tipos = SENTENCIAS[nombre]
+    if connection.vendor != 'postgresql':
+        cursor.execute(armar(['%s'] * len(tipos)), parametros)
+        return
+    preparadas = _preparadas()
+    if nombre not in preparadas:
+        marcadores = [f'${i}' for i in range(1, len(tipos) + 1)]
+        cursor.execute(f"PREPARE {nombre} ({', '.join(tipos)}) AS {armar(marcadores)}")
+        preparadas.add(nombre)
+    # Con tipo explícito: un arreglo de solo NULL no tiene tipo propio
+    cursor.execute(f"EXECUTE {nombre} ({', '.join(f'%s::{tipo}' for tipo in tipos)})", parametros)
+
+
+def _valor(datos, actual, campo):
+    if campo in datos:
+        valor = datos[campo]
+        if campo == 'producto_serie':
+            # FK a productos.producto_serie, no a su clave primaria
+            return getattr(valor, 'producto_serie', valor)
+        return getattr(valor, 'pk', valor)
+    if actual is not None:
+        return getattr(actual, models.Instalaciones._meta.get_field(campo).attname)
+    return ''
+
+
+def valores_orden(tipo_orden):
+    """(valor_orden, valor_orden_empresa) de una instalación con ese tipo de orden (0 sin tipo)."""
+    if tipo_orden is None:
+        return 0, 0
+    return tipo_orden.valor_orden, tipo_orden.valor_orden_empresa
+
+
+def parametros(datos, actual=None):
+    """
+    Valores de COLUMNAS a partir de datos validados (objetos o ids en las
+    FK). En una edición parcial, lo que falta se toma de `actual`.
+    """
+    valores = {columna: _valor(datos, actual, columna) for columna, _ in COLUMNAS}
+    # valor_orden / valor_orden_empresa salen del tipo de orden
+    if 'id_tipo_orden' in datos or actual is None:
+        tipo_orden = datos.get('id_tipo_orden')
+        valores['id_tipo_orden'] = tipo_orden.pk if tipo_orden else None
+        valores['valor_orden'], valores['valor_orden_empresa'] = valores_orden(tipo_orden)
+    return [valores[columna] for columna, _ in COLUMNAS]
+
+
+def _instancia(cursor):
+    fila = cursor.fetchone()
+    if fila is None:
+        raise models.Instalaciones.DoesNotExist('La instalación ya no existe')
+    valores = dict(zip((columna[0] for columna in cursor.description), fila))
+    campos = models.Instalaciones._meta.concrete_fields
+    return models.Instalaciones.from_db(
+        connection.alias, [campo.attname for campo in campos], [valores[campo.column] for campo in campos]
+    )
+
+
+def crear(datos):
+    """Inserta una instalación con los datos validados y la devuelve completa."""
+    with connection.cursor() as cursor:
+        _ejecutar(cursor, 'instalaciones_crear', parametros(datos))
+        return _instancia(cursor)
+
+
+def actualizar(instancia, datos):
+    """Guarda en `instancia` los datos validados (completos o parciales); devuelve la fila nueva."""
+    with connection.cursor() as cursor:
+        _ejecutar(cursor, 'instalaciones_actualizar', [*parametros(datos, instancia), instancia.pk])
+        return _instancia(cursor)
+
+
+def insertar_varias(filas):
+    """Inserta `filas` (datos validados) salvo las de numero_ot ya ocupado; devuelve las OT insertadas."""
+    valores = [parametros(datos) for datos in filas]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            _ejecutar(cursor, 'instalaciones_insertar_varias', [list(columna) for columna in zip(*valores)])
+        else:
+            cursor.execute(
+                f"INSERT INTO instalaciones ({_NOMBRES}) "
+                f"VALUES {', '.join(['(' + ', '.join(['%s'] * len(COLUMNAS)) + ')'] * len(valores))} "
+                f"ON CONFLICT (numero_ot) DO NOTHING RETURNING numero_ot",
+                [valor for fila in valores for valor in fila],
+            )
+        return {fila[0] for fila in cursor.fetchall()}
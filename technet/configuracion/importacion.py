@@ -0,0 +1,689 @@
+"""
+Importación por lotes de instalaciones (instalaciones/bulk-import/) y de
+productos (productos/bulk-import/).
+
+Instalaciones:
+
+En lugar de validar con el serializer e insertar fila por fila, cada lote
+de TAMANO_LOTE filas:
+1. resuelve técnicos, operadores, DR, acometidas y productos referenciados
+   con una consulta IN por tabla;
+2. valida cada fila con los campos del serializer de instalaciones pero
+   sin sus consultas (FK contra lo ya leído, sin UniqueValidator);
+3. asigna a cada fila un numero_ot libre (sufijo _DUPn para las OT
+   repetidas) consultando solo las OT del lote y sus variantes _DUPn;
+4. crea los productos que faltan con un solo INSERT de varias filas;
+5. inserta las instalaciones válidas con un INSERT ... ON CONFLICT
+   (numero_ot) DO NOTHING RETURNING de varias filas (ver
+   escritura_instalaciones), dentro de una transacción por lote. Las filas cuya OT ocupó otra importación
+   concurrente entretanto reciben la siguiente OT libre y se reintentan.
+Si el lote falla en la base, se repite fila por fila con un savepoint por
+fila para reportar qué filas fallaron. Los errores se informan por fila
+con el mismo formato que antes.
+
+Productos: ver ImportadorProductos.
+
+Los mismos importadores procesan, por lotes, las planillas subidas como
+trabajos en segundo plano (importar_archivo_instalaciones / _productos).
+"""
+import csv
+import io
+from collections import Counter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, empty, get_error_detail
+from rest_framework.validators import UniqueValidator
+
+from . import catalogos, escritura_instalaciones, models, planillas, resumenes, serializers, trabajos
+
+TAMANO_LOTE = 1000
+
+# Reintentos de una fila cuyo numero_ot tomó otra importación concurrente
+INTENTOS_NUMERO_OT = 5
+
+# Variantes _DUPn consultadas por cada consulta de prefijo
+OT_POR_CONSULTA = 100
+
+# Campos simples que se validan con el campo del serializer
+CAMPOS_VALIDADOS = (
+    'fecha_instalacion',
+    'direccion',
+    'numero_ot',
+    'eq_reutilizado',
+    'eq_retirado',
+    'metros_cable',
+    'observaciones',
+    'valor_dr',
+    'valor_dr_empresa',
+    'serie_dr',
+    'categoria',
+)
+
+# FK a catálogos: campo -> modelo
+CAMPOS_CATALOGO = {
+    'id_tecnico': models.Tecnicos,
+    'id_operador': models.Operadores,
+    'id_dr': models.Dr,
+    'id_acometida': models.Acometidas,
+}
+
+class ImportadorInstalaciones:
+    tamano_lote = TAMANO_LOTE
+
+    def __init__(self):
+        campos = serializers.InstalacionesSerializers().fields
+        self.campos = {}
+        for nombre in CAMPOS_VALIDADOS:
+            campo = campos[nombre]
+            # La unicidad de numero_ot se resuelve con el sufijo _DUPn, sin consultar por fila
+            campo.validators = [v for v in campo.validators if not isinstance(v, UniqueValidator)]
+            self.campos[nombre] = campo
+        self.campos_catalogo = {nombre: campos[nombre] for nombre in CAMPOS_CATALOGO}
+        self.campo_serie = campos['producto_serie']
+
+        self.tecnico_default = models.Tecnicos.objects.first()
+        self.creadas = 0
+        self.errores = []
+
+    def importar(self, filas):
+        """Importa todas las filas y devuelve {'creadas', 'errores', 'total'}."""
+        for inicio in range(0, len(filas), self.tamano_lote):
+            self.importar_lote(filas[inicio:inicio + self.tamano_lote], inicio)
+        return self.terminar(len(filas))
+
+    def terminar(self, total):
+        """Resultado de la importación (cada lote ya refrescó sus resúmenes)."""
+        self.errores.sort(key=lambda error: error['fila'])
+        return {'creadas': self.creadas, 'errores': self.errores, 'total': total}
+
+    def validar(self, filas):
+        """
+        Simulacro (dry_run): valida todas las filas igual que importar(), sin
+        escribir nada, y devuelve el informe de cada fila con sus errores y
+        avisos (OT que recibirá sufijo _DUPn, producto que se creará, serie
+        ya asignada a otra instalación o repetida en el archivo).
+        """
+        informe = []
+        validas = []
+        nuevas = set()
+        for inicio in range(0, len(filas), self.tamano_lote):
+            lote = filas[inicio:inicio + self.tamano_lote]
+            referencias = self._cargar_referencias(lote)
+            for i, fila in enumerate(lote):
+                numero = inicio + i + 1
+                try:
+                    datos, errores = self._validar(fila, referencias)
+                except Exception as e:
+                    informe.append({'fila': numero, 'estado': 'invalida', 'error': str(e)})
+                    continue
+                if errores:
+                    informe.append({'fila': numero, 'estado': 'invalida', 'errores': errores})
+                    continue
+                if datos['producto_serie'] not in referencias['productos']:
+                    nuevas.add(datos['producto_serie'])
+                validas.append((numero, datos))
+
+        # Mismo cálculo de OT que la importación, sobre el archivo completo
+        self._asignar_numeros_ot([datos for _, datos in validas])
+        asignadas = self._series_asignadas({datos['producto_serie'] for _, datos in validas})
+        primera_ot = {}
+        primera_serie = {}
+        for numero, datos in validas:
+            avisos = []
+            base, serie = datos['numero_ot_base'], datos['producto_serie']
+            if datos['numero_ot'] != base:
+                if base in primera_ot:
+                    avisos.append(f"numero_ot {base} repetido en la fila {primera_ot[base]}; "
+                                  f"se importará como {datos['numero_ot']}")
+                else:
+                    avisos.append(f"numero_ot {base} ya existe; se importará como {datos['numero_ot']}")
+            if serie in asignadas:
+                avisos.append(f"La serie {serie} ya está asignada a la instalación {asignadas[serie]}")
+            if serie in primera_serie:
+                avisos.append(f"La serie {serie} también se usa en la fila {primera_serie[serie]}")
+            elif serie in nuevas:
+                avisos.append(f"El producto {serie} no existe; se creará")
+            primera_ot.setdefault(base, numero)
+            primera_serie.setdefault(serie, numero)
+
+            resultado = {'fila': numero, 'estado': 'valida', 'numero_ot': datos['numero_ot']}
+            if avisos:
+                resultado['avisos'] = avisos
+            informe.append(resultado)
+
+        informe.sort(key=lambda resultado: resultado['fila'])
+        return {
+            'dry_run': True,
+            'total': len(filas),
+            'validas': len(validas),
+            'invalidas': len(filas) - len(validas),
+            'filas': informe,
+        }
+
+    @staticmethod
+    def _series_asignadas(series):
+        """{serie: numero_ot} de las series de `series` que ya usa alguna instalación."""
+        series = list(series)
+        asignadas = {}
+        for inicio in range(0, len(series), TAMANO_LOTE):
+            asignadas.update(
+                models.Instalaciones.objects.filter(producto_serie__in=series[inicio:inicio + TAMANO_LOTE])
+                .values_list('producto_serie', 'numero_ot')
+            )
+        return asignadas
+
+    def importar_lote(self, filas, desplazamiento=0, numeros=None):
+        """
+        Importa un lote; `desplazamiento` es el índice de su primera fila en el
+        archivo, o `numeros` el número de cada fila si no son consecutivas.
+        """
+        referencias = self._cargar_referencias(filas)
+        validas = []
+        for i, fila in enumerate(filas):
+            numero = numeros[i] if numeros else desplazamiento + i + 1
+            try:
+                datos, errores = self._validar(fila, referencias)
+            except Exception as e:
+                self.errores.append({'fila': numero, 'error': str(e)})
+                continue
+            if errores:
+                self.errores.append({'fila': numero, 'errores': errores})
+            else:
+                validas.append((numero, datos))
+        if not validas:
+            return
+
+        try:
+            with transaction.atomic():
+                self._asignar_numeros_ot([datos for _, datos in validas])
+                creados = self._crear_productos([datos for _, datos in validas], referencias['productos'])
+                insertadas = self._insertar_con_reintentos(validas)
+                # En la misma transacción que el lote: lo confirmado siempre está en los resúmenes
+                resumenes.refrescar_dias({datos['fecha_instalacion'] for _, datos in insertadas})
+        except DatabaseError:
+            # Algo falló en la base: repetir fila por fila para saber cuáles
+            self._insertar_por_fila(validas, referencias['productos'])
+            return
+        referencias['productos'].update(creados)
+        self.creadas += len(insertadas)
+
+    def _cargar_referencias(self, filas):
+        # Las filas que no son objetos se rechazan luego en _validar
+        filas = [fila for fila in filas if isinstance(fila, dict)]
+        referencias = {}
+        for nombre, modelo in CAMPOS_CATALOGO.items():
+            claves = set()
+            for fila in filas:
+                try:
+                    claves.add(modelo._meta.pk.to_python(fila.get(nombre)))
+                except (DjangoValidationError, TypeError):
+                    pass
+            claves.discard(None)
+            referencias[nombre] = modelo.objects.in_bulk(claves) if claves else {}
+        series = {str(fila.get('producto_serie', 'NA')) for fila in filas if fila.get('producto_serie', 'NA') is not None}
+        referencias['productos'] = set(
+            models.Productos.objects.filter(producto_serie__in=series).values_list('producto_serie', flat=True)
+        )
+        return referencias
+
+    def _validar(self, fila, referencias):
+        datos = {}
+        errores = {}
+        for nombre, campo in self.campos.items():
+            valor = campo.get_value(fila)
+            if nombre == 'numero_ot' and valor is empty:
+                valor = 'NA'
+            try:
+                datos[nombre] = campo.run_validation(valor)
+            except SkipField:
+                pass
+            except ValidationError as exc:
+                errores[nombre] = exc.detail
+            except DjangoValidationError as exc:
+                errores[nombre] = get_error_detail(exc)
+
+        for nombre, campo in self.campos_catalogo.items():
+            valor = fila.get(nombre, empty)
+            if valor is empty or valor == '':
+                errores[nombre] = [campo.error_messages['required']]
+            elif valor is None:
+                errores[nombre] = [campo.error_messages['null']]
+            else:
+                try:
+                    if isinstance(valor, bool):
+                        raise TypeError
+                    pk = CAMPOS_CATALOGO[nombre]._meta.pk.to_python(valor)
+                except (DjangoValidationError, TypeError):
+                    errores[nombre] = [campo.error_messages['incorrect_type'].format(data_type=type(valor).__name__)]
+                    continue
+                objeto = referencias[nombre].get(pk)
+                if objeto is None:
+                    errores[nombre] = [campo.error_messages['does_not_exist'].format(pk_value=valor)]
+                else:
+                    datos[nombre] = objeto
+
+        serie = fila.get('producto_serie', 'NA')
+        if serie is None:
+            errores['producto_serie'] = [self.campo_serie.error_messages['null']]
+        elif str(serie) not in referencias['productos'] and self.tecnico_default is None:
+            # Sin técnicos no se puede crear el producto que falta
+            errores['producto_serie'] = [self.campo_serie.error_messages['does_not_exist'].format(
+                slug_name=self.campo_serie.slug_field, value=serie)]
+        datos['producto_serie'] = str(serie)
+
+        if errores:
+            return None, errores
+        datos['numero_ot_base'] = datos['numero_ot']
+        return datos, None
+
+    @staticmethod
+    def _ocupados(bases, con_variantes):
+        """
+        numero_ot existentes entre `bases` y, para las OT de `con_variantes` o
+        ya existentes, sus variantes _DUPn (índice por prefijo de la migración
+        0005). La memoria crece con el lote, no con la tabla.
+        """
+        instalaciones = models.Instalaciones.objects.values_list('numero_ot', flat=True)
+        bases = list(bases)
+        ocupados = set()
+        for inicio in range(0, len(bases), TAMANO_LOTE):
+            ocupados.update(instalaciones.filter(numero_ot__in=bases[inicio:inicio + TAMANO_LOTE]))
+
+        prefijos = sorted(set(con_variantes) | (ocupados & set(bases)))
+        for inicio in range(0, len(prefijos), OT_POR_CONSULTA):
+            filtro = Q()
+            for numero_ot in prefijos[inicio:inicio + OT_POR_CONSULTA]:
+                filtro |= Q(numero_ot__istartswith=f'{numero_ot}_DUP')
+            ocupados.update(instalaciones.filter(filtro))
+        return ocupados
+
+    def _asignar_numeros_ot(self, filas):
+        """Duplicados de numero_ot: agregar sufijo _DUPn hasta encontrar uno libre."""
+        cantidades = Counter(datos['numero_ot_base'] for datos in filas)
+        ocupados = self._ocupados(
+            cantidades, [numero_ot for numero_ot, cantidad in cantidades.items() if cantidad > 1]
+        )
+        for datos in filas:
+            numero_ot = datos['numero_ot_base']
+            final = numero_ot
+            contador = 1
+            while final in ocupados:
+                final = f"{numero_ot}_DUP{contador}"
+                contador += 1
+            ocupados.add(final)
+            datos['numero_ot'] = final
+
+    def _crear_productos(self, filas, existentes):
+        """Crea los productos de `filas` que no están en `existentes`; devuelve sus series."""
+        nuevos = {}
+        for datos in filas:
+            serie = datos['producto_serie']
+            if serie not in existentes and serie not in nuevos:
+                nuevos[serie] = models.Productos(
+                    categoria=datos.get('categoria') or 'NA',
+                    nombre_producto='Producto Importado',
+                    producto_serie=serie,
+                    cantidad=1,
+                    id_tecnico=self.tecnico_default,
+                    fecha_asignacion=datos['fecha_instalacion'],
+                )
+        if nuevos:
+            models.Productos.objects.bulk_create(nuevos.values())
+        return set(nuevos)
+
+    def _insertar(self, filas):
+        """Inserta las filas salvo las de numero_ot ya ocupado; devuelve las OT insertadas."""
+        return escritura_instalaciones.insertar_varias(filas)
+
+    def _insertar_con_reintentos(self, validas):
+        """
+        Inserta `validas` ([(numero, datos)]); las filas cuya OT tomó otra
+        importación entretanto reciben la siguiente libre y se reintentan.
+        Devuelve las insertadas; las que no se pudieron insertar van a errores.
+        """
+        insertadas = []
+        pendientes = validas
+        for intento in range(INTENTOS_NUMERO_OT):
+            if intento:
+                self._asignar_numeros_ot([datos for _, datos in pendientes])
+            ots = self._insertar([datos for _, datos in pendientes])
+            insertadas.extend(fila for fila in pendientes if fila[1]['numero_ot'] in ots)
+            pendientes = [fila for fila in pendientes if fila[1]['numero_ot'] not in ots]
+            if not pendientes:
+                break
+        for numero, datos in pendientes:
+            self.errores.append({
+                'fila': numero,
+                'error': f"No se encontró un numero_ot libre para {datos['numero_ot_base']}",
+            })
+        return insertadas
+
+    def _insertar_por_fila(self, validas, existentes):
+        # Un savepoint por fila dentro de una transacción para el lote, que
+        # refresca los resúmenes antes de confirmarse
+        creadas = 0
+        fechas = set()
+        with transaction.atomic():
+            for numero, datos in validas:
+                try:
+                    with transaction.atomic():
+                        self._asignar_numeros_ot([datos])
+                        creados = self._crear_productos([datos], existentes)
+                        if not self._insertar_con_reintentos([(numero, datos)]):
+                            # Sin OT libre: tampoco se crea el producto
+                            transaction.set_rollback(True)
+                            continue
+                except Exception as e:
+                    self.errores.append({'fila': numero, 'error': str(e)})
+                    continue
+                existentes.update(creados)
+                creadas += 1
+                fechas.add(datos['fecha_instalacion'])
+            resumenes.refrescar_dias(fechas)
+        self.creadas += creadas
+
+
+# Columnas de productos que escribe la importación, en el orden del COPY
+COLUMNAS_PRODUCTO = (
+    'categoria', 'nombre_producto', 'producto_serie', 'cantidad',
+    'id_tecnico', 'id_operador', 'fecha_asignacion',
+)
+
+CREADO = 'creado'
+ACTUALIZADO = 'actualizado'
+DUPLICADO = 'duplicado'
+INVALIDO = 'invalido'
+
+
+class ImportadorProductos:
+    """
+    Alta / actualización de productos por lotes, con upsert sobre la serie.
+
+    Todas las filas se validan con los campos de ProductosSerializers sin
+    consultas (las FK salen de la caché de catálogos y la unicidad de la
+    serie la resuelve el upsert). Una serie repetida dentro del archivo se
+    importa una sola vez: las repeticiones se informan como duplicadas. Las
+    filas válidas se copian con COPY a una tabla temporal y pasan a
+    productos con un único INSERT ... ON CONFLICT (producto_serie) DO
+    UPDATE, que distingue creados de actualizados por xmax.
+    """
+
+    tamano_lote = TAMANO_LOTE
+
+    def __init__(self):
+        self.serializer = serializers.ProductosSerializers()
+        campo_serie = self.serializer.fields['producto_serie']
+        campo_serie.validators = [v for v in campo_serie.validators if not isinstance(v, UniqueValidator)]
+        self.campos = {nombre: self.serializer.fields[nombre] for nombre in COLUMNAS_PRODUCTO}
+        self.series = {}
+        self.totales = {estado: 0 for estado in (CREADO, ACTUALIZADO, DUPLICADO, INVALIDO)}
+
+    def importar(self, filas):
+        """
+        Importa las filas y devuelve los totales por estado y el resultado de
+        cada fila: {'fila', 'estado', 'producto_serie', 'id_producto' | 'errores'}.
+        """
+        resultados = []
+        for inicio in range(0, len(filas), self.tamano_lote):
+            resultados.extend(self.importar_lote(filas[inicio:inicio + self.tamano_lote], inicio))
+        return dict(self.resumen(len(filas)), filas=resultados)
+
+    def resumen(self, total):
+        return {
+            'total': total,
+            'creados': self.totales[CREADO],
+            'actualizados': self.totales[ACTUALIZADO],
+            'duplicados': self.totales[DUPLICADO],
+            'invalidos': self.totales[INVALIDO],
+        }
+
+    def validar(self, filas):
+        """
+        Simulacro (dry_run): el mismo informe que importar(), con el estado que
+        tendría cada fila, sin escribir nada. Avisa también de las series que
+        ya están asignadas a una instalación.
+        """
+        resultados = []
+        for inicio in range(0, len(filas), self.tamano_lote):
+            lote, validas = self._clasificar(filas[inicio:inicio + self.tamano_lote], inicio)
+            series = list(validas)
+            existentes = set(
+                models.Productos.objects.filter(producto_serie__in=series).values_list('producto_serie', flat=True)
+            )
+            asignadas = dict(
+                models.Instalaciones.objects.filter(producto_serie__in=series)
+                .values_list('producto_serie', 'numero_ot')
+            )
+            for serie, (numero, _) in validas.items():
+                resultado = {
+                    'fila': numero, 'estado': ACTUALIZADO if serie in existentes else CREADO,
+                    'producto_serie': serie,
+                }
+                if serie in asignadas:
+                    resultado['avisos'] = [f'La serie {serie} ya está asignada a la instalación {asignadas[serie]}']
+                lote.append(resultado)
+            resultados.extend(self._contar(lote))
+        return dict(self.resumen(len(filas)), dry_run=True, filas=resultados)
+
+    def _clasificar(self, filas, desplazamiento=0, numeros=None):
+        """Valida un lote; devuelve (resultados de las filas inválidas o
+        duplicadas, {serie: (numero, datos)} de las válidas)."""
+        resultados = []
+        validas = {}
+        for i, fila in enumerate(filas):
+            numero = numeros[i] if numeros else desplazamiento + i + 1
+            datos, errores = self._validar(fila)
+            if errores:
+                resultados.append({'fila': numero, 'estado': INVALIDO, 'errores': errores})
+                continue
+            serie = datos['producto_serie']
+            if serie in self.series:
+                resultados.append({
+                    'fila': numero, 'estado': DUPLICADO, 'producto_serie': serie,
+                    'duplicado_de': self.series[serie],
+                })
+                continue
+            self.series[serie] = numero
+            validas[serie] = (numero, datos)
+        return resultados, validas
+
+    def _contar(self, resultados):
+        resultados.sort(key=lambda resultado: resultado['fila'])
+        for resultado in resultados:
+            self.totales[resultado['estado']] += 1
+        return resultados
+
+    def importar_lote(self, filas, desplazamiento=0, numeros=None):
+        """Importa un lote (numerado como en ImportadorInstalaciones) y devuelve
+        el resultado de cada una de sus filas."""
+        resultados, validas = self._clasificar(filas, desplazamiento, numeros)
+        if validas:
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    guardados = self._upsert_copy(validas)
+                else:
+                    guardados = self._upsert_orm(validas)
+            for serie, (numero, _) in validas.items():
+                id_producto, creado = guardados[serie]
+                resultados.append({
+                    'fila': numero, 'estado': CREADO if creado else ACTUALIZADO,
+                    'producto_serie': serie, 'id_producto': id_producto,
+                })
+        return self._contar(resultados)
+
+    def _validar(self, fila):
+        if not isinstance(fila, dict):
+            return None, {'non_field_errors': ['Se esperaba un objeto por fila.']}
+        datos = {}
+        errores = {}
+        for nombre, campo in self.campos.items():
+            try:
+                datos[nombre] = campo.run_validation(campo.get_value(fila))
+            except SkipField:
+                pass
+            except ValidationError as exc:
+                errores[nombre] = exc.detail
+            except DjangoValidationError as exc:
+                errores[nombre] = get_error_detail(exc)
+        if errores:
+            return None, errores
+        try:
+            datos = self.serializer.validate(datos)
+        except ValidationError as exc:
+            return None, exc.detail
+        return datos, None
+
+    @staticmethod
+    def _valores(datos):
+        return [
+            datos['categoria'],
+            datos['nombre_producto'],
+            datos['producto_serie'],
+            datos['cantidad'],
+            datos['id_tecnico'].pk,
+            datos['id_operador'].pk,
+            datos['fecha_asignacion'].isoformat(),
+        ]
+
+    def _upsert_copy(self, validas):
+        """COPY a una tabla temporal y un INSERT ... ON CONFLICT; {serie: (id, creado)}."""
+        buffer = io.StringIO()
+        # QUOTE_ALL: en CSV un campo vacío sin comillas es NULL
+        escritor = csv.writer(buffer, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        for numero, datos in validas.values():
+            escritor.writerow([numero] + self._valores(datos))
+        buffer.seek(0)
+
+        columnas = ', '.join(COLUMNAS_PRODUCTO)
+        actualizar = ', '.join(
+            f'{columna} = EXCLUDED.{columna}' for columna in COLUMNAS_PRODUCTO if columna != 'producto_serie'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE productos_carga ON COMMIT DROP AS "
+                f"SELECT 0 AS fila, {columnas} FROM productos WITH NO DATA"
+            )
+            cursor.copy_expert(
+                f"COPY productos_carga (fila, {columnas}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            # xmax = 0 solo en las filas recién insertadas
+            cursor.execute(
+                f"INSERT INTO productos ({columnas}) "
+                f"SELECT {columnas} FROM productos_carga ORDER BY fila "
+                f"ON CONFLICT (producto_serie) DO UPDATE SET {actualizar} "
+                f"RETURNING producto_serie, id_producto, (xmax = 0)"
+            )
+            guardados = {serie: (id_producto, creado) for serie, id_producto, creado in cursor.fetchall()}
+            # Dentro de una transacción externa (varios lotes) ON COMMIT DROP no llega entre lote y lote
+            cursor.execute("DROP TABLE productos_carga")
+            return guardados
+
+    def _upsert_orm(self, validas):
+        """Mismo upsert con bulk_create para bases sin COPY."""
+        existentes = set(
+            models.Productos.objects.filter(producto_serie__in=list(validas))
+            .values_list('producto_serie', flat=True)
+        )
+        models.Productos.objects.bulk_create(
+            [models.Productos(**datos) for _, datos in validas.values()],
+            batch_size=TAMANO_LOTE,
+            update_conflicts=True,
+            unique_fields=['producto_serie'],
+            update_fields=[columna for columna in COLUMNAS_PRODUCTO if columna != 'producto_serie'],
+        )
+        ids = dict(
+            models.Productos.objects.filter(producto_serie__in=list(validas))
+            .values_list('producto_serie', 'id_producto')
+        )
+        return {serie: (ids[serie], serie not in existentes) for serie in validas}
+
+
+def _lotes(trabajo, mapear, tamano, desde=0):
+    """
+    Lee el archivo del trabajo y devuelve lotes (numeros, filas, errores):
+    las filas ya mapeadas con su número en el archivo y los errores de las
+    que no se pudieron mapear. Las primeras `desde` filas (ya procesadas
+    por un trabajo que se reanuda) se saltean.
+    """
+    numeros, lote, errores = [], [], []
+    for numero, fila in enumerate(planillas.filas(trabajo.archivo), start=1):
+        if numero <= desde:
+            continue
+        try:
+            lote.append(mapear(fila))
+            numeros.append(numero)
+        except Exception as e:
+            errores.append({'fila': numero, 'error': f'No se pudo leer la fila: {e}'})
+        if len(lote) + len(errores) == tamano:
+            yield numeros, lote, errores
+            numeros, lote, errores = [], [], []
+            # Cada lote valida contra los catálogos vigentes
+            catalogos.revalidar()
+    if lote or errores:
+        yield numeros, lote, errores
+
+
+def importar_archivo_instalaciones(trabajo):
+    """
+    Trabajo 'importar_instalaciones': importa la planilla subida por lotes.
+    Cada lote se confirma junto con el avance del trabajo, así un trabajo
+    reanudado sigue exactamente donde quedó (repetir un lote duplicaría sus
+    instalaciones con sufijo _DUPn).
+    """
+    trabajos.avance(trabajo, total=planillas.contar(trabajo.archivo))
+    importador = ImportadorInstalaciones()
+    mapeo = planillas.MapeoInstalaciones()
+    procesadas = trabajo.procesadas
+    importador.creadas = trabajo.resultado.get('creadas', 0)
+    importador.errores = list(trabajo.errores)
+    omitidos = trabajo.total_errores - len(trabajo.errores)
+    for numeros, lote, errores in _lotes(trabajo, mapeo, importador.tamano_lote, procesadas):
+        with transaction.atomic():
+            previos = len(importador.errores)
+            importador.errores.extend(errores)
+            if lote:
+                importador.importar_lote(lote, numeros=numeros)
+            # Los lotes van en orden: ordenando los errores de cada uno, la lista
+            # guardada solo crece y terminar() no la reordena
+            importador.errores[previos:] = sorted(importador.errores[previos:], key=lambda error: error['fila'])
+            procesadas += len(lote) + len(errores)
+            trabajos.avance(trabajo, omitidos, procesadas=procesadas, errores=importador.errores,
+                            resultado={'creadas': importador.creadas})
+    resultado = importador.terminar(procesadas)
+    trabajos.avance(trabajo, omitidos, errores=resultado.pop('errores'))
+    return resultado
+
+
+def importar_archivo_productos(trabajo):
+    """
+    Trabajo 'importar_productos': importa la planilla subida por lotes. Como
+    errores quedan solo las filas inválidas y duplicadas. Un trabajo
+    reanudado sigue desde el último lote confirmado (los duplicados de
+    series anteriores a la reanudación se vuelven a upsertar).
+    """
+    trabajos.avance(trabajo, total=planillas.contar(trabajo.archivo))
+    importador = ImportadorProductos()
+    mapeo = planillas.MapeoProductos(trabajo.parametros.get('id_operador'))
+    procesadas = trabajo.procesadas
+    for estado, clave in ((CREADO, 'creados'), (ACTUALIZADO, 'actualizados'),
+                          (DUPLICADO, 'duplicados'), (INVALIDO, 'invalidos')):
+        importador.totales[estado] = trabajo.resultado.get(clave, 0)
+    todos_errores = list(trabajo.errores)
+    omitidos = trabajo.total_errores - len(trabajo.errores)
+    for numeros, lote, errores in _lotes(trabajo, mapeo, importador.tamano_lote, procesadas):
+        with transaction.atomic():
+            nuevos = [dict(error, estado=INVALIDO) for error in errores]
+            importador.totales[INVALIDO] += len(errores)
+            if lote:
+                nuevos.extend(
+                    resultado for resultado in importador.importar_lote(lote, numeros=numeros)
+                    if resultado['estado'] in (DUPLICADO, INVALIDO)
+                )
+            todos_errores.extend(sorted(nuevos, key=lambda error: error['fila']))
+            procesadas += len(lote) + len(errores)
+            trabajos.avance(trabajo, omitidos, procesadas=procesadas, errores=todos_errores,
+                            resultado=importador.resumen(procesadas))
+    return importador.resumen(procesadas)
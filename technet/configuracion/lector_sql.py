@@ -0,0 +1,226 @@
+"""
+Lectura en streaming de volcados SQL (pg_dump en texto plano) para el
+comando importar_sql.
+
+LectorSQL recorre el archivo línea a línea, sin cargarlo en memoria, y
+separa las sentencias por ';' respetando:
+- cadenas entre comillas simples, también E'...' con escapes \\;
+- identificadores entre comillas dobles;
+- bloques $$ ... $$ / $etiqueta$ ... $etiqueta$ (DO $$, funciones);
+- comentarios -- y /* */ (anidables).
+Las sentencias COPY ... FROM stdin se entregan con sus datos como un
+archivo que se lee hasta la línea '\\.'. Cada sentencia indica la posición
+en bytes donde termina, para poder reanudar la carga desde ahí.
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+_ESPECIAL = re.compile(r"""[;'"]|--|/\*|\$(?:[^\W\d]\w*)?\$""")
+_ESCAPE_O_COMILLA = re.compile(r"\\.|'", re.S)
+_COMENTARIO_BLOQUE = re.compile(r'/\*|\*/')
+_ESPACIOS = re.compile(r'\s*')
+_COPY = re.compile(r'\ACOPY\b.*\bFROM\s+stdin\b', re.I | re.S)
+_CONFORMING = re.compile(r"\ASET\s+standard_conforming_strings\s*(?:=|TO)\s*'?(on|off)'?", re.I)
+
+
+def sin_comentarios_iniciales(texto):
+    """La sentencia sin los espacios y comentarios (también anidados) del principio."""
+    i = 0
+    while True:
+        i = _ESPACIOS.match(texto, i).end()
+        if texto.startswith('--', i):
+            fin = texto.find('\n', i)
+            i = len(texto) if fin < 0 else fin + 1
+        elif texto.startswith('/*', i):
+            profundidad = 0
+            for m in _COMENTARIO_BLOQUE.finditer(texto, i):
+                profundidad += 1 if m.group() == '/*' else -1
+                if not profundidad:
+                    i = m.end()
+                    break
+            else:
+                return ''
+        else:
+            return texto[i:]
+
+
+@dataclass
+class Sentencia:
+    sql: str
+    linea: int
+    fin: int
+    # Datos de un COPY ... FROM stdin (archivo con read / readline)
+    datos: Optional['DatosCopy'] = None
+    # Metacomando de psql (\connect, \restrict...): no se envía a la base
+    meta: bool = False
+
+
+class DatosCopy:
+    """Líneas de datos de un COPY ... FROM stdin, hasta '\\.', como archivo binario."""
+
+    def __init__(self, lector):
+        self.lector = lector
+        self.terminado = False
+
+    def readline(self, size=-1):
+        if self.terminado:
+            return b''
+        linea = self.lector.archivo.readline()
+        self.lector.posicion += len(linea)
+        self.lector.linea += 1
+        if not linea or linea.rstrip(b'\r\n') == b'\\.':
+            self.terminado = True
+            self.lector.fin = self.lector.posicion
+            self.lector.linea_fin = self.lector.linea
+            return b''
+        return linea
+
+    def read(self, size=-1):
+        partes = []
+        total = 0
+        while size is None or size < 0 or total < size:
+            linea = self.readline()
+            if not linea:
+                break
+            partes.append(linea)
+            total += len(linea)
+        return b''.join(partes)
+
+
+class LectorSQL:
+    """
+    Sentencias de un archivo SQL abierto en binario, desde el byte
+    `posicion` (que debe ser el fin de una sentencia, o 0).
+    """
+
+    def __init__(self, archivo, codificacion='utf-8', posicion=0, linea=1):
+        self.archivo = archivo
+        self.codificacion = codificacion
+        self.posicion = posicion
+        self.linea = linea
+        # Fin de la última sentencia entregada (con sus datos, si es un COPY)
+        # y número de la línea en la que queda esa posición
+        self.fin = posicion
+        self.linea_fin = linea
+        # standard_conforming_strings = off: '\' también escapa en '...'
+        self.escapes = False
+
+    def sentencias(self):
+        self.archivo.seek(self.posicion)
+        partes = []
+        contenido = False
+        linea_inicio = None
+        estado = None
+
+        for crudo in iter(self.archivo.readline, b''):
+            inicio = self.posicion
+            numero = self.linea
+            self.posicion += len(crudo)
+            self.linea += 1
+            linea = crudo.decode(self.codificacion)
+
+            if estado is None and not contenido and linea.startswith('\\'):
+                self.fin = self.posicion
+                self.linea_fin = self.linea
+                partes = []
+                yield Sentencia(linea.strip(), numero, self.fin, meta=True)
+                continue
+
+            desde = 0
+            i = 0
+            n = len(linea)
+            while i < n:
+                if estado is None:
+                    m = _ESPECIAL.search(linea, i)
+                    if m is None:
+                        contenido = contenido or bool(linea[i:].strip())
+                        break
+                    j = m.start()
+                    token = m.group()
+                    contenido = contenido or bool(linea[i:j].strip())
+                    i = m.end()
+                    if token == ';':
+                        texto = ''.join(partes) + linea[desde:j]
+                        partes = []
+                        desde = i
+                        if contenido:
+                            self.fin = inicio + len(linea[:i].encode(self.codificacion))
+                            self.linea_fin = numero
+                            yield from self._entregar(texto, linea_inicio or numero)
+                        contenido = False
+                        linea_inicio = None
+                    elif token == '--':
+                        break
+                    elif token == '/*':
+                        estado = ('/*', 1)
+                    elif token == "'":
+                        contenido = True
+                        e_string = j > 0 and linea[j - 1] in 'eE' and (
+                            j == 1 or not (linea[j - 2].isalnum() or linea[j - 2] in '_$')
+                        )
+                        estado = "E'" if e_string or self.escapes else "'"
+                    elif token == '"':
+                        contenido = True
+                        estado = '"'
+                    elif j > 0 and (linea[j - 1].isalnum() or linea[j - 1] == '_'):
+                        # '$' dentro de un identificador, no abre un bloque
+                        i = j + 1
+                    else:
+                        contenido = True
+                        estado = ('$', token)
+                elif estado in ("'", '"'):
+                    k = linea.find(estado, i)
+                    if k < 0:
+                        break
+                    if linea.startswith(estado, k + 1):
+                        i = k + 2
+                    else:
+                        estado = None
+                        i = k + 1
+                elif estado == "E'":
+                    m = _ESCAPE_O_COMILLA.search(linea, i)
+                    if m is None:
+                        break
+                    i = m.end()
+                    if m.group() == "'":
+                        if linea.startswith("'", i):
+                            i += 1
+                        else:
+                            estado = None
+                elif estado[0] == '$':
+                    k = linea.find(estado[1], i)
+                    if k < 0:
+                        break
+                    i = k + len(estado[1])
+                    estado = None
+                else:
+                    m = _COMENTARIO_BLOQUE.search(linea, i)
+                    if m is None:
+                        break
+                    i = m.end()
+                    profundidad = estado[1] + (1 if m.group() == '/*' else -1)
+                    estado = ('/*', profundidad) if profundidad else None
+
+            partes.append(linea[desde:])
+            if contenido and linea_inicio is None:
+                linea_inicio = numero
+
+        if contenido:
+            self.fin = self.posicion
+            self.linea_fin = self.linea
+            yield from self._entregar(''.join(partes), linea_inicio)
+
+    def _entregar(self, texto, linea):
+        sql = sin_comentarios_iniciales(texto).rstrip()
+        conforming = _CONFORMING.match(sql)
+        if conforming:
+            self.escapes = conforming.group(1).lower() == 'off'
+        if _COPY.match(sql):
+            datos = DatosCopy(self)
+            yield Sentencia(sql, linea, self.fin, datos=datos)
+            # Si no se ejecutó, saltar igual sus datos
+            while datos.readline():
+                pass
+        else:
+            yield Sentencia(sql, linea, self.fin)
@@ -0,0 +1,126 @@
+"""
+Camino de lectura rápido para los listados.
+
+En lugar de construir una instancia del modelo por fila y pasar cada campo
+por su to_representation, los listados leen tuplas con values_list() y las
+convierten con un codificador compilado a partir del serializer. La salida
+es idéntica a serializer.data: mismas claves, mismo orden y mismos textos
+para decimales y fechas. Si el serializer tiene algún campo que el
+codificador no sabe reproducir, la vista sigue por el camino normal.
+"""
+import decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import relations
+from rest_framework import serializers as drf_serializers
+from rest_framework.settings import ISO_8601, api_settings
+
+from .serializers import SerieProductoField
+
+
+class NoSoportado(Exception):
+    pass
+
+
+def _conversor_decimal(campo):
+    if campo.normalize_output or campo.localize or not getattr(
+            campo, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING):
+        raise NoSoportado(campo.field_name)
+    if campo.decimal_places is None:
+        return lambda valor: '{:f}'.format(valor if isinstance(valor, decimal.Decimal) else decimal.Decimal(str(valor)))
+
+    exponente = decimal.Decimal('.1') ** campo.decimal_places
+    contexto = decimal.getcontext().copy()
+    if campo.max_digits is not None:
+        contexto.prec = campo.max_digits
+    redondeo = campo.rounding
+
+    def convertir(valor):
+        if not isinstance(valor, decimal.Decimal):
+            valor = decimal.Decimal(str(valor).strip())
+        return '{:f}'.format(valor.quantize(exponente, rounding=redondeo, context=contexto))
+    return convertir
+
+
+def _conversor_fecha(campo):
+    formato = getattr(campo, 'format', api_settings.DATE_FORMAT)
+    if formato is None or formato.lower() != ISO_8601:
+        raise NoSoportado(campo.field_name)
+    return lambda valor: valor if isinstance(valor, str) else valor.isoformat()
+
+
+def _conversor(campo):
+    """Función valor -> representación, o None si el valor va tal cual."""
+    if isinstance(campo, (relations.PrimaryKeyRelatedField, SerieProductoField)):
+        if getattr(campo, 'pk_field', None) is not None:
+            raise NoSoportado(campo.field_name)
+        return None
+    if isinstance(campo, drf_serializers.DecimalField):
+        return _conversor_decimal(campo)
+    if isinstance(campo, drf_serializers.DateTimeField):
+        raise NoSoportado(campo.field_name)
+    if isinstance(campo, drf_serializers.DateField):
+        return _conversor_fecha(campo)
+    if isinstance(campo, drf_serializers.IntegerField):
+        return int
+    if isinstance(campo, drf_serializers.CharField):
+        return str
+    raise NoSoportado(campo.field_name)
+
+
+class CodificadorFilas:
+    """
+    Codificador tupla -> dict compilado para un serializer (ya filtrado por
+    fields / omit). `columnas` son los nombres a pedir a values_list() y
+    `codificar(fila)` devuelve el mismo dict que serializer.to_representation.
+    """
+
+    def __init__(self, serializer):
+        opts = serializer.Meta.model._meta
+        self.nombres = []
+        self.columnas = []
+        conversores = []
+        for nombre, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+            if '.' in campo.source or campo.source == '*':
+                raise NoSoportado(nombre)
+            try:
+                columna = opts.get_field(campo.source)
+            except FieldDoesNotExist:
+                raise NoSoportado(nombre)
+            if not columna.concrete or columna.many_to_many:
+                raise NoSoportado(nombre)
+            self.nombres.append(nombre)
+            self.columnas.append(columna.name)
+            conversores.append(_conversor(campo))
+        self.codificar = self._compilar(conversores)
+
+    def _compilar(self, conversores):
+        # Genera una función con un literal de diccionario: una sola
+        # llamada por fila, sin bucles ni búsquedas de atributos
+        entorno = {}
+        partes = []
+        for i, (nombre, conversor) in enumerate(zip(self.nombres, conversores)):
+            if conversor is None:
+                partes.append(f'{nombre!r}: f[{i}]')
+            else:
+                entorno[f'c{i}'] = conversor
+                partes.append(f'{nombre!r}: None if f[{i}] is None else c{i}(f[{i}])')
+        codigo = 'def codificar(f):\n    return {' + ', '.join(partes) + '}\n'
+        exec(compile(codigo, '<codificador-filas>', 'exec'), entorno)
+        return entorno['codificar']
+
+
+_codificadores = {}
+
+
+def codificador_para(serializer):
+    """Codificador en caché por clase de serializer y campos; None si no aplica."""
+    clave = (type(serializer), tuple(serializer.fields))
+    if clave not in _codificadores:
+        try:
+            _codificadores[clave] = CodificadorFilas(serializer)
+        except NoSoportado:
+            _codificadores[clave] = None
+    return _codificadores[clave]
@@ -0,0 +1,193 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from configuracion import models
+import json
+import os
+
+# Nodos que recorren más filas que esto sin índice se reportan
+UMBRAL_FILAS = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Ejecuta los endpoints de listado y detalle con filtros representativos, '
+        'pasa su SQL por EXPLAIN (ANALYZE, BUFFERS) y reporta recorridos secuenciales, '
+        'ordenamientos en disco e índices faltantes. Con --base compara contra planes '
+        'conocidos y falla si alguno empeora.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', type=str, help='Archivo JSON con los planes de referencia')
+        parser.add_argument('--guardar', action='store_true',
+                            help='Guarda los planes actuales en --base en lugar de compararlos')
+        parser.add_argument('--tolerancia', type=float, default=2.0,
+                            help='Factor de aumento de coste / buffers permitido (por defecto 2.0)')
+        parser.add_argument('--sin-analyze', action='store_true',
+                            help='Usa EXPLAIN sin ejecutar las consultas')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('analizar_planes requiere PostgreSQL')
+        if options['guardar'] and not options['base']:
+            raise CommandError('--guardar requiere --base')
+
+        planes = {}
+        avisos = 0
+        for nombre, url, params in self._escenarios():
+            consultas = self._capturar(url, params)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{nombre}: {url} {params or ""}'))
+            for i, sql in enumerate(consultas):
+                plan = self._explicar(sql, not options['sin_analyze'])
+                resumen = self._resumir(plan)
+                planes[f'{nombre}#{i}'] = resumen
+                self.stdout.write(
+                    f'  [{i}] coste={resumen["coste"]:.0f} '
+                    f'tiempo={resumen["tiempo"]:.1f}ms buffers={resumen["buffers"]} '
+                    f'nodos={", ".join(resumen["nodos"])}'
+                )
+                for aviso in resumen['avisos']:
+                    avisos += 1
+                    self.stdout.write(self.style.WARNING(f'      ⚠ {aviso}'))
+
+        if options['base'] and options['guardar']:
+            with open(options['base'], 'w', encoding='utf-8') as f:
+                json.dump(planes, f, indent=2, ensure_ascii=False, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f'✅ Planes guardados en {options["base"]}'))
+            return
+
+        if options['base']:
+            regresiones = self._comparar(planes, options['base'], options['tolerancia'])
+            for regresion in regresiones:
+                self.stdout.write(self.style.ERROR(f'❌ {regresion}'))
+            if regresiones:
+                raise CommandError(f'{len(regresiones)} planes empeoraron respecto a {options["base"]}')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Análisis terminado ({avisos} avisos)'))
+
+    def _escenarios(self):
+        """Endpoints a revisar, con filtros tomados de datos reales."""
+        instalacion = models.Instalaciones.objects.order_by('-fecha_instalacion').first()
+        producto = models.Productos.objects.order_by('-fecha_asignacion').first()
+
+        escenarios = [
+            ('instalaciones', '/instalaciones/', {}),
+            ('instalaciones_cursor', '/instalaciones/', {'cursor': ''}),
+            ('productos', '/productos/', {}),
+            ('productos_todos', '/productos/', {'include_assigned': '1'}),
+            ('tecnicos', '/tecnicos/', {}),
+            ('operadores', '/operadores/', {}),
+            ('dr', '/dr/', {}),
+            ('acometidas', '/acometidas/', {}),
+            ('tipodeordenes', '/tipodeordenes/', {}),
+            ('descuentos', '/descuentos/', {}),
+        ]
+        if instalacion:
+            fin = instalacion.fecha_instalacion
+            escenarios += [
+                ('instalaciones_tecnico', '/instalaciones/', {'id_tecnico': instalacion.id_tecnico_id}),
+                ('instalaciones_operador', '/instalaciones/', {'id_operador': instalacion.id_operador_id}),
+                ('instalaciones_fechas', '/instalaciones/', {
+                    'fecha_inicio': fin.replace(day=1).isoformat(),
+                    'fecha_fin': fin.isoformat(),
+                }),
+                ('instalaciones_busqueda_ot', '/instalaciones/', {'search': instalacion.numero_ot}),
+                ('instalaciones_busqueda_texto', '/instalaciones/', {'search': instalacion.direccion[:6]}),
+                ('instalacion_detalle', f'/instalaciones/{instalacion.pk}/', {}),
+            ]
+        if producto:
+            escenarios += [
+                ('productos_tecnico', '/productos/', {'id_tecnico': producto.id_tecnico_id}),
+                ('productos_busqueda', '/productos/', {'search': producto.producto_serie}),
+                ('producto_detalle', f'/productos/{producto.pk}/', {}),
+            ]
+            if producto.id_operador_id:
+                escenarios.append(
+                    ('productos_operador', '/productos/', {'id_operador': producto.id_operador_id})
+                )
+        return escenarios
+
+    def _capturar(self, url, params):
+        # Solo GET: ejecutar el endpoint no modifica datos
+        with override_settings(ALLOWED_HOSTS=['*']), CaptureQueriesContext(connection) as capturadas:
+            respuesta = Client().get(url, params)
+        if respuesta.status_code >= 400:
+            raise CommandError(f'{url} respondió {respuesta.status_code}')
+        return [
+            q['sql'] for q in capturadas.captured_queries
+            if q['sql'].lstrip().upper().startswith('SELECT')
+        ]
+
+    def _explicar(self, sql, analyze):
+        opciones = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN ({opciones}) {sql}')
+            resultado = cursor.fetchone()[0]
+        if isinstance(resultado, str):
+            resultado = json.loads(resultado)
+        return resultado[0]
+
+    def _resumir(self, plan):
+        nodos = []
+        avisos = []
+
+        def recorrer(nodo):
+            tipo = nodo['Node Type']
+            relacion = nodo.get('Relation Name')
+            nodos.append(f'{tipo} on {relacion}' if relacion else tipo)
+
+            filas = nodo.get('Actual Rows', nodo.get('Plan Rows', 0)) * nodo.get('Actual Loops', 1)
+            filas += nodo.get('Rows Removed by Filter', 0)
+            if tipo == 'Seq Scan' and filas >= UMBRAL_FILAS:
+                aviso = f'Recorrido secuencial de {relacion} ({filas:.0f} filas)'
+                if nodo.get('Filter'):
+                    aviso += f'; posible índice faltante para {nodo["Filter"]}'
+                avisos.append(aviso)
+            if tipo == 'Sort' and nodo.get('Sort Space Type') == 'Disk':
+                avisos.append(
+                    f'Ordenamiento en disco ({nodo.get("Sort Space Used")} kB) '
+                    f'por {", ".join(nodo.get("Sort Key", []))}'
+                )
+            for hijo in nodo.get('Plans', []):
+                recorrer(hijo)
+
+        raiz = plan['Plan']
+        recorrer(raiz)
+        return {
+            'nodos': nodos,
+            'coste': raiz['Total Cost'],
+            'tiempo': plan.get('Execution Time', 0.0),
+            'buffers': raiz.get('Shared Hit Blocks', 0) + raiz.get('Shared Read Blocks', 0),
+            'avisos': avisos,
+        }
+
+    def _comparar(self, planes, ruta, tolerancia):
+        if not os.path.exists(ruta):
+            raise CommandError(f'Archivo no encontrado: {ruta}')
+        with open(ruta, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+
+        regresiones = []
+        for clave, actual in planes.items():
+            referencia = base.get(clave)
+            if referencia is None:
+                continue
+            nuevos_seq = [
+                n for n in actual['nodos']
+                if n.startswith('Seq Scan') and n not in referencia['nodos']
+            ]
+            if nuevos_seq:
+                regresiones.append(f'{clave}: nuevo {", ".join(nuevos_seq)}')
+            if any(a.startswith('Ordenamiento en disco') for a in actual['avisos']) and \
+                    not any(a.startswith('Ordenamiento en disco') for a in referencia['avisos']):
+                regresiones.append(f'{clave}: el ordenamiento ahora usa disco')
+            if referencia['coste'] and actual['coste'] > referencia['coste'] * tolerancia:
+                regresiones.append(
+                    f'{clave}: coste {referencia["coste"]:.0f} -> {actual["coste"]:.0f}'
+                )
+            if referencia['buffers'] and actual['buffers'] > referencia['buffers'] * tolerancia:
+                regresiones.append(
+                    f'{clave}: buffers {referencia["buffers"]} -> {actual["buffers"]}'
+                )
+        return regresiones
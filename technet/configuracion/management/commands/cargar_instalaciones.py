@@ -0,0 +1,135 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from configuracion import carga_instalaciones as carga, resumenes
+import csv
+import os
+import time
+
+class Command(BaseCommand):
+    help = (
+        'Carga instalaciones históricas desde un CSV grande: parsea bloques del archivo en '
+        'paralelo, los carga con COPY en una tabla de paso y los pasa a instalaciones en una '
+        'sola sentencia. Columnas: fecha_instalacion, tecnico (código), operador, numero_ot, '
+        'producto_serie y opcionalmente direccion, dr, acometida, metros_cable, eq_reutilizado, '
+        'eq_retirado, observaciones, valor_dr, valor_dr_empresa, serie_dr, categoria'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', type=str, help='Ruta al archivo CSV')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help='Procesos que parsean y cargan bloques (por defecto, uno por CPU)')
+        parser.add_argument('--bloque', type=int, default=32,
+                            help='Tamaño de cada bloque en MB (por defecto 32)')
+        parser.add_argument('--delimitador', default=',', help='Separador de columnas (por defecto ,)')
+        parser.add_argument('--codificacion', default='utf-8',
+                            help='Codificación del archivo (por defecto utf-8)')
+        parser.add_argument('--rechazos', default=None,
+                            help='CSV donde escribir las filas rechazadas (por defecto <archivo>.rechazos.csv)')
+
+    def handle(self, *args, **options):
+        csv_file = options['csv_file']
+
+        if not os.path.exists(csv_file):
+            self.stdout.write(self.style.ERROR(f'Archivo no encontrado: {csv_file}'))
+            return
+
+        encabezados = carga.encabezados(csv_file, options['codificacion'], options['delimitador'])
+        faltantes = [c for c in carga.OBLIGATORIAS if c not in encabezados]
+        if faltantes:
+            self.stdout.write(self.style.ERROR(f'Faltan columnas en el CSV: {", ".join(faltantes)}'))
+            return
+        desconocidas = [c for c in encabezados if c and c not in carga.OBLIGATORIAS + carga.OPCIONALES]
+        if desconocidas:
+            self.stdout.write(self.style.WARNING(f'Se ignoran las columnas: {", ".join(desconocidas)}'))
+
+        tamano = os.path.getsize(csv_file)
+        rangos = carga.bloques(csv_file, max(options['bloque'], 1) * 1024 * 1024)
+        procesos = max(1, min(options['procesos'], len(rangos)))
+        tabla = f'instalaciones_carga_{os.getpid()}'
+        self.inicio = time.monotonic()
+        self.stdout.write(
+            f'Cargando {csv_file} ({tamano / 1e6:.1f} MB) en {len(rangos)} bloques con {procesos} procesos...'
+        )
+
+        carga.crear_tabla(tabla)
+        try:
+            contexto = {
+                'ruta': csv_file,
+                'tabla': tabla,
+                'encabezados': encabezados,
+                'delimitador': options['delimitador'],
+                'codificacion': options['codificacion'],
+                'referencias': carga.referencias(),
+            }
+            resultados = self._cargar_bloques(rangos, procesos, contexto, tamano)
+            cargadas = sum(r[2] for r in resultados.values())
+
+            # Primera línea del archivo de cada bloque (la 1 es la de encabezados)
+            primera_linea = {}
+            linea = 2
+            for numero in sorted(resultados):
+                primera_linea[numero] = linea
+                linea += resultados[numero][1]
+
+            ruta_rechazos = options['rechazos'] or f'{csv_file}.rechazos.csv'
+            with open(ruta_rechazos, 'w', newline='', encoding='utf-8') as archivo:
+                escritor = csv.writer(archivo)
+                escritor.writerow(['linea', 'motivo'])
+                rechazadas = 0
+                for numero in sorted(resultados):
+                    for fila, motivo in resultados[numero][3]:
+                        escritor.writerow([primera_linea[numero] + fila - 1, motivo])
+                        rechazadas += 1
+
+                self.stdout.write(f'Pasando {cargadas} filas a instalaciones...')
+                inicio_fusion = time.monotonic()
+                with transaction.atomic():
+                    rechazadas_fusion = carga.fusionar(tabla)
+                    # En la misma transacción: las instalaciones nunca quedan fuera de los resúmenes
+                    resumenes.refrescar_dias(carga.fechas_insertadas(tabla))
+                for numero, fila, motivo in carga.rechazos_fusion(tabla):
+                    escritor.writerow([primera_linea[numero] + fila - 1, motivo])
+                self.stdout.write(f'Fusión en {time.monotonic() - inicio_fusion:.1f}s')
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'❌ Error: {e}'))
+            self.stdout.write(self.style.ERROR('No se insertó ninguna instalación.'))
+            return
+        finally:
+            carga.eliminar_tabla(tabla)
+
+        insertadas = cargadas - rechazadas_fusion
+        rechazadas += rechazadas_fusion
+        segundos = max(time.monotonic() - self.inicio, 1e-6)
+        mensaje = (
+            f'✅ {insertadas} instalaciones insertadas en {segundos:.1f}s '
+            f'({insertadas / segundos:.0f} filas/s)'
+        )
+        if rechazadas:
+            self.stdout.write(self.style.WARNING(f'{mensaje}; {rechazadas} filas rechazadas (ver {ruta_rechazos})'))
+        else:
+            os.remove(ruta_rechazos)
+            self.stdout.write(self.style.SUCCESS(mensaje))
+
+    def _cargar_bloques(self, rangos, procesos, contexto, tamano):
+        """Parsea y carga los bloques en el pool; devuelve {bloque: resultado}."""
+        # Los procesos abren sus propias conexiones; no deben heredar la de este
+        connections.close_all()
+        resultados = {}
+        leidos = filas = 0
+        with ProcessPoolExecutor(max_workers=procesos, initializer=carga.iniciar_proceso, initargs=(contexto,)) as pool:
+            pendientes = {
+                pool.submit(carga.procesar_bloque, numero, inicio, fin): fin - inicio
+                for numero, (inicio, fin) in enumerate(rangos)
+            }
+            for futuro in as_completed(pendientes):
+                resultado = futuro.result()
+                resultados[resultado[0]] = resultado
+                leidos += pendientes[futuro]
+                filas += resultado[2] + len(resultado[3])
+                segundos = max(time.monotonic() - self.inicio, 1e-6)
+                self.stdout.write(
+                    f'{filas} filas | {leidos / 1e6:.1f}/{tamano / 1e6:.1f} MB '
+                    f'({leidos * 100 / max(tamano, 1):.0f}%) | {filas / segundos:.0f} filas/s'
+                )
+        return resultados
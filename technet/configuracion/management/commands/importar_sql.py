@@ -1,30 +1,142 @@
 from django.core.management.base import BaseCommand
-from django.db import connection
+from django.db import DatabaseError, connection, transaction
+from configuracion.lector_sql import LectorSQL
+import json
 import os
+import re
+import time
+
+# Control de transacciones del volcado: los lotes los maneja el comando
+CONTROL_TRANSACCION = re.compile(r'\A(BEGIN|COMMIT|END|ROLLBACK|START\s+TRANSACTION)\b', re.I)
+
+# Ajustes de sesión que se repiten al reanudar (los SET del inicio del volcado)
+AJUSTE_SESION = re.compile(r'\A(SET\s+(?!LOCAL\b|TRANSACTION\b|CONSTRAINTS\b)|SELECT\s+pg_catalog\.set_config\()', re.I)
 
 class Command(BaseCommand):
-    help = 'Importa un archivo SQL a la base de datos'
+    help = (
+        'Importa un archivo SQL (volcado de pg_dump en texto) leyéndolo en streaming, '
+        'confirmando por lotes y con la posibilidad de reanudar tras un error'
+    )
 
     def add_arguments(self, parser):
         parser.add_argument('sql_file', type=str, help='Ruta al archivo SQL')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Sentencias por transacción (por defecto 500)')
+        parser.add_argument('--reanudar', action='store_true',
+                            help='Continuar desde el último lote confirmado de una ejecución anterior')
+        parser.add_argument('--omitir-errores', action='store_true',
+                            help='Registrar las sentencias que fallan y seguir con las demás')
+        parser.add_argument('--codificacion', default='utf-8',
+                            help='Codificación del archivo (por defecto utf-8)')
 
     def handle(self, *args, **options):
         sql_file = options['sql_file']
-        
+
         if not os.path.exists(sql_file):
             self.stdout.write(self.style.ERROR(f'Archivo no encontrado: {sql_file}'))
             return
-        
-        self.stdout.write(f'Leyendo {sql_file}...')
-        
-        with open(sql_file, 'r', encoding='utf-8') as f:
-            sql_content = f.read()
-        
-        self.stdout.write('Ejecutando SQL...')
-        
-        try:
+
+        self.ruta_progreso = f'{sql_file}.progreso'
+        self.progreso = {'posicion': 0, 'linea': 1, 'sentencias': 0, 'sesion': []}
+        if options['reanudar'] and os.path.exists(self.ruta_progreso):
+            with open(self.ruta_progreso, encoding='utf-8') as f:
+                self.progreso = json.load(f)
+            self.stdout.write(
+                f'Reanudando desde la línea {self.progreso["linea"]} '
+                f'({self.progreso["sentencias"]} sentencias ya confirmadas)...'
+            )
             with connection.cursor() as cursor:
-                cursor.execute(sql_content)
-            self.stdout.write(self.style.SUCCESS('✅ Datos importados exitosamente!'))
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'❌ Error: {e}'))
+                for sql in self.progreso['sesion']:
+                    cursor.execute(sql)
+        elif os.path.exists(self.ruta_progreso):
+            self.stdout.write(self.style.WARNING(
+                f'Hay un avance guardado en {self.ruta_progreso}; se empieza desde el principio '
+                f'(use --reanudar para continuar)'
+            ))
+
+        self.tamano = os.path.getsize(sql_file)
+        self.inicio = time.monotonic()
+        self.posicion_inicial = self.progreso['posicion']
+        self.errores = 0
+        self.actual = None
+        self.stdout.write(f'Importando {sql_file} ({self.tamano / 1e6:.1f} MB)...')
+
+        with open(sql_file, 'rb') as archivo:
+            lector = LectorSQL(archivo, options['codificacion'], self.progreso['posicion'], self.progreso['linea'])
+            sentencias = lector.sentencias()
+            try:
+                terminado = False
+                while not terminado:
+                    self.lote = {'sentencias': 0, 'sesion': []}
+                    with transaction.atomic():
+                        terminado = self._ejecutar_lote(sentencias, lector, options)
+                    # Solo con el lote confirmado: lo revertido no cuenta ni se repite al reanudar
+                    self.progreso['sentencias'] += self.lote['sentencias']
+                    self.progreso['sesion'].extend(self.lote['sesion'])
+                    self._guardar_progreso(lector)
+            except Exception as e:
+                linea = self.actual.linea if self.actual else lector.linea
+                self.stdout.write(self.style.ERROR(f'❌ Error en la sentencia de la línea {linea}: {e}'))
+                self.stdout.write(self.style.ERROR(
+                    f'Se revirtió el lote en curso; hay {self.progreso["sentencias"]} sentencias confirmadas. '
+                    f'Corrija el archivo o use --omitir-errores y vuelva a ejecutar con --reanudar.'
+                ))
+                return
+
+        if os.path.exists(self.ruta_progreso):
+            os.remove(self.ruta_progreso)
+        mensaje = f'✅ {self.progreso["sentencias"]} sentencias importadas en {time.monotonic() - self.inicio:.1f}s'
+        if self.errores:
+            self.stdout.write(self.style.WARNING(f'{mensaje} ({self.errores} con error omitidas)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(mensaje))
+
+    def _ejecutar_lote(self, sentencias, lector, options):
+        """Ejecuta hasta --lote sentencias; True si se terminó el archivo."""
+        ejecutadas = 0
+        with connection.cursor() as cursor:
+            for sentencia in sentencias:
+                self.actual = sentencia
+                if sentencia.meta:
+                    self.stdout.write(f'Se omite el metacomando de psql: {sentencia.sql}')
+                    continue
+                if CONTROL_TRANSACCION.match(sentencia.sql):
+                    continue
+                if options['omitir_errores']:
+                    try:
+                        with transaction.atomic():
+                            self._ejecutar(cursor, sentencia)
+                    except DatabaseError as e:
+                        self.errores += 1
+                        self.stdout.write(self.style.WARNING(f'Línea {sentencia.linea}: {e}'.strip()))
+                else:
+                    self._ejecutar(cursor, sentencia)
+                ejecutadas += 1
+                if ejecutadas >= options['lote']:
+                    return False
+        return True
+
+    def _ejecutar(self, cursor, sentencia):
+        if sentencia.datos is not None:
+            cursor.copy_expert(sentencia.sql, sentencia.datos)
+        else:
+            cursor.execute(sentencia.sql)
+        self.lote['sentencias'] += 1
+        if AJUSTE_SESION.match(sentencia.sql) and sentencia.sql not in self.progreso['sesion'] + self.lote['sesion']:
+            self.lote['sesion'].append(sentencia.sql)
+
+    def _guardar_progreso(self, lector):
+        self.progreso['posicion'] = lector.fin
+        self.progreso['linea'] = lector.linea_fin
+        temporal = f'{self.ruta_progreso}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self.progreso, f)
+        os.replace(temporal, self.ruta_progreso)
+
+        segundos = max(time.monotonic() - self.inicio, 1e-6)
+        leidos = lector.fin - self.posicion_inicial
+        self.stdout.write(
+            f'{self.progreso["sentencias"]} sentencias | '
+            f'{lector.fin / 1e6:.1f}/{self.tamano / 1e6:.1f} MB ({lector.fin * 100 / max(self.tamano, 1):.0f}%) | '
+            f'{leidos / 1e6 / segundos:.1f} MB/s'
+        )
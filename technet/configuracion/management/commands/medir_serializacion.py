@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from configuracion import lectura_rapida, models, renderers, serializers
+from datetime import date, timedelta
+from decimal import Decimal
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara, con filas de Instalaciones generadas en memoria (sin base de datos), '
+        'el tiempo por fila del ModelSerializer + JSONRenderer contra el codificador de '
+        'lectura_rapida + JSONRapidoRenderer, y verifica que el JSON sea idéntico.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=50000, help='Filas a generar (por defecto 50000)')
+        parser.add_argument('--repeticiones', type=int, default=3,
+                            help='Se toma el mejor tiempo de N repeticiones (por defecto 3)')
+
+    def handle(self, *args, **options):
+        serializer_class = serializers.InstalacionesSerializers
+        codificador = lectura_rapida.codificador_para(serializer_class())
+        if codificador is None:
+            raise CommandError(f'{serializer_class.__name__} no es compatible con la lectura rápida')
+
+        instancias = self._generar(options['filas'])
+        filas = [
+            tuple(getattr(instancia, models.Instalaciones._meta.get_field(c).attname) for c in codificador.columnas)
+            for instancia in instancias
+        ]
+
+        def serializer():
+            return JSONRenderer().render(serializer_class(instancias, many=True).data)
+
+        def rapido():
+            codificar = codificador.codificar
+            return renderers.JSONRapidoRenderer().render([codificar(fila) for fila in filas])
+
+        t_serializer, salida_serializer = self._medir(serializer, options['repeticiones'])
+        t_rapido, salida_rapida = self._medir(rapido, options['repeticiones'])
+
+        n = len(instancias)
+        self.stdout.write(f'Filas: {n}  ({len(salida_serializer) / 1024:.0f} KB de JSON)')
+        self.stdout.write(f'  ModelSerializer: {t_serializer:8.3f}s  {t_serializer / n * 1e6:7.2f} µs/fila')
+        self.stdout.write(f'  Lectura rápida:  {t_rapido:8.3f}s  {t_rapido / n * 1e6:7.2f} µs/fila')
+        self.stdout.write(f'  Aceleración: x{t_serializer / t_rapido:.1f}'
+                          f'{"" if renderers.orjson else " (sin orjson)"}')
+
+        if salida_serializer != salida_rapida:
+            raise CommandError('El JSON de la lectura rápida difiere del ModelSerializer')
+        self.stdout.write(self.style.SUCCESS('✅ Salida idéntica byte a byte'))
+
+    @staticmethod
+    def _medir(funcion, repeticiones):
+        mejor = None
+        for _ in range(max(repeticiones, 1)):
+            inicio = time.perf_counter()
+            salida = funcion()
+            transcurrido = time.perf_counter() - inicio
+            mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+        return mejor, salida
+
+    @staticmethod
+    def _generar(n):
+        base = date(2025, 1, 1)
+        return [
+            models.Instalaciones(
+                id_instalacion=i + 1,
+                fecha_instalacion=base + timedelta(days=i % 365),
+                id_tecnico_id=f'T{i % 40}',
+                id_operador_id=i % 5 + 1,
+                direccion=f'Calle {i % 997} #{i}',
+                numero_ot=f'OT{i:07d}',
+                producto_serie_id=f'S{i:08d}',
+                id_dr_id=i % 7 + 1,
+                id_tipo_orden_id=i % 4 + 1 if i % 9 else None,
+                metros_cable=Decimal(i % 120) / 4,
+                id_acometida_id=i % 3 + 1,
+                valor_dr=Decimal('5.00'),
+                valor_orden=Decimal('12.50'),
+                valor_orden_empresa=Decimal('15.00'),
+                valor_dr_empresa=Decimal('7.00'),
+                total=Decimal('17.50'),
+                instalacion_compartida=Decimal('0.00'),
+                valor_total_empresa=Decimal('22.00'),
+                observaciones='' if i % 5 else 'Cliente ausente, reprogramada',
+            )
+            for i in range(n)
+        ]
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from configuracion import trabajos
+import time
+
+class Command(BaseCommand):
+    help = (
+        'Procesa la cola de trabajos en segundo plano (importaciones, etc.) desde un proceso aparte; '
+        'corre también el mantenimiento periódico (retención de borrados de la sincronización)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera cuando no hay trabajos pendientes')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesar los pendientes y terminar')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Atendiendo la cola de trabajos...')
+        try:
+            while True:
+                # Entre trabajo y trabajo: una cola siempre ocupada no lo posterga
+                trabajos.mantenimiento()
+                trabajo = trabajos.tomar_siguiente()
+                if trabajo is None:
+                    if trabajos.recuperar_abandonados():
+                        continue
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                inicio = time.monotonic()
+                trabajos.ejecutar(trabajo)
+                estilo = self.style.SUCCESS if trabajo.estado == trabajo.TERMINADO else self.style.ERROR
+                self.stdout.write(estilo(
+                    f'Trabajo {trabajo.pk} ({trabajo.tipo}): {trabajo.estado}, '
+                    f'{trabajo.procesadas} filas en {time.monotonic() - inicio:.1f}s'
+                ))
+        except KeyboardInterrupt:
+            pass
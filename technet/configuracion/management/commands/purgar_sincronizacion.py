@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from configuracion import sincronizacion
+
+class Command(BaseCommand):
+    help = (
+        'Descarta los borrados más viejos que SINCRONIZACION_RETENCION_DIAS (?since=); '
+        'para programarlo (cron) cuando no corre procesar_trabajos, que ya lo hace'
+    )
+
+    def handle(self, *args, **options):
+        purgadas = sincronizacion.purgar()
+        self.stdout.write(self.style.SUCCESS(f'✅ {purgadas} borrados vencidos descartados'))
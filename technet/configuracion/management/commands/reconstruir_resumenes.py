@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from configuracion import resumenes
+import time
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero las tablas de resumen diario y mensual de instalaciones'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconstruyendo resúmenes de instalaciones...')
+        inicio = time.monotonic()
+
+        try:
+            meses = resumenes.reconstruir(stdout=self.stdout)
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ {meses} meses procesados en {time.monotonic() - inicio:.1f}s'
+            ))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'❌ Error: {e}'))
@@ -0,0 +1,110 @@
+"""
+Compresión gzip / brotli de las respuestas de la API.
+
+Solo comprime los tipos de contenido de la API (JSON, columnar, MessagePack,
+CSV, NDJSON) por encima de COMPRESION_UMBRAL bytes; los estáticos ya los
+sirve comprimidos WhiteNoise. De las codificaciones que el cliente acepta
+en Accept-Encoding (con q > 0) usa la de mayor q, brotli ante un empate
+si el paquete está instalado.
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+TIPOS_COMPRIMIBLES = (
+    'application/json',
+    'application/vnd.technet.',
+    'application/msgpack',
+    'application/x-ndjson',
+    'text/csv',
+)
+
+
+def _comprimir_brotli_secuencia(secuencia):
+    compresor = brotli.Compressor(quality=4)
+    for parte in secuencia:
+        datos = compresor.process(parte)
+        if datos:
+            yield datos
+    yield compresor.finish()
+
+
+def _calidades(cabecera):
+    """Accept-Encoding -> {codificación: q}; un q inválido cuenta como 0."""
+    calidades = {}
+    for elemento in cabecera.split(','):
+        nombre, _, parametros = elemento.partition(';')
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        q = 1.0
+        for parametro in parametros.split(';'):
+            clave, _, valor = parametro.partition('=')
+            if clave.strip().lower() == 'q':
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        calidades[nombre] = q
+    return calidades
+
+
+def elegir_codificacion(cabecera):
+    """'br', 'gzip' o None según Accept-Encoding; '*' vale para las no nombradas."""
+    calidades = _calidades(cabecera)
+    elegida, mejor = None, 0.0
+    for codificacion in ('br', 'gzip') if brotli is not None else ('gzip',):
+        q = calidades.get(codificacion, calidades.get('*', 0.0))
+        if q > mejor:
+            elegida, mejor = codificacion, q
+    return elegida
+
+
+class CompresionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.umbral = getattr(settings, 'COMPRESION_UMBRAL', 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        tipo = response.get('Content-Type', '')
+        if not tipo.startswith(TIPOS_COMPRIMIBLES) or response.has_header('Content-Encoding'):
+            return response
+        if not response.streaming and len(response.content) < self.umbral:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacion = elegir_codificacion(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codificacion is None:
+            return response
+
+        if response.streaming:
+            if codificacion == 'br':
+                response.streaming_content = _comprimir_brotli_secuencia(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content)
+            del response['Content-Length']
+        else:
+            if codificacion == 'br':
+                comprimido = brotli.compress(response.content, quality=5)
+            else:
+                comprimido = gzip.compress(response.content, compresslevel=6)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response['Content-Length'] = str(len(comprimido))
+
+        # El cuerpo cambió: un ETag fuerte pasa a ser débil (igual que GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codificacion
+        return response
@@ -0,0 +1,91 @@
+from django.db import migrations, models
+
+
+def _tabla_resumen(nombre, columna_fecha):
+    return f"""
+    CREATE TABLE IF NOT EXISTS {nombre} (
+        id bigserial PRIMARY KEY,
+        {columna_fecha} date NOT NULL,
+        id_tecnico integer NOT NULL,
+        id_operador integer NOT NULL,
+        id_acometida integer NOT NULL,
+        id_tipo_orden integer NULL,
+        cantidad integer NOT NULL,
+        total numeric(14, 2) NOT NULL DEFAULT 0,
+        valor_total_empresa numeric(14, 2) NOT NULL DEFAULT 0,
+        metros_cable numeric(14, 2) NOT NULL DEFAULT 0,
+        valor_dr numeric(14, 2) NOT NULL DEFAULT 0,
+        valor_dr_empresa numeric(14, 2) NOT NULL DEFAULT 0,
+        valor_orden numeric(14, 2) NOT NULL DEFAULT 0,
+        valor_orden_empresa numeric(14, 2) NOT NULL DEFAULT 0
+    );
+    """
+
+
+def _campos_resumen(columna_fecha):
+    decimal = lambda: models.DecimalField(decimal_places=2, max_digits=14)
+    return [
+        ('id', models.BigAutoField(primary_key=True, serialize=False)),
+        (columna_fecha, models.DateField()),
+        ('id_tecnico', models.IntegerField()),
+        ('id_operador', models.IntegerField()),
+        ('id_acometida', models.IntegerField()),
+        ('id_tipo_orden', models.IntegerField(blank=True, null=True)),
+        ('cantidad', models.IntegerField()),
+        ('total', decimal()),
+        ('valor_total_empresa', decimal()),
+        ('metros_cable', decimal()),
+        ('valor_dr', decimal()),
+        ('valor_dr_empresa', decimal()),
+        ('valor_orden', decimal()),
+        ('valor_orden_empresa', decimal()),
+    ]
+
+
+class Migration(migrations.Migration):
+    """
+    Crea las tablas de resumen diario y mensual de instalaciones.
+
+    Guardan, por día / mes y por técnico, operador, acometida y tipo de
+    orden, la cantidad de instalaciones y la suma de sus valores. Las
+    mantiene configuracion.resumenes en cada escritura y se pueden
+    reconstruir con `manage.py reconstruir_resumenes`; los reportes por
+    periodo las leen en lugar de recorrer la tabla instalaciones.
+    """
+
+    dependencies = [
+        ('configuracion', '0003_add_productos_id_operador_column'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                _tabla_resumen('resumen_instalaciones_diario', 'fecha'),
+                "CREATE INDEX IF NOT EXISTS resumen_inst_diario_fecha_idx "
+                "ON resumen_instalaciones_diario (fecha);",
+                _tabla_resumen('resumen_instalaciones_mensual', 'mes'),
+                "CREATE INDEX IF NOT EXISTS resumen_inst_mensual_mes_idx "
+                "ON resumen_instalaciones_mensual (mes);",
+            ],
+            reverse_sql=[
+                "DROP TABLE IF EXISTS resumen_instalaciones_mensual;",
+                "DROP TABLE IF EXISTS resumen_instalaciones_diario;",
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenInstalacionesDiario',
+            fields=_campos_resumen('fecha'),
+            options={
+                'db_table': 'resumen_instalaciones_diario',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenInstalacionesMensual',
+            fields=_campos_resumen('mes'),
+            options={
+                'db_table': 'resumen_instalaciones_mensual',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+
+def _indice_trigram(nombre, tabla, columna):
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} "
+        f"ON {tabla} USING gin ((UPPER({columna}::text)) gin_trgm_ops);"
+    )
+
+
+def _indice_prefijo(nombre, tabla, columna):
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} "
+        f"ON {tabla} ((UPPER({columna}::text)) text_pattern_ops);"
+    )
+
+
+class Migration(migrations.Migration):
+    """
+    Índices para la búsqueda de instalaciones y productos.
+
+    Django traduce icontains / istartswith a UPPER(col::text) LIKE UPPER(%s)
+    en PostgreSQL, así que los índices se crean sobre esa misma expresión:
+    - GIN pg_trgm para las búsquedas por subcadena (search), que dejan de
+      ser un recorrido secuencial.
+    - btree text_pattern_ops para el atajo por prefijo de OT y serie.
+
+    Se crean CONCURRENTLY para no bloquear las escrituras, por eso la
+    migración no es atómica.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('configuracion', '0004_resumenes_instalaciones'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+                _indice_trigram('instalaciones_numero_ot_trgm_idx', 'instalaciones', 'numero_ot'),
+                _indice_trigram('instalaciones_direccion_trgm_idx', 'instalaciones', 'direccion'),
+                _indice_trigram('instalaciones_producto_serie_trgm_idx', 'instalaciones', 'producto_serie'),
+                _indice_trigram('productos_nombre_producto_trgm_idx', 'productos', 'nombre_producto'),
+                _indice_trigram('productos_producto_serie_trgm_idx', 'productos', 'producto_serie'),
+                _indice_trigram('productos_categoria_trgm_idx', 'productos', 'categoria'),
+                _indice_prefijo('instalaciones_numero_ot_prefijo_idx', 'instalaciones', 'numero_ot'),
+                _indice_prefijo('instalaciones_producto_serie_prefijo_idx', 'instalaciones', 'producto_serie'),
+                _indice_prefijo('productos_producto_serie_prefijo_idx', 'productos', 'producto_serie'),
+            ],
+            reverse_sql=[
+                "DROP INDEX CONCURRENTLY IF EXISTS productos_producto_serie_prefijo_idx;",
+                "DROP INDEX CONCURRENTLY IF EXISTS instalaciones_producto_serie_prefijo_idx;",
+                "DROP INDEX CONCURRENTLY IF EXISTS instalaciones_numero_ot_prefijo_idx;",
+                "DROP INDEX CONCURRENTLY IF EXISTS productos_categoria_trgm_idx;",
+                "DROP INDEX CONCURRENTLY IF EXISTS productos_producto_serie_trgm_idx;",
+                "DROP INDEX CONCURRENTLY IF EXISTS productos_nombre_producto_trgm_idx;",
+                "DROP INDEX CONCURRENTLY IF EXISTS instalaciones_producto_serie_trgm_idx;",
+                "DROP INDEX CONCURRENTLY IF EXISTS instalaciones_direccion_trgm_idx;",
+                "DROP INDEX CONCURRENTLY IF EXISTS instalaciones_numero_ot_trgm_idx;",
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+
+INDICES = [
+    # InstalacionesList: orden por defecto y paginación por cursor
+    ('instalaciones_fecha_id_idx',
+     'instalaciones (fecha_instalacion DESC, id_instalacion DESC)'),
+    # InstalacionesList: filtros por técnico / operador con el mismo orden
+    ('instalaciones_tecnico_fecha_idx',
+     'instalaciones (id_tecnico, fecha_instalacion DESC, id_instalacion DESC)'),
+    ('instalaciones_operador_fecha_idx',
+     'instalaciones (id_operador, fecha_instalacion DESC, id_instalacion DESC)'),
+    # ProductosList: Exists(...) sobre instalaciones.producto_serie
+    ('instalaciones_producto_serie_idx',
+     'instalaciones (producto_serie)'),
+    # TipoOrdenEliminar: UPDATE ... WHERE id_tipo_orden = %s
+    ('instalaciones_tipo_orden_idx',
+     'instalaciones (id_tipo_orden) WHERE id_tipo_orden IS NOT NULL'),
+    # ProductosList: orden por defecto, filtro por técnico y paginación por cursor
+    ('productos_fecha_id_idx',
+     'productos (fecha_asignacion DESC, id_producto DESC)'),
+    ('productos_tecnico_fecha_idx',
+     'productos (id_tecnico, fecha_asignacion DESC, id_producto DESC)'),
+    # Descuentos por instalación
+    ('descuentos_instalacion_idx',
+     'descuentos (id_instalacion)'),
+]
+
+
+class Migration(migrations.Migration):
+    """
+    Índices compuestos para los caminos de acceso de los listados.
+
+    Las tablas son managed = False y solo tenían los índices de las claves
+    únicas; cada índice corresponde a un filtro + orden que usan las
+    vistas (ver comentarios). `manage.py analizar_planes` comprueba que los
+    planes de esas consultas los usen. Se crean CONCURRENTLY, por eso la
+    migración no es atómica.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('configuracion', '0005_indices_busqueda_trigram'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {definicion};"
+                for nombre, definicion in INDICES
+            ],
+            reverse_sql=[
+                f"DROP INDEX CONCURRENTLY IF EXISTS {nombre};"
+                for nombre, _ in reversed(INDICES)
+            ],
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations, models
+
+
+TABLAS = [
+    'acometidas',
+    'descuentos',
+    'dr',
+    'instalaciones',
+    'operadores',
+    'productos',
+    'tecnicos',
+    'tipodeordenes',
+]
+
+FUNCION = """
+CREATE OR REPLACE FUNCTION incrementar_version_tabla() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO versiones_tablas (tabla, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (tabla) DO UPDATE SET version = versiones_tablas.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+    """
+    Contador de versión por tabla para los ETag de la API.
+
+    Un trigger por sentencia (INSERT / UPDATE / DELETE / TRUNCATE) sobre
+    cada tabla de configuracion incrementa su fila en versiones_tablas, así
+    que cuenta cualquier escritura: ORM, SQL crudo de las vistas, imports y
+    cambios hechos directamente en la base. El contador se actualiza dentro
+    de la misma transacción que la escritura.
+    """
+
+    dependencies = [
+        ('configuracion', '0006_indices_listados'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE TABLE IF NOT EXISTS versiones_tablas ("
+                "tabla varchar(63) PRIMARY KEY, version bigint NOT NULL DEFAULT 1);",
+                "INSERT INTO versiones_tablas (tabla) VALUES "
+                + ', '.join(f"('{tabla}')" for tabla in TABLAS)
+                + " ON CONFLICT (tabla) DO NOTHING;",
+                FUNCION,
+            ] + [
+                f"DROP TRIGGER IF EXISTS {tabla}_version ON {tabla}; "
+                f"CREATE TRIGGER {tabla}_version "
+                f"AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {tabla} "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION incrementar_version_tabla();"
+                for tabla in TABLAS
+            ],
+            reverse_sql=[
+                f"DROP TRIGGER IF EXISTS {tabla}_version ON {tabla};"
+                for tabla in TABLAS
+            ] + [
+                "DROP FUNCTION IF EXISTS incrementar_version_tabla();",
+                "DROP TABLE IF EXISTS versiones_tablas;",
+            ],
+        ),
+        migrations.CreateModel(
+            name='VersionTabla',
+            fields=[
+                ('tabla', models.CharField(max_length=63, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'versiones_tablas',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,132 @@
+from django.db import migrations, models
+
+
+# Tablas con seguimiento de cambios y su clave primaria
+TABLAS = [
+    ('instalaciones', 'id_instalacion'),
+    ('productos', 'id_producto'),
+    ('descuentos', 'id_descuento'),
+]
+
+FUNCIONES = [
+    """
+    CREATE OR REPLACE FUNCTION marcar_cambio_fila() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at := clock_timestamp();
+        NEW.cambio_xid := txid_current();
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE OR REPLACE FUNCTION registrar_eliminacion() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO eliminaciones (tabla, id_fila)
+        VALUES (TG_TABLE_NAME, (to_jsonb(OLD) ->> TG_ARGV[0])::bigint);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+    # Asignar o liberar una serie cambia si el producto aparece en el
+    # listado de productos libres: se marca también el producto
+    """
+    CREATE OR REPLACE FUNCTION marcar_producto_asignado() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' AND OLD.producto_serie IS NOT DISTINCT FROM NEW.producto_serie THEN
+            RETURN NULL;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE productos SET updated_at = clock_timestamp() WHERE producto_serie = OLD.producto_serie;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE productos SET updated_at = clock_timestamp() WHERE producto_serie = NEW.producto_serie;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """,
+]
+
+
+class Migration(migrations.Migration):
+    """
+    Seguimiento de cambios para la sincronización incremental (?since=).
+
+    instalaciones, productos y descuentos reciben updated_at y cambio_xid
+    (transacción que escribió la fila), mantenidos por un trigger BEFORE
+    INSERT / UPDATE; los borrados quedan en la tabla eliminaciones. El
+    token de sincronización es el xmin del snapshot de la lectura: toda
+    escritura que esa lectura no vio tiene cambio_xid >= token, aunque se
+    confirme más tarde, cosa que un updated_at solo no garantiza.
+    """
+
+    dependencies = [
+        ('configuracion', '0007_versiones_tablas'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                f"ALTER TABLE {tabla} "
+                f"ADD COLUMN IF NOT EXISTS updated_at timestamptz NOT NULL DEFAULT now(), "
+                f"ADD COLUMN IF NOT EXISTS cambio_xid bigint NOT NULL DEFAULT 0;"
+                for tabla, _ in TABLAS
+            ] + [
+                f"CREATE INDEX IF NOT EXISTS {tabla}_cambio_xid_idx ON {tabla} (cambio_xid);"
+                for tabla, _ in TABLAS
+            ] + [
+                "CREATE TABLE IF NOT EXISTS eliminaciones ("
+                "id bigserial PRIMARY KEY, "
+                "tabla varchar(63) NOT NULL, "
+                "id_fila bigint NOT NULL, "
+                "eliminado_en timestamptz NOT NULL DEFAULT clock_timestamp(), "
+                "cambio_xid bigint NOT NULL DEFAULT txid_current());",
+                "CREATE INDEX IF NOT EXISTS eliminaciones_tabla_xid_idx "
+                "ON eliminaciones (tabla, cambio_xid);",
+            ] + FUNCIONES + [
+                f"DROP TRIGGER IF EXISTS {tabla}_cambio ON {tabla}; "
+                f"CREATE TRIGGER {tabla}_cambio BEFORE INSERT OR UPDATE ON {tabla} "
+                f"FOR EACH ROW EXECUTE FUNCTION marcar_cambio_fila();"
+                for tabla, _ in TABLAS
+            ] + [
+                f"DROP TRIGGER IF EXISTS {tabla}_eliminacion ON {tabla}; "
+                f"CREATE TRIGGER {tabla}_eliminacion AFTER DELETE ON {tabla} "
+                f"FOR EACH ROW EXECUTE FUNCTION registrar_eliminacion('{pk}');"
+                for tabla, pk in TABLAS
+            ] + [
+                "DROP TRIGGER IF EXISTS instalaciones_producto_asignado ON instalaciones; "
+                "CREATE TRIGGER instalaciones_producto_asignado "
+                "AFTER INSERT OR DELETE OR UPDATE OF producto_serie ON instalaciones "
+                "FOR EACH ROW EXECUTE FUNCTION marcar_producto_asignado();",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS instalaciones_producto_asignado ON instalaciones;",
+            ] + [
+                f"DROP TRIGGER IF EXISTS {tabla}_eliminacion ON {tabla}; "
+                f"DROP TRIGGER IF EXISTS {tabla}_cambio ON {tabla};"
+                for tabla, _ in TABLAS
+            ] + [
+                "DROP FUNCTION IF EXISTS marcar_producto_asignado();",
+                "DROP FUNCTION IF EXISTS registrar_eliminacion();",
+                "DROP FUNCTION IF EXISTS marcar_cambio_fila();",
+                "DROP TABLE IF EXISTS eliminaciones;",
+            ] + [
+                f"ALTER TABLE {tabla} DROP COLUMN IF EXISTS cambio_xid, DROP COLUMN IF EXISTS updated_at;"
+                for tabla, _ in TABLAS
+            ],
+        ),
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tabla', models.CharField(max_length=63)),
+                ('id_fila', models.BigIntegerField()),
+                ('eliminado_en', models.DateTimeField()),
+                ('cambio_xid', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'eliminaciones',
+                'managed': False,
+            },
+        ),
+    ]
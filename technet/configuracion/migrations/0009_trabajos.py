@@ -0,0 +1,68 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Tabla trabajos: tareas largas (importaciones de archivos y, en general,
+    cualquier proceso por lotes) que se ejecutan fuera de la petición.
+
+    Cada fila guarda el tipo de trabajo, sus parámetros, el avance y el
+    resultado; los hilos de configuracion.trabajos toman los pendientes con
+    FOR UPDATE SKIP LOCKED, así varios procesos pueden atender la misma cola.
+    """
+
+    dependencies = [
+        ('configuracion', '0008_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE TABLE IF NOT EXISTS trabajos ("
+                "id bigserial PRIMARY KEY, "
+                "tipo varchar(50) NOT NULL, "
+                "estado varchar(20) NOT NULL DEFAULT 'pendiente', "
+                "parametros jsonb NOT NULL DEFAULT '{}', "
+                "archivo varchar(500) NOT NULL DEFAULT '', "
+                "nombre_archivo varchar(255) NOT NULL DEFAULT '', "
+                "total integer NULL, "
+                "procesadas integer NOT NULL DEFAULT 0, "
+                "resultado jsonb NOT NULL DEFAULT '{}', "
+                "errores jsonb NOT NULL DEFAULT '[]', "
+                "mensaje text NOT NULL DEFAULT '', "
+                "creado_en timestamptz NOT NULL DEFAULT now(), "
+                "iniciado_en timestamptz NULL, "
+                "actualizado_en timestamptz NULL, "
+                "terminado_en timestamptz NULL);",
+                "CREATE INDEX IF NOT EXISTS trabajos_pendientes_idx "
+                "ON trabajos (id) WHERE estado = 'pendiente';",
+            ],
+            reverse_sql=[
+                "DROP TABLE IF EXISTS trabajos;",
+            ],
+        ),
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(max_length=50)),
+                ('estado', models.CharField(default='pendiente', max_length=20)),
+                ('parametros', models.JSONField(default=dict)),
+                ('archivo', models.CharField(blank=True, default='', max_length=500)),
+                ('nombre_archivo', models.CharField(blank=True, default='', max_length=255)),
+                ('total', models.IntegerField(blank=True, null=True)),
+                ('procesadas', models.IntegerField(default=0)),
+                ('resultado', models.JSONField(default=dict)),
+                ('errores', models.JSONField(default=list)),
+                ('mensaje', models.TextField(blank=True, default='')),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_en', models.DateTimeField(blank=True, null=True)),
+                ('actualizado_en', models.DateTimeField(blank=True, null=True)),
+                ('terminado_en', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'trabajos',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índices para recorrer por clave primaria las instalaciones de un DR o
+    de un tipo de orden (configuracion.precios): cada lote es un rango del
+    índice, sin ordenar todas las instalaciones del catálogo. El de tipo de
+    orden reemplaza a instalaciones_tipo_orden_idx (0006), que ya cubre.
+    Se crean CONCURRENTLY, por eso la migración no es atómica.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('configuracion', '0009_trabajos'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS instalaciones_dr_id_idx "
+                "ON instalaciones (id_dr, id_instalacion);",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS instalaciones_tipo_orden_id_idx "
+                "ON instalaciones (id_tipo_orden, id_instalacion) WHERE id_tipo_orden IS NOT NULL;",
+                "DROP INDEX CONCURRENTLY IF EXISTS instalaciones_tipo_orden_idx;",
+            ],
+            reverse_sql=[
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS instalaciones_tipo_orden_idx "
+                "ON instalaciones (id_tipo_orden) WHERE id_tipo_orden IS NOT NULL;",
+                "DROP INDEX CONCURRENTLY IF EXISTS instalaciones_tipo_orden_id_idx;",
+                "DROP INDEX CONCURRENTLY IF EXISTS instalaciones_dr_id_idx;",
+            ],
+        ),
+    ]
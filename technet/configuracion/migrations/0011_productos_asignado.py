@@ -0,0 +1,67 @@
+from django.db import migrations
+
+
+FUNCION = """
+CREATE OR REPLACE FUNCTION calcular_producto_asignado() RETURNS trigger AS $$
+BEGIN
+    NEW.asignado := EXISTS (SELECT 1 FROM instalaciones WHERE producto_serie = NEW.producto_serie);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Productos libres (sin instalación) en el orden del listado
+INDICES = [
+    ('productos_libres_idx', 'fecha_asignacion DESC, id_producto DESC'),
+    ('productos_libres_tecnico_idx', 'id_tecnico, fecha_asignacion DESC, id_producto DESC'),
+    ('productos_libres_operador_idx', 'id_operador, fecha_asignacion DESC, id_producto DESC'),
+]
+
+
+class Migration(migrations.Migration):
+    """
+    productos.asignado: la serie está en alguna instalación.
+
+    Lo calcula un trigger BEFORE INSERT / UPDATE sobre productos. Toda
+    escritura de instalaciones que asigna o libera una serie (API, edición
+    masiva, importaciones, recálculo de precios, SQL directo) ya marca el
+    producto con el trigger instalaciones_producto_asignado (0008), que así
+    lo recalcula en la misma transacción; una serie en varias instalaciones
+    queda asignada hasta que se libera la última. El listado de productos
+    libres filtra por la columna con índices parciales por técnico y por
+    operador, en lugar de buscar cada serie en instalaciones.
+
+    Los índices se crean CONCURRENTLY, por eso la migración no es atómica.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('configuracion', '0010_indices_recalculo_precios'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "ALTER TABLE productos ADD COLUMN IF NOT EXISTS asignado boolean NOT NULL DEFAULT false;",
+                FUNCION,
+                "DROP TRIGGER IF EXISTS productos_asignado ON productos; "
+                "CREATE TRIGGER productos_asignado BEFORE INSERT OR UPDATE ON productos "
+                "FOR EACH ROW EXECUTE FUNCTION calcular_producto_asignado();",
+                # Con el trigger ya activo: las asignaciones de ahora en más se calculan solas
+                "UPDATE productos p SET asignado = true WHERE NOT p.asignado "
+                "AND EXISTS (SELECT 1 FROM instalaciones i WHERE i.producto_serie = p.producto_serie);",
+            ] + [
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON productos ({columnas}) WHERE NOT asignado;"
+                for nombre, columnas in INDICES
+            ],
+            reverse_sql=[
+                f"DROP INDEX CONCURRENTLY IF EXISTS {nombre};"
+                for nombre, _ in INDICES
+            ] + [
+                "DROP TRIGGER IF EXISTS productos_asignado ON productos;",
+                "DROP FUNCTION IF EXISTS calcular_producto_asignado();",
+                "ALTER TABLE productos DROP COLUMN IF EXISTS asignado;",
+            ],
+        ),
+    ]
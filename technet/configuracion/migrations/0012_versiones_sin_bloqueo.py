@@ -0,0 +1,74 @@
+from django.db import migrations
+
+
+# Cada 1 / COMPACTAR escrituras (en promedio) se pliegan las marcas ya
+# confirmadas de la tabla en su contador
+COMPACTAR = 100
+
+FUNCION = f"""
+CREATE OR REPLACE FUNCTION incrementar_version_tabla() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO versiones_cambios (tabla, xid) VALUES (TG_TABLE_NAME, txid_current())
+    ON CONFLICT (tabla, xid) DO NOTHING;
+    IF random() < 1.0 / {COMPACTAR}
+            AND pg_try_advisory_xact_lock(hashtext('versiones_tablas'), hashtext(TG_TABLE_NAME)) THEN
+        WITH compactadas AS (
+            DELETE FROM versiones_cambios WHERE tabla = TG_TABLE_NAME RETURNING 1
+        )
+        UPDATE versiones_tablas SET version = version + (SELECT count(*) FROM compactadas)
+        WHERE tabla = TG_TABLE_NAME;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Versión de 0007, para revertir
+FUNCION_ANTERIOR = """
+CREATE OR REPLACE FUNCTION incrementar_version_tabla() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO versiones_tablas (tabla, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (tabla) DO UPDATE SET version = versiones_tablas.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+    """
+    Versiones de tabla sin fila compartida entre escritores.
+
+    El trigger de 0007 actualizaba la fila de la tabla en versiones_tablas:
+    ese bloqueo duraba hasta el commit y serializaba a todos los escritores
+    de la misma tabla. Ahora cada transacción que escribe una tabla inserta
+    una marca propia (tabla, xid) en versiones_cambios, sin conflicto con
+    las de otras transacciones, y la versión es el contador de
+    versiones_tablas más las marcas confirmadas. Sube exactamente cuando
+    una escritura se confirma, como antes. De vez en cuando una escritura
+    pliega las marcas confirmadas en el contador, dentro de su transacción
+    y solo si ninguna otra lo está haciendo (pg_try_advisory_xact_lock):
+    la suma no cambia.
+    """
+
+    dependencies = [
+        ('configuracion', '0011_productos_asignado'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE TABLE IF NOT EXISTS versiones_cambios ("
+                "tabla varchar(63) NOT NULL, "
+                "xid bigint NOT NULL, "
+                "PRIMARY KEY (tabla, xid));",
+                FUNCION,
+            ],
+            reverse_sql=[
+                FUNCION_ANTERIOR,
+                "UPDATE versiones_tablas v SET version = version + "
+                "(SELECT count(*) FROM versiones_cambios c WHERE c.tabla = v.tabla);",
+                "DROP TABLE IF EXISTS versiones_cambios;",
+            ],
+        ),
+    ]
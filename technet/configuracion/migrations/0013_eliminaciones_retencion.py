@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Retención de eliminaciones (configuracion.sincronizacion.purgar).
+
+    Los registros de borrados se descartan pasados
+    SINCRONIZACION_RETENCION_DIAS. sincronizacion_horizonte guarda por
+    tabla el menor token que todavía se acepta (el último cambio_xid
+    descartado + 1); un token anterior podría no ver un borrado y obliga a
+    sincronizar de nuevo desde cero.
+    """
+
+    dependencies = [
+        ('configuracion', '0012_versiones_sin_bloqueo'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE TABLE IF NOT EXISTS sincronizacion_horizonte ("
+                "tabla varchar(63) PRIMARY KEY, "
+                "cambio_xid bigint NOT NULL);",
+                "CREATE INDEX IF NOT EXISTS eliminaciones_eliminado_en_idx "
+                "ON eliminaciones (eliminado_en);",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS eliminaciones_eliminado_en_idx;",
+                "DROP TABLE IF EXISTS sincronizacion_horizonte;",
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    trabajos.total_errores: cantidad de errores del trabajo. La lista
+    errores guarda solo los primeros trabajos.MAX_ERRORES, para no
+    reescribir una lista cada vez más larga en cada lote.
+    """
+
+    dependencies = [
+        ('configuracion', '0013_eliminaciones_retencion'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "ALTER TABLE trabajos ADD COLUMN IF NOT EXISTS total_errores integer NOT NULL DEFAULT 0;",
+                "UPDATE trabajos SET total_errores = jsonb_array_length(errores) WHERE errores <> '[]';",
+            ],
+            reverse_sql=[
+                "ALTER TABLE trabajos DROP COLUMN IF EXISTS total_errores;",
+            ],
+        ),
+        migrations.AddField(
+            model_name='trabajo',
+            name='total_errores',
+            field=models.IntegerField(default=0),
+        ),
+    ]
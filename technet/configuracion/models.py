@@ -239,3 +239,99 @@ class Tipodeordenes(models.Model):
     class Meta:
         managed = False
         db_table = 'tipodeordenes'
+
+
+class ResumenInstalacionesDiario(models.Model):
+    # Tabla de resumen mantenida por configuracion.resumenes (ver migración 0004)
+    id = models.BigAutoField(primary_key=True)
+    fecha = models.DateField()
+    id_tecnico = models.IntegerField()
+    id_operador = models.IntegerField()
+    id_acometida = models.IntegerField()
+    id_tipo_orden = models.IntegerField(blank=True, null=True)
+    cantidad = models.IntegerField()
+    total = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_total_empresa = models.DecimalField(max_digits=14, decimal_places=2)
+    metros_cable = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_dr = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_dr_empresa = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_orden = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_orden_empresa = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        managed = False
+        db_table = 'resumen_instalaciones_diario'
+
+
+class ResumenInstalacionesMensual(models.Model):
+    # Tabla de resumen mantenida por configuracion.resumenes (ver migración 0004)
+    id = models.BigAutoField(primary_key=True)
+    mes = models.DateField()
+    id_tecnico = models.IntegerField()
+    id_operador = models.IntegerField()
+    id_acometida = models.IntegerField()
+    id_tipo_orden = models.IntegerField(blank=True, null=True)
+    cantidad = models.IntegerField()
+    total = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_total_empresa = models.DecimalField(max_digits=14, decimal_places=2)
+    metros_cable = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_dr = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_dr_empresa = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_orden = models.DecimalField(max_digits=14, decimal_places=2)
+    valor_orden_empresa = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        managed = False
+        db_table = 'resumen_instalaciones_mensual'
+
+
+class VersionTabla(models.Model):
+    # Contador base por tabla (migración 0007); la versión le suma las marcas de versiones_cambios (0012)
+    tabla = models.CharField(max_length=63, primary_key=True)
+    version = models.BigIntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'versiones_tablas'
+
+
+class Eliminacion(models.Model):
+    # Registro de filas borradas para la sincronización incremental (ver migración 0008)
+    id = models.BigAutoField(primary_key=True)
+    tabla = models.CharField(max_length=63)
+    id_fila = models.BigIntegerField()
+    eliminado_en = models.DateTimeField()
+    cambio_xid = models.BigIntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'eliminaciones'
+
+
+class Trabajo(models.Model):
+    # Trabajos en segundo plano (ver configuracion.trabajos y migración 0009)
+    PENDIENTE = 'pendiente'
+    PROCESANDO = 'procesando'
+    TERMINADO = 'terminado'
+    FALLIDO = 'error'
+
+    id = models.BigAutoField(primary_key=True)
+    tipo = models.CharField(max_length=50)
+    estado = models.CharField(max_length=20, default=PENDIENTE)
+    parametros = models.JSONField(default=dict)
+    archivo = models.CharField(max_length=500, blank=True, default='')
+    nombre_archivo = models.CharField(max_length=255, blank=True, default='')
+    total = models.IntegerField(blank=True, null=True)
+    procesadas = models.IntegerField(default=0)
+    resultado = models.JSONField(default=dict)
+    errores = models.JSONField(default=list)
+    total_errores = models.IntegerField(default=0)
+    mensaje = models.TextField(blank=True, default='')
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(blank=True, null=True)
+    actualizado_en = models.DateTimeField(blank=True, null=True)
+    terminado_en = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'trabajos'
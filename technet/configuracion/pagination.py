@@ -0,0 +1,295 @@
+import base64
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator as DjangoPaginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ConteoPaginator(DjangoPaginator):
+    """
+    Paginator de Django con un COUNT más barato:
+    - sin filtros (WHERE vacío) y en PostgreSQL usa la estimación del
+      planificador (pg_class.reltuples) si la tabla es grande;
+    - en otro caso guarda el COUNT exacto en caché durante `cache_ttl`
+      segundos, con la SQL de la consulta como clave.
+
+    La estimación puede quedar por debajo del total real (p.ej. tras una
+    carga masiva, antes del ANALYZE): se toma como cota inferior y al pedir
+    la última página estimada o una posterior se usa el COUNT exacto.
+    """
+    cache_ttl = 30
+    minimo_estimado = 100000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimado = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            estimado = self._estimar(queryset.model._meta.db_table)
+            if estimado >= self.minimo_estimado:
+                self.estimado = True
+                return estimado
+        return self._contar()
+
+    def validate_number(self, number):
+        if self.estimado:
+            try:
+                numero = super().validate_number(number)
+            except EmptyPage:
+                numero = None
+            if numero is None or numero >= self.num_pages:
+                self.estimado = False
+                self.__dict__['count'] = self._contar()
+                self.__dict__.pop('num_pages', None)
+        return super().validate_number(number)
+
+    def _contar(self):
+        queryset = self.object_list
+        sql, params = queryset.query.sql_with_params()
+        clave = 'conteo:' + hashlib.md5(repr((sql, params)).encode('utf-8')).hexdigest()
+        total = cache.get(clave)
+        if total is None:
+            total = queryset.count()
+            cache.set(clave, total, self.cache_ttl)
+        return total
+
+    @staticmethod
+    def _estimar(tabla):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [tabla])
+            fila = cursor.fetchone()
+        return fila[0] if fila and fila[0] is not None else -1
+
+
+# Configuración de paginación
+class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Paginación por número de página. `?count=false` omite el COUNT: se lee
+    una fila de más para saber si hay página siguiente y `count` vale null.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 50000  # Permitir exportar grandes cantidades de datos
+    django_paginator_class = ConteoPaginator
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.sin_conteo = request.query_params.get(self.count_query_param, '').lower() in ('false', '0', 'no')
+        if not self.sin_conteo:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            self.numero = int(request.query_params.get(self.page_query_param, 1))
+            if self.numero < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        inicio = (self.numero - 1) * page_size
+        resultados = list(queryset[inicio:inicio + page_size + 1])
+        self.hay_siguiente = len(resultados) > page_size
+        return resultados[:page_size]
+
+    def get_paginated_response(self, data):
+        if not self.sin_conteo:
+            response = super().get_paginated_response(data)
+            if self.page.paginator.estimado:
+                response.data['count_estimado'] = True
+            return response
+        return Response(OrderedDict([
+            ('count', None),
+            ('next', self._enlace(self.numero + 1) if self.hay_siguiente else None),
+            ('previous', self._enlace(self.numero - 1) if self.numero > 1 else None),
+            ('results', data),
+        ]))
+
+    def _enlace(self, numero):
+        url = self.request.build_absolute_uri()
+        if numero == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, numero)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre un orden estable de columnas.
+
+    En lugar de OFFSET + COUNT filtra con una comparación de tuplas sobre
+    la última fila entregada, por lo que una página profunda cuesta lo
+    mismo que la primera. El orden se toma de `keyset_ordering` en la
+    vista, p.ej. ('-fecha_instalacion', '-id_instalacion'); la última
+    columna debe ser única para que el orden sea total.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 50000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(view.keyset_ordering)
+        self.page_size = self.get_page_size(request)
+        # Con values_list() las filas son tuplas: posición de cada columna del orden
+        campos = getattr(queryset, '_fields', None) or ()
+        self.indices = tuple(
+            campos.index(campo.lstrip('-')) if campo.lstrip('-') in campos else None
+            for campo in self.ordering
+        )
+
+        posicion, reverso = self.decode_cursor(request, queryset.model)
+
+        orden = self.ordering if not reverso else tuple(self._invertir(f) for f in self.ordering)
+        queryset = queryset.order_by(*orden)
+        if posicion is not None:
+            queryset = queryset.filter(self._filtro_posicion(orden, posicion))
+
+        # Pedir una fila de más para saber si existe otra página sin contar
+        resultados = list(queryset[:self.page_size + 1])
+        hay_mas = len(resultados) > self.page_size
+        resultados = resultados[:self.page_size]
+
+        if reverso:
+            resultados.reverse()
+            self.has_next = posicion is not None
+            self.has_previous = hay_mas
+        else:
+            self.has_next = hay_mas
+            self.has_previous = posicion is not None
+
+        self.page = resultados
+        return resultados
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params[self.page_size_query_param])
+            if tamano > 0:
+                return min(tamano, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self._posicion_de(self.page[-1]), reverso=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Página vacía tras un cursor: volver al inicio
+            return replace_query_param(self.base_url, self.cursor_query_param, '')
+        return self.encode_cursor(self._posicion_de(self.page[0]), reverso=True)
+
+    def decode_cursor(self, request, model):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if not codificado:
+            return None, False
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(codificado.encode('ascii')).decode('utf-8'))
+            valores = datos['v']
+            if len(valores) != len(self.ordering):
+                raise ValueError
+            posicion = tuple(
+                model._meta.get_field(campo.lstrip('-')).to_python(valor)
+                for campo, valor in zip(self.ordering, valores)
+            )
+            return posicion, bool(datos.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, posicion, reverso):
+        datos = {'v': [self._serializar(v) for v in posicion]}
+        if reverso:
+            datos['r'] = 1
+        codificado = base64.urlsafe_b64encode(
+            json.dumps(datos, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii')
+        url = remove_query_param(self.base_url, 'page')
+        return replace_query_param(url, self.cursor_query_param, codificado)
+
+    def _posicion_de(self, obj):
+        if isinstance(obj, tuple):
+            return tuple(obj[i] for i in self.indices)
+        return tuple(getattr(obj, campo.lstrip('-')) for campo in self.ordering)
+
+    @staticmethod
+    def _serializar(valor):
+        return valor.isoformat() if hasattr(valor, 'isoformat') else valor
+
+    @staticmethod
+    def _invertir(campo):
+        return campo[1:] if campo.startswith('-') else '-' + campo
+
+    @staticmethod
+    def _filtro_posicion(orden, posicion):
+        # (a, b) "después de" (va, vb) => a > va OR (a = va AND b > vb),
+        # con < en lugar de > para las columnas descendentes
+        filtro = Q()
+        iguales = {}
+        for campo, valor in zip(orden, posicion):
+            nombre = campo.lstrip('-')
+            lookup = '__lt' if campo.startswith('-') else '__gt'
+            filtro |= Q(**iguales, **{nombre + lookup: valor})
+            iguales[nombre] = valor
+        return filtro
+
+
+class StandardOrKeysetPagination(StandardResultsSetPagination):
+    """
+    Paginación por número de página por defecto; si la petición trae el
+    parámetro `cursor` (vacío para la primera página) usa KeysetPagination,
+    que no ejecuta COUNT y devuelve cursores opacos next/previous.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
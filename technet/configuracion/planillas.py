@@ -0,0 +1,263 @@
+"""
+Lectura de planillas XLSX / CSV subidas para importar en segundo plano.
+
+Las filas se leen en streaming (openpyxl en modo read_only, csv fila a
+fila), sin cargar el archivo en memoria. Los mapeos convierten cada fila
+de la planilla en los datos que esperan los importadores, con las mismas
+reglas que aplicaba el navegador en Instalaciones.tsx y Productos.tsx.
+"""
+import codecs
+import csv
+import datetime
+import re
+
+from . import catalogos, models
+
+EXTENSIONES = ('.xlsx', '.csv')
+
+# Formatos que el navegador deja elegir pero no se leen, con la indicación para el usuario
+NO_SOPORTADAS = {
+    '.xls': 'Los archivos .xls (Excel 97-2003) no se admiten; guárdelo desde Excel como .xlsx o .csv',
+}
+
+# Origen de los números de serie de fecha de Excel
+_EPOCA_EXCEL = datetime.date(1899, 12, 30)
+
+
+def filas(ruta):
+    """Itera las filas de datos como {encabezado: valor}, sin celdas vacías."""
+    if ruta.lower().endswith('.xlsx'):
+        return _filas_xlsx(ruta)
+    if ruta.lower().endswith('.csv'):
+        return _filas_csv(ruta)
+    raise ValueError(error_formato(ruta))
+
+
+def error_formato(nombre):
+    """Mensaje para el usuario si el archivo no es de un formato soportado; None si lo es."""
+    nombre = nombre.lower()
+    if nombre.endswith(EXTENSIONES):
+        return None
+    aceptados = f'se aceptan {", ".join(EXTENSIONES)}'
+    for extension, mensaje in NO_SOPORTADAS.items():
+        if nombre.endswith(extension):
+            return f'{mensaje} ({aceptados})'
+    return f'Formato no soportado; {aceptados}'
+
+
+def contar(ruta):
+    """Cantidad de filas de datos (aproximada en XLSX); None si no se sabe."""
+    if ruta.lower().endswith('.xlsx'):
+        import openpyxl
+        libro = openpyxl.load_workbook(ruta, read_only=True)
+        try:
+            hoja = libro.worksheets[0]
+            return hoja.max_row - 1 if hoja.max_row else None
+        finally:
+            libro.close()
+    with open(ruta, newline='', encoding=_codificacion(ruta)) as archivo:
+        lector = csv.reader(archivo, _dialecto(archivo))
+        next(lector, None)
+        return sum(1 for fila in lector if any(fila))
+
+
+def _fila(encabezados, valores):
+    fila = {}
+    for encabezado, valor in zip(encabezados, valores):
+        if encabezado is None or valor is None or valor == '':
+            continue
+        if isinstance(valor, float) and valor.is_integer():
+            valor = int(valor)
+        fila[str(encabezado).strip()] = valor
+    return fila
+
+
+def _filas_xlsx(ruta):
+    import openpyxl
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        valores = libro.worksheets[0].iter_rows(values_only=True)
+        encabezados = next(valores, ())
+        for fila in valores:
+            fila = _fila(encabezados, fila)
+            if fila:
+                yield fila
+    finally:
+        libro.close()
+
+
+def _codificacion(ruta):
+    # Los CSV exportados por Excel en Windows suelen venir en cp1252
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    with open(ruta, 'rb') as archivo:
+        try:
+            for bloque in iter(lambda: archivo.read(1 << 20), b''):
+                decodificador.decode(bloque)
+            decodificador.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return 'cp1252'
+    return 'utf-8-sig'
+
+
+def _dialecto(archivo):
+    muestra = archivo.read(64 * 1024)
+    archivo.seek(0)
+    try:
+        return csv.Sniffer().sniff(muestra, delimiters=',;\t')
+    except csv.Error:
+        return csv.excel
+
+
+def _filas_csv(ruta):
+    with open(ruta, newline='', encoding=_codificacion(ruta)) as archivo:
+        lector = csv.reader(archivo, _dialecto(archivo))
+        encabezados = next(lector, [])
+        for fila in lector:
+            fila = _fila(encabezados, fila)
+            if fila:
+                yield fila
+
+
+def _columna(fila, nombres):
+    """Valor de la primera columna de `nombres` presente (sin distinguir mayúsculas)."""
+    for nombre in nombres:
+        if nombre in fila:
+            return fila[nombre]
+        for clave in fila:
+            if clave.lower() == nombre.lower():
+                return fila[clave]
+    return None
+
+
+def _texto(valor, defecto):
+    return str(valor) if valor else defecto
+
+
+def leer_fecha(valor):
+    """Fecha de una celda: fecha de Excel, número de serie, DD/MM/YYYY o YYYY-MM-DD."""
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return _EPOCA_EXCEL + datetime.timedelta(days=int(valor))
+    if isinstance(valor, str):
+        valor = valor.strip()
+        coincidencia = re.fullmatch(r'(\d{1,2})/(\d{1,2})/(\d{4})', valor)
+        if coincidencia:
+            dia, mes, anio = coincidencia.groups()
+            return datetime.date(int(anio), int(mes), int(dia))
+        if re.fullmatch(r'\d{4}-\d{1,2}-\d{1,2}', valor):
+            anio, mes, dia = valor.split('-')
+            return datetime.date(int(anio), int(mes), int(dia))
+    return None
+
+
+def _ordenados(modelo):
+    return [objeto for _, objeto in sorted(catalogos.tabla(modelo).items())]
+
+
+class MapeoInstalaciones:
+    """Columnas de la planilla de instalaciones -> datos de ImportadorInstalaciones."""
+
+    def __init__(self):
+        self.tecnicos = _ordenados(models.Tecnicos)
+        self.operadores = {}
+        for operador in _ordenados(models.Operadores):
+            self.operadores.setdefault(operador.nombre_operador.lower(), operador)
+        self.operador_default = next(iter(self.operadores.values()), None)
+
+        drs = _ordenados(models.Dr)
+        acometidas = _ordenados(models.Acometidas)
+        # Valores por defecto para campos requeridos: el "No definido" de cada tabla
+        self.dr = next((d for d in drs if 'no definido' in d.nombre_dr.lower()), drs[0] if drs else None)
+        self.acometida = next(
+            (a for a in acometidas if 'no definido' in a.nombre_acometida.lower()),
+            acometidas[0] if acometidas else None,
+        )
+        self._tecnicos_por_nombre = {}
+
+    def _tecnico(self, valor):
+        # Formatos como "84128 - JEISON DUBAN LONDOÑO" o "1. Mauricio Espejo"
+        nombre = re.sub(r'^\d+[.\-\s]+', '', str(valor or '').strip()).strip().lower()
+        if nombre not in self._tecnicos_por_nombre:
+            self._tecnicos_por_nombre[nombre] = next(
+                (t for t in self.tecnicos if self._coincide(t, nombre)),
+                self.tecnicos[0] if self.tecnicos else None,
+            )
+        return self._tecnicos_por_nombre[nombre]
+
+    @staticmethod
+    def _coincide(tecnico, nombre):
+        if f'{tecnico.nombre} {tecnico.apellido}'.lower() == nombre:
+            return True
+        # Nombre del sistema con el código del técnico delante ("84128-Jeison Duban")
+        sin_codigo = re.sub(r'^\d+[\-\s]+', '', tecnico.nombre)
+        if f'{sin_codigo} {tecnico.apellido}'.lower() == nombre:
+            return True
+        return tecnico.apellido.lower() in nombre
+
+    def __call__(self, fila):
+        cliente = _columna(fila, ['Cliente', 'cliente', 'CLIENTE'])
+        numero_ot = _columna(fila, ['Cod. cliente 1', 'COD. CLIENTE 1', 'Cod cliente 1'])
+        fecha = _columna(fila, ['Fecha fin actuación', 'Fecha fin actuacion', 'FECHA FIN ACTUACION'])
+        tecnico = self._tecnico(_columna(fila, ['Técnico cumplimentación', 'Tecnico cumplimentacion', 'TECNICO CUMPLIMENTACION']))
+        serie = _columna(fila, ['N/S', 'N S', 'NS'])
+        descripcion = _columna(fila, ['Descripción', 'Descripcion', 'DESCRIPCION'])
+        categoria = _columna(fila, ['Categoria', 'categoria', 'CATEGORIA', 'Categoría'])
+        operador = self.operadores.get(str(cliente or '').strip().lower(), self.operador_default)
+
+        return {
+            'fecha_instalacion': (leer_fecha(fecha) or datetime.date.today()).isoformat(),
+            'id_tecnico': tecnico.pk if tecnico else None,
+            'id_operador': operador.pk if operador else None,
+            'direccion': 'NA',
+            'numero_ot': _texto(numero_ot, 'NA'),
+            'producto_serie': _texto(serie, 'NA'),
+            'categoria': _texto(categoria, 'NA'),
+            'id_dr': self.dr.pk if self.dr else 1,
+            'serie_dr': '',
+            'eq_reutilizado': 'NA',
+            'eq_retirado': 'NA',
+            'metros_cable': '0',
+            'id_acometida': self.acometida.pk if self.acometida else 1,
+            'observaciones': _texto(descripcion, 'NA'),
+            'valor_dr': self.dr.valor_dr if self.dr else '0',
+            'valor_dr_empresa': self.dr.valor_dr_empresa if self.dr else '0',
+        }
+
+
+class MapeoProductos:
+    """Columnas de la planilla de productos -> datos de ImportadorProductos."""
+
+    def __init__(self, id_operador):
+        self.id_operador = id_operador
+        self.id_tecnico = self._tecnico_stock().pk
+        self.fecha = datetime.date.today().isoformat()
+
+    @staticmethod
+    def _tecnico_stock():
+        # Los productos importados quedan en el técnico "Stock"; se crea si no existe
+        for tecnico in _ordenados(models.Tecnicos):
+            if tecnico.nombre.lower() == 'stock':
+                return tecnico
+        tecnico, _ = models.Tecnicos.objects.get_or_create(
+            id_tecnico='STOCK001', defaults={'nombre': 'Stock', 'apellido': 'Stock'}
+        )
+        return tecnico
+
+    @staticmethod
+    def _cantidad(valor):
+        coincidencia = re.match(r'\s*([+-]?\d+)', str(valor if valor is not None else '0'))
+        return int(coincidencia.group(1)) if coincidencia else None
+
+    def __call__(self, fila):
+        return {
+            'categoria': fila.get('Categoria') or fila.get('Categoría') or '',
+            'nombre_producto': fila.get('Descripcion') or fila.get('Descripción') or '',
+            'producto_serie': fila.get('Nº serie') or fila.get('Nu serie') or fila.get('N° serie') or '',
+            'cantidad': self._cantidad(fila.get('Cantidad')),
+            'id_tecnico': self.id_tecnico,
+            'id_operador': self.id_operador,
+            'fecha_asignacion': self.fecha,
+        }
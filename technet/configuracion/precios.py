@@ -0,0 +1,137 @@
+"""
+Recálculo de los precios copiados en instalaciones cuando cambia un
+catálogo (trabajo en segundo plano 'recalcular_precios').
+
+Cada instalación guarda su valor_dr / valor_dr_empresa y su valor_orden /
+valor_orden_empresa. Al editar un DR o un tipo de orden, los valores
+nuevos se propagan por lotes de LOTE instalaciones, recorridas por clave
+primaria (índices de la migración 0010), cada lote en su propia
+transacción corta: nunca se bloquea toda la historia a la vez. Cada lote
+toma el precio vigente del catálogo en el mismo UPDATE, así dos trabajos
+sobre el mismo catálogo terminan con el último precio. Opcionalmente se
+limita a un rango de fechas (por ejemplo, el período sin facturar).
+
+Al eliminar un tipo de orden con muchas instalaciones, el mismo recorrido
+las deja sin tipo (y con valor_orden en 0) y al final borra el tipo.
+
+Las acometidas no entran: instalaciones no guarda su precio.
+"""
+from django.db import connection, transaction
+
+from . import models, resumenes, trabajos
+
+# Instalaciones por lote (y por transacción)
+LOTE = 2000
+
+# catálogo -> tabla, columna de la FK en instalaciones y columnas de precio
+# (con el mismo nombre en el catálogo y en instalaciones)
+CATALOGOS = {
+    'dr': ('dr', 'id_dr', ('valor_dr', 'valor_dr_empresa')),
+    'tipo_orden': ('tipodeordenes', 'id_tipo_orden', ('valor_orden', 'valor_orden_empresa')),
+}
+
+
+def encolar(catalogo, pk, desde=None, hasta=None, eliminar=False):
+    """Crea el trabajo que recalcula las instalaciones de un DR o tipo de orden."""
+    if catalogo not in CATALOGOS:
+        raise ValueError(f'Catálogo sin precios en instalaciones: {catalogo}')
+    return trabajos.crear('recalcular_precios', {
+        'catalogo': catalogo,
+        'id': pk,
+        'desde': desde.isoformat() if desde else None,
+        'hasta': hasta.isoformat() if hasta else None,
+        'eliminar': eliminar,
+    })
+
+
+def _condiciones(catalogo, parametros):
+    """WHERE (sobre el alias i) de las instalaciones a tocar, con sus parámetros."""
+    tabla, columna, precios = CATALOGOS[catalogo]
+    condiciones = [f'i.{columna} = %s']
+    valores = [parametros['id']]
+    if parametros.get('eliminar'):
+        # Deben quedar todas sin el tipo antes de borrarlo: sin rango de fechas
+        return condiciones, valores
+    condiciones.append(
+        f'EXISTS (SELECT 1 FROM {tabla} c WHERE c.{columna} = i.{columna} AND ('
+        + ' OR '.join(f'c.{precio} <> i.{precio}' for precio in precios)
+        + '))'
+    )
+    if parametros.get('desde'):
+        condiciones.append('i.fecha_instalacion >= %s')
+        valores.append(parametros['desde'])
+    if parametros.get('hasta'):
+        condiciones.append('i.fecha_instalacion <= %s')
+        valores.append(parametros['hasta'])
+    return condiciones, valores
+
+
+def _asignaciones(catalogo, eliminar):
+    tabla, columna, precios = CATALOGOS[catalogo]
+    if eliminar:
+        return ', '.join([f'{columna} = NULL', *(f'{precio} = 0' for precio in precios)])
+    return ', '.join(
+        f'{precio} = (SELECT c.{precio} FROM {tabla} c WHERE c.{columna} = instalaciones.{columna})'
+        for precio in precios
+    )
+
+
+def _lote(catalogo, parametros, ultimo):
+    """Actualiza el siguiente lote después de la clave `ultimo`; devuelve [(id, fecha)]."""
+    condiciones, valores = _condiciones(catalogo, parametros)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE instalaciones SET {_asignaciones(catalogo, parametros.get('eliminar'))}
+            WHERE id_instalacion IN (
+                SELECT i.id_instalacion FROM instalaciones i
+                WHERE {' AND '.join(condiciones)} AND i.id_instalacion > %s
+                ORDER BY i.id_instalacion
+                LIMIT %s
+            )
+            RETURNING id_instalacion, fecha_instalacion
+        """, [*valores, ultimo, LOTE])
+        return cursor.fetchall()
+
+
+def _contar(catalogo, parametros):
+    condiciones, valores = _condiciones(catalogo, parametros)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM instalaciones i WHERE {' AND '.join(condiciones)}", valores)
+        return cursor.fetchone()[0]
+
+
+def recalcular(trabajo):
+    """Función del trabajo 'recalcular_precios' (ver encolar)."""
+    parametros = trabajo.parametros
+    catalogo = parametros['catalogo']
+    campo_fecha = models.Instalaciones._meta.get_field('fecha_instalacion')
+    trabajos.avance(trabajo, total=_contar(catalogo, parametros))
+
+    actualizadas = 0
+    ultimo = 0
+    while True:
+        with transaction.atomic():
+            filas = _lote(catalogo, parametros, ultimo)
+            resumenes.refrescar_dias({campo_fecha.to_python(fecha) for _, fecha in filas})
+        if not filas:
+            break
+        actualizadas += len(filas)
+        ultimo = max(pk for pk, _ in filas)
+        trabajos.avance(trabajo, procesadas=actualizadas)
+
+    resultado = {'actualizadas': actualizadas}
+    if parametros.get('eliminar'):
+        with transaction.atomic():
+            # Las que tomaron el tipo mientras tanto (pocas): en la misma transacción que el borrado
+            # (un solo refresco al final: los días se bloquean de una vez y en orden)
+            fechas = set()
+            filas = _lote(catalogo, parametros, 0)
+            while filas:
+                fechas.update(campo_fecha.to_python(fecha) for _, fecha in filas)
+                actualizadas += len(filas)
+                filas = _lote(catalogo, parametros, max(pk for pk, _ in filas))
+            resumenes.refrescar_dias(fechas)
+            models.Tipodeordenes.objects.filter(pk=parametros['id']).delete()
+        resultado = {'actualizadas': actualizadas, 'eliminado': True}
+        trabajos.avance(trabajo, procesadas=actualizadas)
+    return resultado
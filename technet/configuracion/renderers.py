@@ -0,0 +1,96 @@
+"""
+Formatos de respuesta alternativos para los listados.
+
+- columnar: JSON con los nombres de columna una sola vez y las filas como
+  arreglos de valores (?format=columnar o Accept: application/vnd.technet.columnar+json).
+- msgpack: MessagePack (?format=msgpack o Accept: application/msgpack), solo
+  si el paquete msgpack está instalado.
+
+El JSON normal usa orjson cuando está instalado, con la misma salida que
+el JSONRenderer de DRF.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependencia opcional
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+def a_columnas(filas):
+    """[{a: 1, b: 2}, ...] -> {'columns': ['a', 'b'], 'rows': [[1, 2], ...]}"""
+    if not filas:
+        return {'columns': [], 'rows': []}
+    columnas = list(filas[0].keys())
+    return {
+        'columns': columnas,
+        'rows': [[fila.get(c) for c in columnas] for fila in filas],
+    }
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """
+    JSONRenderer con orjson. Los tipos que orjson no conoce (Decimal,
+    fechas con hora, textos perezosos...) pasan por el codificador de DRF,
+    así que los bytes son los mismos; con sangría o ante cualquier error se
+    usa el renderer original.
+    """
+    opciones_orjson = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.opciones_orjson)
+        except (TypeError, ValueError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Igual que DRF: U+2028 / U+2029 escapados para poder incrustar el JSON en <script>
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ColumnarJSONRenderer(JSONRapidoRenderer):
+    media_type = 'application/vnd.technet.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list):
+            data = a_columnas(data)
+        elif isinstance(data, dict) and isinstance(data.get('results'), list):
+            data = dict(data, results=a_columnas(data['results']))
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self._por_defecto, use_bin_type=True)
+
+    @staticmethod
+    def _por_defecto(valor):
+        # Decimal, fechas, UUID, etc.: mismo texto que en la respuesta JSON
+        if hasattr(valor, 'isoformat'):
+            return valor.isoformat()
+        return str(valor)
+
+
+# Renderers de los listados: los de la configuración global (con el JSON
+# rápido en lugar del de DRF) más los formatos compactos
+RENDERERS_LISTADO = [
+    JSONRapidoRenderer if clase is JSONRenderer else clase
+    for clase in api_settings.DEFAULT_RENDERER_CLASSES
+] + [ColumnarJSONRenderer]
+if msgpack is not None:
+    RENDERERS_LISTADO.append(MessagePackRenderer)
@@ -0,0 +1,152 @@
+"""
+Mantenimiento de las tablas de resumen de instalaciones.
+
+Cada escritura sobre instalaciones llama a `refrescar_dias` con las fechas
+tocadas: se recalculan solo esos días desde la tabla base y, a partir del
+resumen diario, los meses que los contienen. Los meses cerrados nunca se
+vuelven a recorrer.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from . import models
+
+DIMENSIONES = ('id_tecnico', 'id_operador', 'id_acometida', 'id_tipo_orden')
+MEDIDAS = (
+    'total',
+    'valor_total_empresa',
+    'metros_cable',
+    'valor_dr',
+    'valor_dr_empresa',
+    'valor_orden',
+    'valor_orden_empresa',
+)
+
+# Cantidad de días que se recalculan por consulta
+DIAS_POR_LOTE = 62
+
+
+def _bloquear(meses):
+    """
+    Bloquea (hasta el fin de la transacción) los meses a recalcular, para
+    que dos escrituras del mismo mes no inserten filas de resumen
+    duplicadas. El mes cubre sus días: como el resumen mensual se recalcula
+    igual, bloquear también cada día no dejaría avanzar a más escrituras y
+    llenaría la tabla de bloqueos (max_locks_per_transaction) al tocar
+    años de fechas en una transacción. Se bloquean en orden: dos refrescos
+    nunca se bloquean en orden cruzado.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for mes in sorted(meses):
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s), %s)", ['resumen_mes', mes.toordinal()])
+
+
+def _inicio_mes(fecha):
+    return fecha.replace(day=1)
+
+
+def _siguiente_mes(fecha):
+    return date(fecha.year + fecha.month // 12, fecha.month % 12 + 1, 1)
+
+
+def _filas_resumen(filas, modelo, columna_fecha):
+    return [
+        modelo(**{
+            columna_fecha: fila[columna_fecha],
+            **{d: fila[d] for d in DIMENSIONES},
+            'cantidad': fila['cantidad'],
+            **{m: fila[m] or 0 for m in MEDIDAS},
+        })
+        for fila in filas
+    ]
+
+
+def _agregar_dias(fechas):
+    return (
+        models.Instalaciones.objects
+        .filter(fecha_instalacion__in=fechas)
+        .values(*DIMENSIONES, fecha=F('fecha_instalacion'))
+        .annotate(cantidad=Count('id_instalacion'), **{m: Sum(m) for m in MEDIDAS})
+        .order_by()
+    )
+
+
+def _refrescar_meses(meses):
+    for mes in sorted(meses):
+        models.ResumenInstalacionesMensual.objects.filter(mes=mes).delete()
+        filas = (
+            models.ResumenInstalacionesDiario.objects
+            .filter(fecha__gte=mes, fecha__lt=_siguiente_mes(mes))
+            .values(*DIMENSIONES)
+            .annotate(cantidad=Sum('cantidad'), **{m: Sum(m) for m in MEDIDAS})
+            .order_by()
+        )
+        models.ResumenInstalacionesMensual.objects.bulk_create(
+            _filas_resumen([dict(f, mes=mes) for f in filas], models.ResumenInstalacionesMensual, 'mes')
+        )
+
+
+def refrescar_dias(fechas):
+    """
+    Recalcula el resumen diario de las fechas indicadas y el mensual de
+    los meses que las contienen.
+    """
+    fechas = sorted({f for f in fechas if f})
+    if not fechas:
+        return
+    meses = {_inicio_mes(f) for f in fechas}
+    with transaction.atomic():
+        _bloquear(meses)
+        for i in range(0, len(fechas), DIAS_POR_LOTE):
+            lote = fechas[i:i + DIAS_POR_LOTE]
+            models.ResumenInstalacionesDiario.objects.filter(fecha__in=lote).delete()
+            models.ResumenInstalacionesDiario.objects.bulk_create(
+                _filas_resumen(_agregar_dias(lote), models.ResumenInstalacionesDiario, 'fecha')
+            )
+        _refrescar_meses(meses)
+
+
+def fechas_de(queryset):
+    """Fechas distintas de un queryset de instalaciones."""
+    return list(queryset.order_by().values_list('fecha_instalacion', flat=True).distinct())
+
+
+def reconstruir(stdout=None):
+    """
+    Vacía y vuelve a calcular todas las tablas de resumen, mes a mes para
+    acotar la memoria. Devuelve la cantidad de meses procesados.
+    """
+    meses = list(
+        models.Instalaciones.objects
+        .annotate(mes=TruncMonth('fecha_instalacion'))
+        .order_by('mes')
+        .values_list('mes', flat=True)
+        .distinct()
+    )
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Excluye los refrescos por día durante la reconstrucción completa
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "LOCK TABLE resumen_instalaciones_diario, resumen_instalaciones_mensual IN EXCLUSIVE MODE"
+                )
+        models.ResumenInstalacionesDiario.objects.all().delete()
+        models.ResumenInstalacionesMensual.objects.all().delete()
+        for mes in meses:
+            dias = fechas_de(models.Instalaciones.objects.filter(
+                fecha_instalacion__gte=mes,
+                fecha_instalacion__lt=_siguiente_mes(mes),
+            ))
+            models.ResumenInstalacionesDiario.objects.bulk_create(
+                _filas_resumen(_agregar_dias(dias), models.ResumenInstalacionesDiario, 'fecha'),
+                batch_size=1000,
+            )
+            _refrescar_meses([mes])
+            if stdout is not None:
+                stdout.write(f'  {mes:%Y-%m}: {len(dias)} días')
+    return len(meses)
@@ -1,34 +1,98 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Model
 from rest_framework import serializers
+from . import catalogos
 from . import models
 
 
-class AcometidasSerializers (serializers.ModelSerializer):
+class CamposDinamicosMixin:
+    """
+    Permite limitar los campos de salida con los argumentos `fields` (solo
+    estos) u `omit` (todos menos estos). Los listados los toman de los
+    parámetros ?fields= / ?omit=; los nombres desconocidos se ignoran.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for nombre in set(self.fields) - set(fields):
+                self.fields.pop(nombre)
+        for nombre in omit or ():
+            self.fields.pop(nombre, None)
+
+class SerieProductoField(serializers.SlugRelatedField):
+    """
+    instalaciones.producto_serie es una FK a productos.producto_serie: el
+    valor de salida ya está en la propia columna, así que se lee sin cargar
+    el producto (SlugRelatedField haría una consulta por fila).
+    """
+    def __init__(self, **kwargs):
+        kwargs.setdefault('slug_field', 'producto_serie')
+        kwargs.setdefault('queryset', models.Productos.objects.all())
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if isinstance(instance, Model):
+            return instance.serializable_value(self.source_attrs[-1])
+        return super().get_attribute(instance)
+
+    def to_representation(self, value):
+        # Texto de la columna, o el producto cuando se serializa validated_data
+        return getattr(value, self.slug_field, value)
+
+class CatalogoRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField que resuelve las FK a catálogos (técnicos,
+    operadores, tipos de orden, DR, acometidas) con la caché en memoria de
+    configuracion.catalogos, sin consulta. Las demás FK van a la base.
+    """
+    def to_internal_value(self, data):
+        modelo = self.get_queryset().model
+        if modelo not in catalogos.MODELOS:
+            return super().to_internal_value(data)
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = modelo._meta.pk.to_python(data)
+        except DjangoValidationError:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return catalogos.obtener(modelo, pk)
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+class AcometidasSerializers (CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Acometidas
         fields = '__all__'
 
-class DescuentosSerializers (serializers.ModelSerializer):
+class DescuentosSerializers (CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Descuentos
         fields = '__all__'
 
-class DrSerializers (serializers.ModelSerializer):
+class DrSerializers (CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Dr
         fields = '__all__'
 
-class InstalacionesSerializers (serializers.ModelSerializer):
+class InstalacionesSerializers (CamposDinamicosMixin, serializers.ModelSerializer):
+    serializer_related_field = CatalogoRelatedField
     # Hacer que los campos generados sean opcionales y de solo lectura
     total = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True, required=False)
     instalacion_compartida = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True, required=False)
     valor_total_empresa = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True, required=False)
     # id_tipo_orden es opcional (puede ser NULL)
-    id_tipo_orden = serializers.PrimaryKeyRelatedField(
+    id_tipo_orden = CatalogoRelatedField(
         queryset=models.Tipodeordenes.objects.all(),
         allow_null=True,
         required=False,
         default=None
     )
+    producto_serie = SerieProductoField()
     
     class Meta:
         model = models.Instalaciones
@@ -48,34 +112,84 @@ class InstalacionesSerializers (serializers.ModelSerializer):
         validated_data.pop('valor_total_empresa', None)
         return super().update(instance, validated_data)
 
-class OperadoresSerializers (serializers.ModelSerializer):
+class InstalacionesListaSerializers (CamposDinamicosMixin, serializers.ModelSerializer):
+    # Serializer compacto de solo lectura para la tabla de instalaciones (?vista=compacta)
+    producto_serie = SerieProductoField(read_only=True, queryset=None)
+
+    class Meta:
+        model = models.Instalaciones
+        fields = [
+            'id_instalacion',
+            'numero_ot',
+            'fecha_instalacion',
+            'direccion',
+            'id_tecnico',
+            'id_operador',
+            'producto_serie',
+            'total',
+            'valor_total_empresa',
+        ]
+        read_only_fields = fields
+
+class OperadoresSerializers (CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Operadores
         fields = '__all__'
 
-class ProductosSerializers (serializers.ModelSerializer):
+class ProductosSerializers (CamposDinamicosMixin, serializers.ModelSerializer):
+    serializer_related_field = CatalogoRelatedField
+
     class Meta:
         model = models.Productos
         fields = '__all__'
     
     def validate(self, data):
         """
-        Validar que id_operador sea proporcionado (obligatorio)
+        Validar que id_operador sea proporcionado (obligatorio); en una
+        edición parcial sin id_operador se conserva el que ya tiene
         """
+        if self.partial and 'id_operador' not in data:
+            return data
         if not data.get('id_operador'):
             raise serializers.ValidationError(
                 {"id_operador": "El operador es obligatorio para importar productos."}
             )
         return data
 
-class TecnicosSerializers (serializers.ModelSerializer):
+class TecnicosSerializers (CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Tecnicos
         fields = '__all__'
 
-class TipoOrdenSerializers (serializers.ModelSerializer):
+class TipoOrdenSerializers (CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Tipodeordenes
         fields = '__all__'
 
 
+
+class TrabajosSerializers (serializers.ModelSerializer):
+    """
+    Estado de un trabajo en segundo plano, con su avance: porcentaje (si se
+    conoce el total) y filas por segundo desde que empezó.
+    """
+    porcentaje = serializers.SerializerMethodField()
+    filas_por_segundo = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.Trabajo
+        exclude = ('archivo', 'parametros')
+
+    def get_porcentaje(self, obj):
+        if obj.estado == models.Trabajo.TERMINADO:
+            return 100
+        if not obj.total:
+            return None
+        return min(100, round(obj.procesadas * 100 / obj.total, 1))
+
+    def get_filas_por_segundo(self, obj):
+        fin = obj.terminado_en or obj.actualizado_en
+        if obj.iniciado_en is None or fin is None:
+            return None
+        segundos = (fin - obj.iniciado_en).total_seconds()
+        return round(obj.procesadas / segundos, 1) if segundos > 0 else None
@@ -0,0 +1,92 @@
+"""
+Sincronización incremental de listados (?since=<token>).
+
+Los triggers de la migración 0008 guardan en cada fila de instalaciones,
+productos y descuentos la transacción que la escribió (cambio_xid) y
+registran los borrados en eliminaciones. El token es el xmin del snapshot
+tomado antes de leer: las escrituras que la lectura no vio, confirmadas
+antes o después, tienen cambio_xid >= token. Una fila puede volver a
+enviarse en la siguiente sincronización, pero nunca se pierde.
+
+Los borrados se guardan SINCRONIZACION_RETENCION_DIAS días (purgar, desde
+los comandos procesar_trabajos o purgar_sincronizacion). Un token anterior
+al último borrado descartado de la tabla ya no se acepta: el cliente debe
+vaciar sus datos y sincronizar de nuevo con ?since= vacío.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.db.models import BigIntegerField
+from django.db.models.expressions import RawSQL
+
+from . import models
+
+
+def token_actual():
+    """Token para la próxima sincronización; se pide antes de leer los datos."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        return str(cursor.fetchone()[0])
+
+
+def leer_token(valor):
+    """None para '?since=' vacío (carga completa); ValueError si es inválido."""
+    if not valor:
+        return None
+    token = int(valor)
+    if token < 0:
+        raise ValueError(valor)
+    return token
+
+
+def cambiados(queryset, desde):
+    """Filas del queryset escritas por transacciones >= desde."""
+    columna = f'"{queryset.model._meta.db_table}"."cambio_xid"'
+    return queryset.annotate(
+        cambio_xid=RawSQL(columna, [], output_field=BigIntegerField())
+    ).filter(cambio_xid__gte=desde)
+
+
+def eliminados(modelo, desde):
+    """Claves de las filas de `modelo` borradas por transacciones >= desde."""
+    return set(
+        models.Eliminacion.objects.filter(
+            tabla=modelo._meta.db_table, cambio_xid__gte=desde
+        ).values_list('id_fila', flat=True)
+    )
+
+
+def vencido(modelo, desde):
+    """True si el token `desde` es anterior a los borrados ya descartados de la tabla."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT cambio_xid FROM sincronizacion_horizonte WHERE tabla = %s",
+            [modelo._meta.db_table],
+        )
+        fila = cursor.fetchone()
+    return fila is not None and desde < fila[0]
+
+
+def purgar():
+    """
+    Descarta los borrados más viejos que la retención y avanza el
+    horizonte de cada tabla; devuelve la cantidad descartada.
+    """
+    if connection.vendor != 'postgresql':
+        return 0
+    limite = timezone.now() - timedelta(days=getattr(settings, 'SINCRONIZACION_RETENCION_DIAS', 30))
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            WITH purgadas AS (
+                DELETE FROM eliminaciones WHERE eliminado_en < %s RETURNING tabla, cambio_xid
+            ), horizontes AS (
+                INSERT INTO sincronizacion_horizonte (tabla, cambio_xid)
+                SELECT tabla, max(cambio_xid) + 1 FROM purgadas GROUP BY tabla
+                ON CONFLICT (tabla) DO UPDATE
+                SET cambio_xid = GREATEST(sincronizacion_horizonte.cambio_xid, EXCLUDED.cambio_xid)
+            )
+            SELECT count(*) FROM purgadas
+        """, [limite])
+        return cursor.fetchone()[0]
@@ -1,3 +1,1573 @@
-from django.test import TestCase
+import datetime
+import decimal
+import gzip
+import importlib
+import io
+import json
+import os
+import pkgutil
+import tempfile
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DataError, DatabaseError, IntegrityError, connection, migrations
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import (
+    catalogos, escritura_instalaciones, importacion, lectura_rapida, middleware, models, renderers, resumenes,
+    serializers, sincronizacion, trabajos,
+)
+from .lector_sql import LectorSQL
+from .pagination import KeysetPagination
+from .views import productos_libres
+
+
+# En PostgreSQL el esquema (columnas y triggers) sale de las migraciones
+EN_POSTGRESQL = connection.vendor == 'postgresql'
+
+
+def _migraciones():
+    paquete = importlib.import_module('configuracion.migrations')
+    nombres = sorted(nombre for _, nombre, _ in pkgutil.iter_modules(paquete.__path__))
+    return [importlib.import_module(f'configuracion.migrations.{nombre}').Migration for nombre in nombres]
+
+
+def setUpModule():
+    """
+    Las tablas de configuracion no son administradas (managed=False) y sus
+    migraciones son SQL de PostgreSQL sobre tablas existentes, así que
+    manage.py test no las aplica (MIGRATION_MODULES). En PostgreSQL se
+    crean las tablas de 0001 y se ejecuta el SQL de las migraciones
+    siguientes en orden, con sus triggers e índices; en otras bases se
+    crean las tablas de todos los modelos, salvo las de Django que ya creó
+    migrate.
+    """
+    if not EN_POSTGRESQL:
+        existentes = set(connection.introspection.table_names())
+        with connection.schema_editor() as editor:
+            for modelo in apps.get_app_config('configuracion').get_models():
+                if modelo._meta.db_table not in existentes:
+                    editor.create_model(modelo)
+        return
+
+    inicial, *siguientes = _migraciones()
+    with connection.schema_editor() as editor:
+        for operacion in inicial.operations:
+            editor.create_model(apps.get_model('configuracion', operacion.name))
+    with connection.cursor() as cursor:
+        for migracion in siguientes:
+            for operacion in migracion.operations:
+                if isinstance(operacion, migrations.RunSQL):
+                    for sentencia in [operacion.sql] if isinstance(operacion.sql, str) else operacion.sql:
+                        cursor.execute(sentencia)
+
+
+FECHA = datetime.date(2025, 1, 1)
+
+
+def crear_catalogos(destino):
+    """Técnicos, operadores, DR, acometida y tipo de orden de prueba como atributos de `destino`."""
+    destino.tecnico = models.Tecnicos.objects.create(nombre='Ana', apellido='Pérez', id_tecnico='T1')
+    destino.otro_tecnico = models.Tecnicos.objects.create(nombre='Luis', apellido='Gómez', id_tecnico='T2')
+    destino.operador = models.Operadores.objects.create(nombre_operador='OP1')
+    destino.otro_operador = models.Operadores.objects.create(nombre_operador='OP2')
+    destino.dr = models.Dr.objects.create(nombre_dr='D1', valor_dr=5, valor_dr_empresa=7)
+    destino.acometida = models.Acometidas.objects.create(nombre_acometida='A1', precio=10)
+    destino.tipo_orden = models.Tipodeordenes.objects.create(
+        nombre_orden='Alta', valor_orden=12, valor_orden_empresa=15,
+    )
+
+
+def crear_producto(serie, tecnico, operador=None, **campos):
+    return models.Productos.objects.create(**{
+        'categoria': 'ONT', 'nombre_producto': 'Router', 'producto_serie': serie, 'cantidad': 2,
+        'id_tecnico': tecnico, 'id_operador': operador, 'fecha_asignacion': FECHA, **campos,
+    })
+
+
+def crear_instalacion(catalogos, numero_ot, producto, **campos):
+    return models.Instalaciones.objects.create(**{
+        'fecha_instalacion': FECHA, 'id_tecnico': catalogos.tecnico, 'id_operador': catalogos.operador,
+        'direccion': 'Calle 1', 'numero_ot': numero_ot, 'producto_serie': producto,
+        'id_dr': catalogos.dr, 'metros_cable': 0, 'id_acometida': catalogos.acometida,
+        'valor_dr': 5, 'valor_orden': 0, 'valor_orden_empresa': 0, 'valor_dr_empresa': 7,
+        'total': 5, 'valor_total_empresa': 7, **campos,
+    })
+
+
+class ProductosLibresTests(TestCase):
+    """
+    Listado de productos sin instalación. En PostgreSQL lee la columna
+    productos.asignado de la migración 0011; en otras bases, la búsqueda de
+    la serie en instalaciones.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        productos = {}
+        for serie, tecnico, operador in (
+            ('S1', cls.tecnico, cls.operador),
+            ('S2', cls.tecnico, cls.operador),
+            ('S3', cls.tecnico, cls.otro_operador),
+            ('S4', cls.otro_tecnico, cls.operador),
+        ):
+            productos[serie] = crear_producto(serie, tecnico, operador)
+        crear_instalacion(cls, 'OT1', productos['S1'])
+
+    def setUp(self):
+        # Los COUNT de la paginación se guardan en caché con la SQL como clave
+        cache.clear()
+        self.client = APIClient()
+
+    def _series(self, **params):
+        respuesta = self.client.get('/productos/', params)
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['count'], len(datos['results']))
+        return sorted(producto['producto_serie'] for producto in datos['results'])
+
+    def test_listado_excluye_series_asignadas(self):
+        self.assertEqual(self._series(), ['S2', 'S3', 'S4'])
+
+    def test_include_assigned(self):
+        self.assertEqual(self._series(include_assigned='1'), ['S1', 'S2', 'S3', 'S4'])
+
+    def test_filtros_por_tecnico_y_operador(self):
+        self.assertEqual(self._series(id_tecnico=self.tecnico.pk), ['S2', 'S3'])
+        self.assertEqual(self._series(id_operador=self.operador.pk), ['S2', 'S4'])
+        self.assertEqual(self._series(id_tecnico=self.tecnico.pk, id_operador=self.operador.pk), ['S2'])
+
+    def test_cursor(self):
+        respuesta = self.client.get('/productos/', {'cursor': '', 'id_tecnico': self.tecnico.pk})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(sorted(p['producto_serie'] for p in respuesta.json()['results']), ['S2', 'S3'])
+
+    def test_liberar_serie(self):
+        models.Instalaciones.objects.filter(numero_ot='OT1').delete()
+        self.assertEqual(self._series(id_tecnico=self.tecnico.pk), ['S1', 'S2', 'S3'])
+
+    def test_dashboard_stock_disponible(self):
+        respuesta = self.client.get('/dashboard/resumen/', {'fecha_inicio': '2025-01-01', 'fecha_fin': '2025-01-31'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['total_productos'], 6)
+        respuesta = self.client.get('/dashboard/resumen/', {
+            'fecha_inicio': '2025-01-01', 'fecha_fin': '2025-01-31', 'id_operador': self.otro_operador.pk,
+        })
+        self.assertEqual(respuesta.json()['total_productos'], 2)
+
+
+@unittest.skipUnless(EN_POSTGRESQL, 'productos.asignado y sus triggers son de PostgreSQL (migración 0011)')
+class ProductoAsignadoTests(TestCase):
+    """
+    productos.asignado: el trigger BEFORE de productos lo recalcula cada
+    vez que marcar_producto_asignado (0008) toca el producto al asignar o
+    liberar su serie.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        cls.s1 = crear_producto('S1', cls.tecnico, cls.operador)
+        cls.s2 = crear_producto('S2', cls.tecnico, cls.operador)
+
+    def _asignado(self, serie):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT asignado FROM productos WHERE producto_serie = %s", [serie])
+            return cursor.fetchone()[0]
+
+    def test_alta_de_instalacion(self):
+        self.assertFalse(self._asignado('S1'))
+        crear_instalacion(self, 'OT1', self.s1)
+        self.assertTrue(self._asignado('S1'))
+        self.assertFalse(self._asignado('S2'))
+
+    def test_reasignacion(self):
+        instalacion = crear_instalacion(self, 'OT1', self.s1)
+        instalacion.producto_serie = self.s2
+        instalacion.save()
+        self.assertFalse(self._asignado('S1'))
+        self.assertTrue(self._asignado('S2'))
+
+    def test_borrado(self):
+        crear_instalacion(self, 'OT1', self.s1)
+        crear_instalacion(self, 'OT2', self.s1)
+        # Una serie en dos instalaciones sigue asignada hasta liberar la última
+        models.Instalaciones.objects.filter(numero_ot='OT1').delete()
+        self.assertTrue(self._asignado('S1'))
+        models.Instalaciones.objects.filter(numero_ot='OT2').delete()
+        self.assertFalse(self._asignado('S1'))
+
+    def test_listado_filtra_por_la_columna(self):
+        crear_instalacion(self, 'OT1', self.s1)
+        queryset = productos_libres(models.Productos.objects.all())
+        self.assertIn('"productos"."asignado"', str(queryset.query))
+        self.assertEqual(list(queryset.values_list('producto_serie', flat=True)), ['S2'])
+
+    def test_indices_parciales(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes "
+                "WHERE tablename = 'productos' AND indexname LIKE 'productos_libres%%'"
+            )
+            indices = dict(cursor.fetchall())
+        self.assertEqual(
+            sorted(indices),
+            ['productos_libres_idx', 'productos_libres_operador_idx', 'productos_libres_tecnico_idx'],
+        )
+        for definicion in indices.values():
+            self.assertIn('WHERE (NOT asignado)', definicion)
+
+
+class LectorSQLTests(unittest.TestCase):
+    """Separación en sentencias de configuracion.lector_sql y posiciones para reanudar."""
+
+    def _sentencias(self, texto, **kwargs):
+        datos = texto.encode('utf-8')
+        lector = LectorSQL(io.BytesIO(datos), **kwargs)
+        resultado = []
+        for sentencia in lector.sentencias():
+            resultado.append((sentencia.sql, sentencia.linea))
+            # `fin` es el byte siguiente al ';' de la sentencia
+            if not sentencia.meta:
+                self.assertEqual(datos[:sentencia.fin][-1:], b';')
+        return resultado
+
+    def test_varias_sentencias_por_linea(self):
+        self.assertEqual(self._sentencias('SELECT 1; SELECT 2;\nSELECT\n  3;\n'), [
+            ('SELECT 1', 1), ('SELECT 2', 1), ('SELECT\n  3', 2),
+        ])
+
+    def test_comillas(self):
+        self.assertEqual(self._sentencias(
+            "INSERT INTO t VALUES ('a;b', 'it''s;');\nSELECT \"x;y\" FROM t;\n"
+        ), [("INSERT INTO t VALUES ('a;b', 'it''s;')", 1), ('SELECT "x;y" FROM t', 2)])
+
+    def test_cadenas_con_escapes(self):
+        self.assertEqual(self._sentencias("SELECT E'a\\'b;c';\nSELECT e'\\\\';\nSELECT 'x\\';\n"), [
+            ("SELECT E'a\\'b;c'", 1), ("SELECT e'\\\\'", 2), ("SELECT 'x\\'", 3),
+        ])
+
+    def test_standard_conforming_strings(self):
+        self.assertEqual(self._sentencias(
+            "SET standard_conforming_strings = off;\nSELECT 'a\\'b;';\n"
+            "SET standard_conforming_strings = on;\nSELECT 'c\\';\n"
+        ), [
+            ('SET standard_conforming_strings = off', 1), ("SELECT 'a\\'b;'", 2),
+            ('SET standard_conforming_strings = on', 3), ("SELECT 'c\\'", 4),
+        ])
+
+    def test_bloques_con_dolar(self):
+        self.assertEqual(self._sentencias(
+            "CREATE FUNCTION f() RETURNS int AS $$ SELECT 1; $$ LANGUAGE sql;\n"
+            "DO $cuerpo$\nBEGIN\n  PERFORM 'x;$$;';\nEND\n$cuerpo$;\n"
+            "SELECT a$b FROM t;\n"
+        ), [
+            ('CREATE FUNCTION f() RETURNS int AS $$ SELECT 1; $$ LANGUAGE sql', 1),
+            ("DO $cuerpo$\nBEGIN\n  PERFORM 'x;$$;';\nEND\n$cuerpo$", 2),
+            ('SELECT a$b FROM t', 7),
+        ])
+
+    def test_comentarios_anidados(self):
+        self.assertEqual(self._sentencias(
+            "/* uno /* dos; */ tres; */ SELECT 1; -- fin; no\n/* a\n/* b; */\n; */\nSELECT 'ñ';\n"
+        ), [('SELECT 1', 1), ("SELECT 'ñ'", 5)])
+
+    def test_ultima_sentencia_sin_punto_y_coma(self):
+        datos = b'SELECT 1;\nSELECT 2\n'
+        sentencias = [(s.sql, s.linea, s.fin) for s in LectorSQL(io.BytesIO(datos)).sentencias()]
+        self.assertEqual(sentencias, [('SELECT 1', 1, 9), ('SELECT 2', 2, len(datos))])
+
+    def test_metacomandos(self):
+        self.assertEqual(self._sentencias('\\connect prueba\nSELECT 1;\n'), [
+            ('\\connect prueba', 1), ('SELECT 1', 2),
+        ])
+
+    def test_copy_desde_stdin(self):
+        datos = 'COPY t (a, b) FROM stdin;\n1\tuno;\n2\tdos\n\\.\nSELECT 2;\n'.encode('utf-8')
+        lector = LectorSQL(io.BytesIO(datos))
+        sentencias = lector.sentencias()
+        copy = next(sentencias)
+        self.assertEqual(copy.sql, 'COPY t (a, b) FROM stdin')
+        self.assertEqual(copy.datos.read(), b'1\tuno;\n2\tdos\n')
+        # Reanudar después del COPY es después de la línea \.
+        self.assertEqual(lector.fin, datos.index(b'SELECT 2'))
+        siguiente = next(sentencias)
+        self.assertEqual((siguiente.sql, siguiente.linea), ('SELECT 2', 5))
+
+    def test_copy_sin_leer_sus_datos(self):
+        self.assertEqual(
+            self._sentencias('COPY t FROM stdin;\nSELECT 1;\n\\.\nSELECT 2;\n'),
+            [('COPY t FROM stdin', 1), ('SELECT 2', 4)],
+        )
+
+    def test_posiciones_en_bytes(self):
+        datos = "SELECT 'ñandú';\nSELECT 2; SELECT 3;\n".encode('utf-8')
+        lector = LectorSQL(io.BytesIO(datos))
+        fines = [(sentencia.fin, lector.linea_fin) for sentencia in lector.sentencias()]
+        self.assertEqual(fines, [
+            (datos.index(b';') + 1, 1),
+            (datos.index(b'SELECT 2;') + 9, 2),
+            (len(datos) - 1, 2),
+        ])
+
+    def test_reanudar_desde_una_posicion(self):
+        datos = "SELECT 'a;b'; SELECT 2;\nDO $$ BEGIN; END $$;\nSELECT 4;\n".encode('utf-8')
+        completas = [(s.sql, s.linea) for s in LectorSQL(io.BytesIO(datos)).sentencias()]
+        for corte in range(1, len(completas)):
+            lector = LectorSQL(io.BytesIO(datos))
+            sentencias = lector.sentencias()
+            for _ in range(corte):
+                next(sentencias)
+            reanudado = LectorSQL(io.BytesIO(datos), posicion=lector.fin, linea=lector.linea_fin)
+            self.assertEqual([(s.sql, s.linea) for s in reanudado.sentencias()], completas[corte:])
+
+
+class ImportarSQLTests(TestCase):
+    """Comando importar_sql: lotes confirmados, avance en .progreso y --reanudar."""
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, 'volcado.sql')
+
+    def _escribir(self, texto):
+        with open(self.ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(texto)
+
+    def _importar(self, **opciones):
+        salida = io.StringIO()
+        call_command('importar_sql', self.ruta, stdout=salida, **opciones)
+        return salida.getvalue()
+
+    def _filas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id, nombre FROM prueba_sql ORDER BY id')
+            return cursor.fetchall()
+
+    def _progreso(self):
+        with open(f'{self.ruta}.progreso', encoding='utf-8') as archivo:
+            return json.load(archivo)
+
+    def test_reanudar_tras_un_error(self):
+        inicio = (
+            'CREATE TABLE prueba_sql (id integer, nombre text);\n'
+            "INSERT INTO prueba_sql VALUES (1, 'uno;');\n"
+        )
+        self._escribir(inicio + "INSERT INTO falta VALUES (2);\nINSERT INTO prueba_sql VALUES (3, 'tres');\n")
+        salida = self._importar(lote=1)
+        self.assertIn('Error en la sentencia de la línea 3', salida)
+        progreso = self._progreso()
+        self.assertEqual(progreso['sentencias'], 2)
+        self.assertEqual(progreso['posicion'], len(inicio.encode('utf-8')) - 1)
+        self.assertEqual(progreso['linea'], 2)
+        self.assertEqual(self._filas(), [(1, 'uno;')])
+
+        # Corregida la sentencia que falló, se sigue desde el último lote confirmado
+        self._escribir(inicio + "INSERT INTO prueba_sql VALUES (2, 'dos');\nINSERT INTO prueba_sql VALUES (3, 'tres');\n")
+        salida = self._importar(lote=1, reanudar=True)
+        self.assertIn('Reanudando desde la línea 2', salida)
+        self.assertEqual(self._filas(), [(1, 'uno;'), (2, 'dos'), (3, 'tres')])
+        self.assertFalse(os.path.exists(f'{self.ruta}.progreso'))
+
+    def test_el_lote_revertido_no_cuenta(self):
+        self._escribir(
+            'CREATE TABLE prueba_sql (id integer, nombre text);\n'
+            "INSERT INTO prueba_sql VALUES (1, 'uno');\n"
+            "INSERT INTO prueba_sql VALUES (2, 'dos');\n"
+            'INSERT INTO falta VALUES (3);\n'
+        )
+        self._importar(lote=2)
+        # El segundo lote (fila 2 y la sentencia que falla) se revirtió entero
+        self.assertEqual(self._progreso()['sentencias'], 2)
+        self.assertEqual(self._filas(), [(1, 'uno')])
+
+    def test_sin_reanudar_empieza_de_cero(self):
+        self._escribir("CREATE TABLE prueba_sql (id integer, nombre text);\nINSERT INTO prueba_sql VALUES (1, 'uno');\n")
+        with open(f'{self.ruta}.progreso', 'w', encoding='utf-8') as archivo:
+            json.dump({'posicion': 10 ** 6, 'linea': 99, 'sentencias': 5, 'sesion': []}, archivo)
+        salida = self._importar()
+        self.assertIn('use --reanudar para continuar', salida)
+        self.assertEqual(self._filas(), [(1, 'uno')])
+
+    @unittest.skipUnless(EN_POSTGRESQL, 'SET y COPY ... FROM stdin son de PostgreSQL')
+    def test_reanudar_repite_los_ajustes_de_sesion(self):
+        inicio = (
+            "SET application_name = 'importar_sql_prueba';\n"
+            'CREATE TABLE prueba_sql (id integer, nombre text);\n'
+            'COPY prueba_sql (id, nombre) FROM stdin;\n1\tuno\n\\.\n'
+        )
+        self._escribir(inicio + 'INSERT INTO falta VALUES (2);\n')
+        self._importar(lote=1)
+        progreso = self._progreso()
+        self.assertEqual(progreso['sesion'], ["SET application_name = 'importar_sql_prueba'"])
+        self.assertEqual(progreso['posicion'], len(inicio.encode('utf-8')))
+
+        # Otro proceso: la sesión empieza sin los SET del volcado
+        with connection.cursor() as cursor:
+            cursor.execute('RESET application_name')
+        self._escribir(inicio + "INSERT INTO prueba_sql VALUES (2, 'dos');\n")
+        self._importar(lote=1, reanudar=True)
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW application_name')
+            self.assertEqual(cursor.fetchone()[0], 'importar_sql_prueba')
+        self.assertEqual(self._filas(), [(1, 'uno'), (2, 'dos')])
+
+
+class KeysetPaginationTests(TestCase):
+    """Paginación por cursor de los listados (?cursor=) sobre un orden con empates."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        producto = crear_producto('S1', cls.tecnico, cls.operador)
+        # Tres fechas con varias instalaciones cada una: el id desempata
+        cls.instalaciones = [
+            crear_instalacion(cls, f'OT{i}', producto, fecha_instalacion=FECHA + datetime.timedelta(days=i % 3))
+            for i in range(8)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _pagina(self, url, **params):
+        respuesta = self.client.get(url, params)
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        return [fila['id_instalacion'] for fila in datos['results']], datos
+
+    def _orden_esperado(self, *orden):
+        filas = models.Instalaciones.objects.values_list('fecha_instalacion', 'id_instalacion')
+        claves = {
+            'fecha_instalacion': lambda fila: fila[0].toordinal(),
+            'id_instalacion': lambda fila: fila[1],
+        }
+        return sorted(filas, key=lambda fila: tuple(
+            -claves[campo.lstrip('-')](fila) if campo.startswith('-') else claves[campo](fila)
+            for campo in orden
+        ))
+
+    def test_filtro_posicion_con_columnas_mixtas(self):
+        for orden in (
+            ('-fecha_instalacion', 'id_instalacion'),
+            ('fecha_instalacion', '-id_instalacion'),
+            ('-fecha_instalacion', '-id_instalacion'),
+        ):
+            esperado = self._orden_esperado(*orden)
+            for i, posicion in enumerate(esperado):
+                siguientes = list(
+                    models.Instalaciones.objects.order_by(*orden)
+                    .filter(KeysetPagination._filtro_posicion(orden, posicion))
+                    .values_list('fecha_instalacion', 'id_instalacion')
+                )
+                self.assertEqual(siguientes, esperado[i + 1:], (orden, posicion))
+
+    def test_avanzar_y_retroceder_sin_huecos_ni_repetidos(self):
+        ids, datos = self._pagina('/instalaciones/', cursor='', page_size=3)
+        paginas = [ids]
+        self.assertIsNone(datos['previous'])
+        while datos['next']:
+            ids, datos = self._pagina(datos['next'])
+            paginas.append(ids)
+        esperado = [fila[1] for fila in self._orden_esperado('-fecha_instalacion', '-id_instalacion')]
+        self.assertEqual([i for pagina in paginas for i in pagina], esperado)
+        self.assertEqual([len(pagina) for pagina in paginas], [3, 3, 2])
+
+        # Hacia atrás desde la última página se repasan las mismas páginas
+        anteriores = []
+        while datos['previous']:
+            ids, datos = self._pagina(datos['previous'])
+            anteriores.append(ids)
+        self.assertEqual(anteriores, paginas[-2::-1])
+
+    def test_cursor_invalido(self):
+        for cursor in ('basura', 'eyJ2IjpbMV19', 'eyJ2IjpbIngiLCAxXX0='):
+            respuesta = self.client.get('/instalaciones/', {'cursor': cursor})
+            self.assertEqual(respuesta.status_code, 404, cursor)
+
+    def test_modo_segun_el_parametro_cursor(self):
+        _, por_numero = self._pagina('/instalaciones/', page_size=3)
+        self.assertEqual(por_numero['count'], 8)
+        self.assertIn('page=2', por_numero['next'])
+
+        _, por_cursor = self._pagina('/instalaciones/', cursor='', page_size=3)
+        self.assertNotIn('count', por_cursor)
+        self.assertIn('cursor=', por_cursor['next'])
+        self.assertNotIn('page=', por_cursor['next'])
+
+
+def fila_instalacion(catalogos, numero_ot, serie, **campos):
+    """Fila de la importación de instalaciones, como la arma planillas.MapeoInstalaciones."""
+    return {
+        'fecha_instalacion': FECHA.isoformat(), 'id_tecnico': catalogos.tecnico.pk,
+        'id_operador': catalogos.operador.pk, 'direccion': 'Calle 1', 'numero_ot': numero_ot,
+        'producto_serie': serie, 'categoria': 'ONT', 'id_dr': catalogos.dr.pk, 'serie_dr': '',
+        'eq_reutilizado': 'NA', 'eq_retirado': 'NA', 'metros_cable': '0',
+        'id_acometida': catalogos.acometida.pk, 'observaciones': 'NA', 'valor_dr': '5',
+        'valor_dr_empresa': '7', **campos,
+    }
+
+
+class ImportacionInstalacionesTests(TestCase):
+    """ImportadorInstalaciones: lotes con numero_ot _DUPn, reintento fila por fila y resúmenes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        crear_instalacion(cls, 'X', crear_producto('S0', cls.tecnico, cls.operador))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _numeros_ot(self):
+        return sorted(models.Instalaciones.objects.values_list('numero_ot', flat=True))
+
+    def _cantidad_resumida(self, fecha=FECHA):
+        return sum(models.ResumenInstalacionesDiario.objects.filter(fecha=fecha).values_list('cantidad', flat=True))
+
+    def test_numero_ot_repetido_en_el_lote_y_existente(self):
+        resultado = importacion.ImportadorInstalaciones().importar([
+            fila_instalacion(self, 'X', 'S1'),
+            fila_instalacion(self, 'Y', 'S2'),
+            fila_instalacion(self, 'X', 'S3'),
+            fila_instalacion(self, 'Y', 'S4'),
+        ])
+        self.assertEqual(resultado, {'creadas': 4, 'errores': [], 'total': 4})
+        self.assertEqual(
+            dict(models.Instalaciones.objects.values_list('producto_serie', 'numero_ot')),
+            {'S0': 'X', 'S1': 'X_DUP1', 'S2': 'Y', 'S3': 'X_DUP2', 'S4': 'Y_DUP1'},
+        )
+
+    def test_lotes_siguientes_ven_las_ot_de_los_anteriores(self):
+        importador = importacion.ImportadorInstalaciones()
+        importador.tamano_lote = 2
+        importador.importar([fila_instalacion(self, 'Z', f'S{i}') for i in range(5)])
+        self.assertEqual(self._numeros_ot(), ['X', 'Z', 'Z_DUP1', 'Z_DUP2', 'Z_DUP3', 'Z_DUP4'])
+
+    def test_errores_de_validacion_por_fila(self):
+        resultado = importacion.ImportadorInstalaciones().importar([
+            fila_instalacion(self, 'A', 'S1'),
+            fila_instalacion(self, 'B', 'S2', id_tecnico=999),
+            'no es un objeto',
+        ])
+        self.assertEqual(resultado['creadas'], 1)
+        self.assertEqual([error['fila'] for error in resultado['errores']], [2, 3])
+        self.assertIn('id_tecnico', resultado['errores'][0]['errores'])
+
+    def test_lote_fallido_se_repite_fila_por_fila(self):
+        importador = importacion.ImportadorInstalaciones()
+        insertar = importador._insertar
+
+        def insertar_o_fallar(filas):
+            if any(datos['numero_ot'] == 'FALLA' for datos in filas):
+                raise DatabaseError('fila rechazada por la base')
+            return insertar(filas)
+
+        with mock.patch.object(importador, '_insertar', side_effect=insertar_o_fallar):
+            resultado = importador.importar([
+                fila_instalacion(self, 'A', 'S1'),
+                fila_instalacion(self, 'FALLA', 'S2'),
+                fila_instalacion(self, 'A', 'S3'),
+            ])
+        self.assertEqual(resultado['creadas'], 2)
+        self.assertEqual(resultado['errores'], [{'fila': 2, 'error': 'fila rechazada por la base'}])
+        self.assertEqual(self._numeros_ot(), ['A', 'A_DUP1', 'X'])
+        # El savepoint de la fila descarta también el producto que creó
+        self.assertFalse(models.Productos.objects.filter(producto_serie='S2').exists())
+        self.assertEqual(self._cantidad_resumida(), 3)
+
+    def test_resumenes_en_la_transaccion_del_lote(self):
+        profundidad = len(connection.atomic_blocks)
+        llamadas = []
+
+        def refrescar(fechas):
+            # Dentro del atomic del lote, con sus filas ya insertadas
+            llamadas.append((len(connection.atomic_blocks) > profundidad, models.Instalaciones.objects.count()))
+            return refrescar_dias(fechas)
+
+        refrescar_dias = importacion.resumenes.refrescar_dias
+        importador = importacion.ImportadorInstalaciones()
+        importador.tamano_lote = 2
+        with mock.patch.object(importacion.resumenes, 'refrescar_dias', side_effect=refrescar):
+            importador.importar([fila_instalacion(self, f'OT{i}', f'S{i}') for i in range(3)])
+        self.assertEqual(llamadas, [(True, 3), (True, 4)])
+        self.assertEqual(self._cantidad_resumida(), 4)
+
+    def test_sin_resumenes_no_se_confirma_el_lote(self):
+        with mock.patch.object(importacion.resumenes, 'refrescar_dias', side_effect=DatabaseError('sin resúmenes')):
+            with self.assertRaises(DatabaseError):
+                importacion.ImportadorInstalaciones().importar([fila_instalacion(self, 'A', 'S1')])
+        self.assertEqual(self._numeros_ot(), ['X'])
+
+    def test_endpoint(self):
+        respuesta = self.client.post('/instalaciones/bulk-import/', {
+            'instalaciones': [fila_instalacion(self, 'A', 'S1')],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['creadas'], 1)
+
+    def test_endpoint_datos_mal_formados(self):
+        for cuerpo in ([fila_instalacion(self, 'A', 'S1')], {'instalaciones': []}, {'instalaciones': 'A'}):
+            respuesta = self.client.post('/instalaciones/bulk-import/', cuerpo, format='json')
+            self.assertEqual(respuesta.status_code, 400, cuerpo)
+            self.assertIn('error', respuesta.json())
+
+    def test_endpoint_errores_de_la_base(self):
+        cuerpo = {'instalaciones': [fila_instalacion(self, 'A', 'S1')]}
+        with mock.patch.object(importacion.ImportadorInstalaciones, 'importar',
+                               side_effect=IntegrityError('restricción violada')):
+            respuesta = self.client.post('/instalaciones/bulk-import/', cuerpo, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json(), {'error': 'Error en la importación: restricción violada'})
+        # Un error inesperado no se disfraza de respuesta: llega al manejador de errores
+        with mock.patch.object(importacion.ImportadorInstalaciones, 'importar', side_effect=RuntimeError('fallo')):
+            with self.assertRaises(RuntimeError):
+                self.client.post('/instalaciones/bulk-import/', cuerpo, format='json')
+
+
+class ResumenesTests(TestCase):
+    """refrescar_dias: resúmenes diarios y mensuales, con un bloqueo por mes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        cls.fechas = [datetime.date(2024, 1, 31), datetime.date(2024, 2, 1), datetime.date(2024, 2, 15)]
+        for i, fecha in enumerate(cls.fechas):
+            producto = crear_producto(f'R{i}', cls.tecnico, cls.operador)
+            crear_instalacion(cls, f'R{i}', producto, fecha_instalacion=fecha)
+
+    def _bloqueos_advisory(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()"
+            )
+            return cursor.fetchone()[0]
+
+    def test_dias_y_meses(self):
+        resumenes.refrescar_dias(self.fechas + [None])
+        self.assertEqual(
+            dict(models.ResumenInstalacionesDiario.objects.values_list('fecha', 'cantidad')),
+            dict.fromkeys(self.fechas, 1),
+        )
+        self.assertEqual(
+            dict(models.ResumenInstalacionesMensual.objects.values_list('mes', 'cantidad')),
+            {datetime.date(2024, 1, 1): 1, datetime.date(2024, 2, 1): 2},
+        )
+
+    @unittest.skipUnless(EN_POSTGRESQL, 'pg_advisory_xact_lock es de PostgreSQL')
+    def test_un_bloqueo_por_mes(self):
+        # 400 días en 14 meses: un bloqueo por día agotaría max_locks_per_transaction
+        inicio = datetime.date(2024, 1, 1)
+        fechas = [inicio + datetime.timedelta(days=n) for n in range(400)]
+        resumenes.refrescar_dias(fechas)
+        self.assertEqual(self._bloqueos_advisory(), 14)
+        self.assertEqual(
+            sum(models.ResumenInstalacionesMensual.objects.values_list('cantidad', flat=True)), 3,
+        )
+
+
+class NumerosOTTests(TestCase):
+    """_ocupados y _insertar_con_reintentos: sufijos _DUPn, huecos, comodines de LIKE y reintentos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        for i, numero_ot in enumerate(['X', 'X_DUP1', 'X_DUP3', 'A_', 'AB_DUP1', '10%', '10%_DUP1', '105_DUP1']):
+            crear_instalacion(cls, numero_ot, crear_producto(f'E{i}', cls.tecnico, cls.operador))
+
+    def _importar(self, *numeros_ot, importador=None):
+        importador = importador or importacion.ImportadorInstalaciones()
+        resultado = importador.importar([
+            fila_instalacion(self, numero_ot, f'S{i}') for i, numero_ot in enumerate(numeros_ot)
+        ])
+        return resultado, list(
+            models.Instalaciones.objects.filter(producto_serie__producto_serie__startswith='S')
+            .order_by('producto_serie__producto_serie').values_list('numero_ot', flat=True)
+        )
+
+    def test_ocupados_consulta_solo_las_variantes_del_lote(self):
+        ocupados = importacion.ImportadorInstalaciones._ocupados
+        self.assertEqual(ocupados(['X', 'Y'], []), {'X', 'X_DUP1', 'X_DUP3'})
+        # Y no existe: sus variantes solo se consultan si se repite en el lote
+        self.assertEqual(ocupados(['Y'], []), set())
+        self.assertEqual(ocupados(['Q'], ['Q']), set())
+
+    def test_ocupados_escapa_comodines_de_like(self):
+        ocupados = importacion.ImportadorInstalaciones._ocupados
+        # Sin escapar, 'A__DUP%' también tomaría AB_DUP1 y '10%_DUP%' tomaría 105_DUP1
+        self.assertEqual(ocupados(['A_'], []), {'A_'})
+        self.assertEqual(ocupados(['10%'], []), {'10%', '10%_DUP1'})
+
+    def test_sufijos_llenan_los_huecos(self):
+        resultado, numeros_ot = self._importar('X', 'X', 'X')
+        self.assertEqual(resultado['creadas'], 3)
+        self.assertEqual(numeros_ot, ['X_DUP2', 'X_DUP4', 'X_DUP5'])
+
+    def test_sufijos_con_comodines_en_el_prefijo(self):
+        resultado, numeros_ot = self._importar('A_', 'A_', '10%', '105')
+        self.assertEqual(resultado['errores'], [])
+        self.assertEqual(numeros_ot, ['A__DUP1', 'A__DUP2', '10%_DUP2', '105'])
+
+    def _importador_con_competencia(self, tomas):
+        """
+        Importador cuyas primeras `tomas` inserciones encuentran su numero_ot
+        ya tomado por otra importación, como si la hubiese confirmado entre
+        la consulta de _ocupados y el INSERT.
+        """
+        importador = importacion.ImportadorInstalaciones()
+        insertar = importador._insertar
+        competidor = iter(range(100))
+
+        def insertar_tras_competencia(filas):
+            if tomas:
+                tomas.pop()
+                for datos in filas:
+                    crear_instalacion(self, datos['numero_ot'], crear_producto(f'C{next(competidor)}', self.tecnico))
+            return insertar(filas)
+
+        importador._insertar = insertar_tras_competencia
+        return importador
+
+    def test_reintento_con_la_siguiente_ot_libre(self):
+        importador = self._importador_con_competencia([1, 1])
+        resultado, numeros_ot = self._importar('X', 'Z', importador=importador)
+        self.assertEqual(resultado['creadas'], 2)
+        # Intento 1 pierde X_DUP2 y Z, intento 2 pierde X_DUP4 y Z_DUP1
+        self.assertEqual(numeros_ot, ['X_DUP5', 'Z_DUP2'])
+
+    def test_sin_ot_libre_tras_los_reintentos(self):
+        importador = self._importador_con_competencia([1] * importacion.INTENTOS_NUMERO_OT)
+        resultado, numeros_ot = self._importar('Z', importador=importador)
+        self.assertEqual(resultado['creadas'], 0)
+        self.assertEqual(resultado['errores'], [{'fila': 1, 'error': 'No se encontró un numero_ot libre para Z'}])
+        self.assertEqual(numeros_ot, [])
+        self.assertEqual(models.Instalaciones.objects.filter(numero_ot__startswith='Z').count(),
+                         importacion.INTENTOS_NUMERO_OT)
+
+
+def trabajo_de_prueba(trabajo):
+    """Función de trabajo para TrabajosTests: registra cada ejecución."""
+    trabajo.parametros.setdefault('ejecuciones', 0)
+    trabajo.parametros['ejecuciones'] += 1
+    trabajos.avance(trabajo, parametros=trabajo.parametros, procesadas=trabajo.procesadas + 1)
+    return {'ok': True}
+
+
+@override_settings(TRABAJOS_HILOS=0)
+class TrabajosTests(TestCase):
+    """Cola de trabajos: toma, avance, recuperación de abandonados y reanudación."""
+
+    def setUp(self):
+        for patcher in (
+            mock.patch.dict(trabajos.TIPOS, prueba='configuracion.tests.trabajo_de_prueba'),
+            # Cerraría la conexión de la transacción del test
+            mock.patch.object(trabajos, 'close_old_connections'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _archivo(self, contenido, extension='.csv'):
+        descriptor, ruta = tempfile.mkstemp(suffix=extension)
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        self.addCleanup(lambda: os.path.exists(ruta) and os.remove(ruta))
+        return ruta
+
+    def test_toma_el_pendiente_mas_antiguo(self):
+        primero = trabajos.crear('prueba')
+        segundo = trabajos.crear('prueba')
+        tomado = trabajos.tomar_siguiente()
+        self.assertEqual(tomado.pk, primero.pk)
+        primero.refresh_from_db()
+        self.assertEqual(primero.estado, models.Trabajo.PROCESANDO)
+        self.assertIsNotNone(primero.iniciado_en)
+        self.assertEqual(trabajos.tomar_siguiente().pk, segundo.pk)
+        self.assertIsNone(trabajos.tomar_siguiente())
+
+    def test_procesar_siguiente(self):
+        trabajo = trabajos.crear('prueba')
+        self.assertTrue(trabajos.procesar_siguiente())
+        self.assertFalse(trabajos.procesar_siguiente())
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, models.Trabajo.TERMINADO)
+        self.assertEqual(trabajo.resultado, {'ok': True})
+        self.assertIsNotNone(trabajo.terminado_en)
+
+    def test_tipo_desconocido(self):
+        with self.assertRaises(ValueError):
+            trabajos.crear('inexistente')
+
+    def test_avance_guarda_los_primeros_errores(self):
+        trabajo = trabajos.crear('prueba')
+        errores = [{'fila': i} for i in range(1, 8)]
+        with mock.patch.object(trabajos, 'MAX_ERRORES', 3):
+            trabajos.avance(trabajo, errores=errores[:2], procesadas=2)
+            trabajo.refresh_from_db()
+            self.assertEqual((trabajo.errores, trabajo.total_errores), (errores[:2], 2))
+
+            trabajos.avance(trabajo, errores=errores[:5])
+            trabajo.refresh_from_db()
+            self.assertEqual((trabajo.errores, trabajo.total_errores), (errores[:3], 5))
+
+            # Con la lista guardada completa solo cambia la cantidad (y la de omitidos de un trabajo reanudado)
+            with mock.patch.object(trabajo, 'save', wraps=trabajo.save) as guardar:
+                trabajos.avance(trabajo, 4, errores=errores)
+            self.assertNotIn('errores', guardar.call_args.kwargs['update_fields'])
+            trabajo.refresh_from_db()
+            self.assertEqual((trabajo.errores, trabajo.total_errores, trabajo.procesadas), (errores[:3], 11, 2))
+
+    def test_recupera_los_abandonados(self):
+        abandonado = trabajos.crear('prueba')
+        activo = trabajos.crear('prueba')
+        hace = timezone.now() - datetime.timedelta(seconds=trabajos.ABANDONADO_TRAS + 1)
+        models.Trabajo.objects.filter(pk=abandonado.pk).update(
+            estado=models.Trabajo.PROCESANDO, procesadas=1, actualizado_en=hace
+        )
+        models.Trabajo.objects.filter(pk=activo.pk).update(
+            estado=models.Trabajo.PROCESANDO, actualizado_en=timezone.now()
+        )
+        with self.assertLogs('configuracion.trabajos', 'WARNING'):
+            self.assertEqual(trabajos.recuperar_abandonados(), 1)
+        self.assertEqual(trabajos.recuperar_abandonados(), 0)
+        tomado = trabajos.tomar_siguiente()
+        self.assertEqual(tomado.pk, abandonado.pk)
+        trabajos.ejecutar(tomado)
+        abandonado.refresh_from_db()
+        # Reanudado con el avance que tenía
+        self.assertEqual((abandonado.estado, abandonado.procesadas), (models.Trabajo.TERMINADO, 2))
+
+    def test_mantenimiento_solo_desde_el_comando(self):
+        trabajos.crear('prueba')
+        with mock.patch.object(trabajos, '_ultimo_mantenimiento', None), \
+                mock.patch.object(trabajos, 'connection'), \
+                mock.patch.object(sincronizacion, 'purgar', return_value=0) as purgar:
+            # Los hilos del proceso web atienden la cola sin purgar
+            trabajos._atender_cola()
+            purgar.assert_not_called()
+            trabajos.crear('prueba')
+            call_command('procesar_trabajos', '--una-vez', stdout=io.StringIO())
+            purgar.assert_called_once()
+        self.assertFalse(models.Trabajo.objects.exclude(estado=models.Trabajo.TERMINADO).exists())
+
+    def test_archivo_ausente(self):
+        trabajo = trabajos.crear('importar_instalaciones', archivo='/no/existe/planilla.csv')
+        trabajos.ejecutar(trabajos.tomar_siguiente())
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, models.Trabajo.FALLIDO)
+        self.assertIn('TRABAJOS_DIR', trabajo.mensaje)
+
+    def test_importacion_reanudada_sigue_desde_lo_procesado(self):
+        catalogos = type('Catalogos', (), {})
+        crear_catalogos(catalogos)
+        ruta = self._archivo(
+            'Cod. cliente 1,Fecha fin actuación,N/S\n'
+            + ''.join(f'OT{i},2025-01-01,S{i}\n' for i in range(1, 5))
+        )
+        trabajo = trabajos.crear('importar_instalaciones', archivo=ruta)
+        # Un proceso anterior importó dos filas (una con error) antes de morir
+        crear_instalacion(catalogos, 'OT1', crear_producto('S1', catalogos.tecnico, catalogos.operador))
+        models.Trabajo.objects.filter(pk=trabajo.pk).update(
+            estado=models.Trabajo.PROCESANDO, procesadas=2, resultado={'creadas': 1},
+            errores=[{'fila': 2, 'error': 'previo'}], total_errores=1,
+            actualizado_en=timezone.now() - datetime.timedelta(seconds=trabajos.ABANDONADO_TRAS + 1),
+        )
+        with self.assertLogs('configuracion.trabajos', 'WARNING'):
+            trabajos.recuperar_abandonados()
+        trabajos.ejecutar(trabajos.tomar_siguiente())
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, models.Trabajo.TERMINADO, trabajo.mensaje)
+        self.assertEqual(trabajo.resultado, {'creadas': 3, 'total': 4})
+        self.assertEqual((trabajo.errores, trabajo.total_errores), ([{'fila': 2, 'error': 'previo'}], 1))
+        self.assertEqual(
+            sorted(models.Instalaciones.objects.values_list('numero_ot', flat=True)), ['OT1', 'OT3', 'OT4']
+        )
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_subida_de_formato_no_soportado(self):
+        for nombre, esperado in (
+            ('planilla.XLS', 'Los archivos .xls (Excel 97-2003) no se admiten'),
+            ('planilla.ods', 'Formato no soportado'),
+        ):
+            archivo = SimpleUploadedFile(nombre, b'contenido')
+            respuesta = APIClient().post(
+                '/trabajos/importaciones/', {'archivo': archivo, 'tipo': 'instalaciones'}, format='multipart',
+            )
+            self.assertEqual(respuesta.status_code, 400, nombre)
+            self.assertIn(esperado, respuesta.json()['error'])
+            self.assertIn('se aceptan .xlsx, .csv', respuesta.json()['error'])
+        self.assertFalse(models.Trabajo.objects.exists())
+
+
+@unittest.skipUnless(EN_POSTGRESQL, 'La sincronización usa los triggers y txid de PostgreSQL')
+class SincronizacionTests(TransactionTestCase):
+    """?since=: cambios, eliminados y token vencido (cada escritura en su transacción)."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tecnico = models.Tecnicos.objects.create(nombre='Ana', apellido='Pérez', id_tecnico='T1')
+        self.primero = crear_producto('S1', self.tecnico)
+        self.segundo = crear_producto('S2', self.tecnico)
+
+    def tearDown(self):
+        # TransactionTestCase no vacía las tablas managed=False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "TRUNCATE productos, tecnicos, eliminaciones, sincronizacion_horizonte RESTART IDENTITY CASCADE"
+            )
+
+    def _sincronizar(self, token, **parametros):
+        respuesta = self.client.get('/productos/', {'since': token, **parametros})
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        datos = respuesta.json()
+        return datos['token'], sorted(fila['producto_serie'] for fila in datos['cambios']), datos['eliminados']
+
+    def test_cambios_y_eliminados_desde_el_token(self):
+        token, cambios, eliminados = self._sincronizar('')
+        self.assertEqual((cambios, eliminados), (['S1', 'S2'], []))
+
+        models.Productos.objects.filter(pk=self.primero.pk).update(cantidad=5)
+        crear_producto('S3', self.tecnico)
+        borrado = self.segundo.pk
+        self.segundo.delete()
+        token, cambios, eliminados = self._sincronizar(token)
+        self.assertEqual((cambios, eliminados), (['S1', 'S3'], [borrado]))
+
+        self.assertEqual(self._sincronizar(token)[1:], ([], []))
+
+    def test_filas_que_dejan_de_cumplir_los_filtros(self):
+        otro = models.Tecnicos.objects.create(nombre='Luis', apellido='Gómez', id_tecnico='T2')
+        token = self._sincronizar('', id_tecnico=self.tecnico.pk)[0]
+        models.Productos.objects.filter(pk=self.primero.pk).update(id_tecnico=otro)
+        self.assertEqual(self._sincronizar(token, id_tecnico=self.tecnico.pk)[1:], ([], [self.primero.pk]))
+
+    def test_token_invalido(self):
+        for token in ('abc', '-1'):
+            respuesta = self.client.get('/productos/', {'since': token})
+            self.assertEqual(respuesta.status_code, 400)
+
+    def test_token_vencido_tras_purgar(self):
+        viejo = self._sincronizar('')[0]
+        self.segundo.delete()
+        models.Eliminacion.objects.update(eliminado_en=timezone.now() - datetime.timedelta(days=31))
+        with override_settings(SINCRONIZACION_RETENCION_DIAS=30):
+            self.assertEqual(sincronizacion.purgar(), 1)
+            self.assertEqual(sincronizacion.purgar(), 0)
+
+        respuesta = self.client.get('/productos/', {'since': viejo})
+        self.assertEqual(respuesta.status_code, 410)
+        self.assertTrue(respuesta.json()['resincronizar'])
+        # Desde cero, y después con el token nuevo, se sincroniza de nuevo
+        token, cambios, _ = self._sincronizar('')
+        self.assertEqual(cambios, ['S1'])
+        self.assertEqual(self._sincronizar(token)[1:], ([], []))
+
+    def test_purgar_respeta_la_retencion(self):
+        self.segundo.delete()
+        self.assertEqual(sincronizacion.purgar(), 0)
+        self.assertEqual(models.Eliminacion.objects.count(), 1)
+
+
+@unittest.skipIf(EN_POSTGRESQL, 'Fuera de PostgreSQL')
+class SincronizacionSinPostgreSQLTests(TestCase):
+
+    def test_since_responde_400(self):
+        respuesta = APIClient().get('/productos/', {'since': ''})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(APIClient().get('/productos/').status_code, 200)
+
+
+class EscrituraInstalacionesTests(TestCase):
+    """INSERT / UPDATE de instalaciones: SQL directo fuera de PostgreSQL, sentencias preparadas en él."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        crear_instalacion(cls, 'X', crear_producto('S0', cls.tecnico, cls.operador))
+
+    def _datos(self, numero_ot, serie, **campos):
+        return {
+            'fecha_instalacion': FECHA, 'id_tecnico': self.tecnico, 'id_operador': self.operador,
+            'direccion': 'Calle 1', 'numero_ot': numero_ot,
+            'producto_serie': crear_producto(serie, self.tecnico, self.operador), 'id_dr': self.dr,
+            'eq_reutilizado': 'NA', 'eq_retirado': 'NA', 'id_tipo_orden': self.tipo_orden,
+            'metros_cable': 3, 'id_acometida': self.acometida, 'observaciones': 'NA',
+            'valor_dr': 5, 'valor_dr_empresa': 7, 'serie_dr': '', 'categoria': 'ONT', **campos,
+        }
+
+    def test_crear_y_actualizar(self):
+        creada = escritura_instalaciones.crear(self._datos('A', 'S1'))
+        self.assertEqual(creada, models.Instalaciones.objects.get(numero_ot='A'))
+        self.assertEqual((creada.producto_serie_id, creada.id_tipo_orden_id), ('S1', self.tipo_orden.pk))
+        # Los valores de la orden salen del tipo de orden
+        self.assertEqual((creada.valor_orden, creada.valor_orden_empresa), (12, 15))
+
+        # Edición parcial: lo que no viene se conserva
+        editada = escritura_instalaciones.actualizar(creada, {'direccion': 'Calle 2', 'id_tipo_orden': None})
+        self.assertEqual(editada.pk, creada.pk)
+        self.assertEqual((editada.direccion, editada.numero_ot, editada.metros_cable), ('Calle 2', 'A', 3))
+        self.assertEqual((editada.id_tipo_orden_id, editada.valor_orden, editada.valor_orden_empresa), (None, 0, 0))
+        editada.refresh_from_db()
+        self.assertEqual(editada.direccion, 'Calle 2')
+
+    def test_actualizar_instalacion_borrada(self):
+        creada = escritura_instalaciones.crear(self._datos('A', 'S1'))
+        models.Instalaciones.objects.filter(pk=creada.pk).delete()
+        with self.assertRaises(models.Instalaciones.DoesNotExist):
+            escritura_instalaciones.actualizar(creada, {'direccion': 'Calle 2'})
+
+    def test_insertar_varias_omite_las_ot_ocupadas(self):
+        insertadas = escritura_instalaciones.insertar_varias([
+            self._datos('X', 'S1'), self._datos('Y', 'S2'), self._datos('Z', 'S3', id_tipo_orden=None),
+        ])
+        self.assertEqual(insertadas, {'Y', 'Z'})
+        self.assertEqual(
+            dict(models.Instalaciones.objects.values_list('numero_ot', 'producto_serie')),
+            {'X': 'S0', 'Y': 'S2', 'Z': 'S3'},
+        )
+        self.assertEqual(escritura_instalaciones.insertar_varias([self._datos('Y', 'S4')]), set())
+
+    @unittest.skipUnless(EN_POSTGRESQL, 'Sentencias preparadas de PostgreSQL')
+    def test_columna_nueva_con_sentencias_ya_preparadas(self):
+        creada = escritura_instalaciones.crear(self._datos('A', 'S1'))
+        escritura_instalaciones.insertar_varias([self._datos('B', 'S2')])
+        self.assertIn('instalaciones_crear', escritura_instalaciones._preparadas())
+        # Una migración agrega una columna mientras la conexión sigue abierta
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute("ALTER TABLE instalaciones ADD COLUMN columna_nueva text")
+        self.assertEqual(escritura_instalaciones.crear(self._datos('C', 'S3')).numero_ot, 'C')
+        self.assertEqual(escritura_instalaciones.actualizar(creada, {'direccion': 'Calle 2'}).direccion, 'Calle 2')
+        self.assertEqual(escritura_instalaciones.insertar_varias([self._datos('D', 'S4')]), {'D'})
+
+
+class ProductosBulkTests(TestCase):
+    """/productos/bulk/: PATCH y DELETE por ids (exactamente esas filas) o por filtros (como el listado)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        cls.libre = crear_producto('S1', cls.tecnico, cls.operador)
+        cls.asignado = crear_producto('S2', cls.tecnico, cls.operador)
+        cls.de_otro = crear_producto('S3', cls.otro_tecnico, cls.operador)
+        crear_instalacion(cls, 'OT1', cls.asignado)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _patch(self, cuerpo, filtros=''):
+        return self.client.patch(f'/productos/bulk/{filtros}', cuerpo, format='json')
+
+    def _delete(self, cuerpo, filtros=''):
+        return self.client.delete(f'/productos/bulk/{filtros}', cuerpo, format='json')
+
+    def _cantidades(self):
+        return dict(models.Productos.objects.values_list('producto_serie', 'cantidad'))
+
+    def test_patch_por_ids_incluye_los_asignados(self):
+        respuesta = self._patch({'ids': [self.libre.pk, self.asignado.pk], 'cambios': {'cantidad': 7}})
+        self.assertEqual(respuesta.json(), {'actualizadas': 2})
+        self.assertEqual(self._cantidades(), {'S1': 7, 'S2': 7, 'S3': 2})
+
+    def test_patch_por_filtros_como_el_listado(self):
+        respuesta = self._patch({'cambios': {'cantidad': 7}}, f'?id_tecnico={self.tecnico.pk}')
+        self.assertEqual(respuesta.json(), {'actualizadas': 1})
+        self.assertEqual(self._cantidades(), {'S1': 7, 'S2': 2, 'S3': 2})
+        respuesta = self._patch({'cambios': {'cantidad': 9}}, f'?id_tecnico={self.tecnico.pk}&include_assigned=1')
+        self.assertEqual(respuesta.json(), {'actualizadas': 2})
+
+    def test_patch_invalido(self):
+        for cuerpo in (
+            {'cambios': {'cantidad': 7}},
+            {'ids': 'S1', 'cambios': {'cantidad': 7}},
+            {'ids': [True], 'cambios': {'cantidad': 7}},
+            {'ids': [self.libre.pk]},
+            {'ids': [self.libre.pk], 'cambios': {'producto_serie': 'S9'}},
+            {'ids': [self.libre.pk], 'cambios': {'cantidad': 'muchas'}},
+        ):
+            self.assertEqual(self._patch(cuerpo).status_code, 400, cuerpo)
+        self.assertEqual(self._cantidades(), {'S1': 2, 'S2': 2, 'S3': 2})
+
+    def test_patch_que_viola_una_restriccion(self):
+        with mock.patch('configuracion.views.ProductosBulk.actualizar', side_effect=IntegrityError('violación')):
+            respuesta = self._patch({'ids': [self.libre.pk], 'cambios': {'cantidad': 7}})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('violación', respuesta.json()['error'])
+
+    def test_delete_por_ids(self):
+        respuesta = self._delete({'ids': [self.libre.pk, self.de_otro.pk]})
+        self.assertEqual(respuesta.json(), {'eliminadas': 2})
+        self.assertEqual(list(self._cantidades()), ['S2'])
+
+    def test_delete_por_filtros_no_toca_los_asignados(self):
+        respuesta = self._delete({}, f'?id_tecnico={self.tecnico.pk}')
+        self.assertEqual(respuesta.json(), {'eliminadas': 1})
+        self.assertEqual(sorted(self._cantidades()), ['S2', 'S3'])
+        self.assertEqual(self._delete({}).status_code, 400)
+
+    @unittest.skipUnless(EN_POSTGRESQL, 'SET CONSTRAINTS de PostgreSQL')
+    def test_delete_por_ids_de_un_asignado(self):
+        with connection.cursor() as cursor:
+            # La FK se comprueba al confirmar, que dentro del test no llega
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        respuesta = self._delete({'ids': [self.libre.pk, self.asignado.pk]})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(sorted(self._cantidades()), ['S1', 'S2', 'S3'])
+
+
+class BusquedaTests(TestCase):
+    """?search=: un término con forma de código ordena por coincidencia exacta y prefijo sin dejar afuera el resto."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        for numero_ot, serie, direccion in (
+            ('OT1000', 'S1', 'Calle 1'),
+            ('OT100', 'S2', 'Calle 2'),
+            ('Z9', 'S3', 'Frente a OT100'),
+            ('Z8', 'S4', 'Calle 4'),
+        ):
+            crear_instalacion(cls, numero_ot, crear_producto(serie, cls.tecnico, cls.operador), direccion=direccion)
+        crear_producto('ABC1', cls.tecnico, nombre_producto='Router')
+        crear_producto('XABC1', cls.tecnico, nombre_producto='Router')
+        crear_producto('ABC12', cls.tecnico, nombre_producto='Router')
+        crear_producto('Q1', cls.tecnico, nombre_producto='Antena')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _buscar(self, url, campo, termino):
+        respuesta = self.client.get(url, {'search': termino})
+        self.assertEqual(respuesta.status_code, 200)
+        return [fila[campo] for fila in respuesta.json()['results']]
+
+    def test_codigo_exacto_y_prefijo_primero(self):
+        self.assertEqual(self._buscar('/instalaciones/', 'numero_ot', 'OT100'), ['OT100', 'OT1000', 'Z9'])
+        self.assertEqual(self._buscar('/productos/', 'producto_serie', 'abc1'), ['ABC1', 'ABC12', 'XABC1'])
+
+    def test_codigo_solo_en_otras_columnas(self):
+        self.assertEqual(self._buscar('/instalaciones/', 'numero_ot', 'S3'), ['Z9'])
+
+    def test_termino_que_no_es_codigo(self):
+        self.assertEqual(sorted(self._buscar('/instalaciones/', 'numero_ot', 'Calle')), ['OT100', 'OT1000', 'Z8'])
+        self.assertEqual(self._buscar('/productos/', 'producto_serie', 'antena'), ['Q1'])
+
+
+@unittest.skipIf(middleware.brotli is None, 'brotli no está instalado')
+class CompresionTests(unittest.TestCase):
+    """CompresionMiddleware: Accept-Encoding con q-values."""
+
+    def _respuesta(self, aceptadas, contenido=b'[' + b'{"a": 1},' * 500 + b'{}]', tipo='application/json'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=aceptadas)
+        return middleware.CompresionMiddleware(lambda request: HttpResponse(contenido, content_type=tipo))(request)
+
+    def test_elegir_codificacion(self):
+        for cabecera, esperada in (
+            ('gzip, deflate, br', 'br'),
+            ('gzip, deflate', 'gzip'),
+            ('br;q=0, gzip', 'gzip'),
+            ('br; q=0.0, gzip;q=0', None),
+            ('gzip;q=1.0, br;q=0.5', 'gzip'),
+            ('GZIP;Q=0.8', 'gzip'),
+            ('*', 'br'),
+            ('*;q=0.5, br;q=0', 'gzip'),
+            ('brotli, xgzip', None),
+            ('gzip;q=nada, identity', None),
+            ('', None),
+        ):
+            self.assertEqual(middleware.elegir_codificacion(cabecera), esperada, cabecera)
+
+    def test_comprime_segun_lo_aceptado(self):
+        respuesta = self._respuesta('br;q=0, gzip')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertTrue(gzip.decompress(respuesta.content).startswith(b'[{"a": 1}'))
+        self.assertIn('Accept-Encoding', respuesta['Vary'])
+
+        respuesta = self._respuesta('gzip;q=0.5, br')
+        self.assertEqual(respuesta['Content-Encoding'], 'br')
+        self.assertTrue(middleware.brotli.decompress(respuesta.content).startswith(b'[{"a": 1}'))
+
+    def test_sin_comprimir(self):
+        for respuesta in (
+            self._respuesta('gzip;q=0, br;q=0'),
+            self._respuesta('gzip', contenido=b'[]'),
+            self._respuesta('gzip', tipo='text/html'),
+        ):
+            self.assertFalse(respuesta.has_header('Content-Encoding'))
+
+
+class FormatosListadoTests(TestCase):
+    """?format=columnar / msgpack de los listados."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_columnar(self):
+        esperado = self.client.get('/tecnicos/').json()
+        respuesta = self.client.get('/tecnicos/', {'format': 'columnar'})
+        self.assertEqual(respuesta['Content-Type'], 'application/vnd.technet.columnar+json')
+        datos = respuesta.json()
+        self.assertEqual(datos['count'], esperado['count'])
+        columnas = datos['results']['columns']
+        self.assertEqual(columnas, list(esperado['results'][0]))
+        self.assertEqual([dict(zip(columnas, fila)) for fila in datos['results']['rows']], esperado['results'])
+
+    def test_columnar_sin_filas(self):
+        self.assertEqual(renderers.a_columnas([]), {'columns': [], 'rows': []})
+        contenido = renderers.ColumnarJSONRenderer().render([{'a': 1, 'b': None}, {'a': 2, 'b': 'x'}])
+        self.assertEqual(json.loads(contenido), {'columns': ['a', 'b'], 'rows': [[1, None], [2, 'x']]})
+
+    @unittest.skipIf(renderers.msgpack is None, 'msgpack no está instalado')
+    def test_msgpack(self):
+        esperado = self.client.get('/dr/').json()
+        respuesta = self.client.get('/dr/', {'format': 'msgpack'})
+        self.assertEqual(respuesta['Content-Type'], 'application/msgpack')
+        # Decimal y fechas, como texto igual que en el JSON
+        self.assertEqual(renderers.msgpack.unpackb(respuesta.content), esperado)
+
+
+class LecturaRapidaTests(TestCase):
+    """El codificador de lectura_rapida produce los mismos bytes que ModelSerializer + JSONRenderer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        crear_instalacion(
+            cls, 'OT1', crear_producto('S1', cls.tecnico, cls.operador),
+            id_tipo_orden=cls.tipo_orden, metros_cable=decimal.Decimal('2.5'), valor_dr=decimal.Decimal('5'),
+        )
+        # FK anulables en NULL
+        crear_instalacion(
+            cls, 'OT2', crear_producto('S2', cls.tecnico), id_tipo_orden=None,
+            fecha_instalacion=datetime.date(2024, 12, 31), observaciones='Ñandú "entre comillas" ',
+        )
+
+    def _comparar(self, serializer_class, instancias, filas):
+        codificador = lectura_rapida.codificador_para(serializer_class())
+        self.assertIsNotNone(codificador, serializer_class.__name__)
+        esperado = JSONRenderer().render(serializer_class(instancias, many=True).data)
+        obtenido = renderers.JSONRapidoRenderer().render([codificador.codificar(fila) for fila in filas])
+        self.assertEqual(obtenido, esperado)
+
+    def _comparar_tabla(self, serializer_class):
+        queryset = serializer_class.Meta.model.objects.order_by('pk')
+        columnas = lectura_rapida.codificador_para(serializer_class()).columnas
+        self._comparar(serializer_class, list(queryset), list(queryset.values_list(*columnas)))
+
+    def test_instalaciones_desde_la_base(self):
+        for serializer_class in (serializers.InstalacionesSerializers, serializers.InstalacionesListaSerializers):
+            with self.subTest(serializer_class.__name__):
+                self._comparar_tabla(serializer_class)
+
+    def test_productos_y_catalogos_desde_la_base(self):
+        for serializer_class in (
+            serializers.ProductosSerializers, serializers.DrSerializers,
+            serializers.AcometidasSerializers, serializers.TecnicosSerializers,
+        ):
+            with self.subTest(serializer_class.__name__):
+                self._comparar_tabla(serializer_class)
+
+    def test_escalas_de_decimales_en_memoria(self):
+        # Valores como los deja la base o un cálculo: más o menos decimales que el campo, enteros, float
+        instancias = [
+            models.Instalaciones(
+                id_instalacion=i, fecha_instalacion=FECHA, id_tecnico_id='T1', id_operador_id=1,
+                direccion='Calle', numero_ot=f'OT{i}', producto_serie_id=f'S{i}', id_dr_id=1,
+                id_tipo_orden_id=None, metros_cable=valor, id_acometida_id=1, valor_dr=valor,
+                valor_orden=decimal.Decimal('12.5'), valor_orden_empresa=decimal.Decimal('0'),
+                valor_dr_empresa=decimal.Decimal('7.00'), total=None, instalacion_compartida=valor,
+                valor_total_empresa=decimal.Decimal('1E+1'), observaciones='',
+            )
+            for i, valor in enumerate([
+                decimal.Decimal('0.125'), decimal.Decimal('0.135'), decimal.Decimal('3'),
+                decimal.Decimal('-1.5'), decimal.Decimal('12345678.90'), 2.5, 7,
+            ], start=1)
+        ]
+        columnas = lectura_rapida.codificador_para(serializers.InstalacionesSerializers()).columnas
+        filas = [
+            tuple(getattr(instancia, models.Instalaciones._meta.get_field(c).attname) for c in columnas)
+            for instancia in instancias
+        ]
+        self._comparar(serializers.InstalacionesSerializers, instancias, filas)
+
+
+class CamposDinamicosTests(TestCase):
+    """?fields= / ?omit= de los listados, por la lectura rápida y por el serializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        for i in range(5):
+            crear_instalacion(
+                cls, f'OT{i}', crear_producto(f'S{i}', cls.tecnico, cls.operador),
+                fecha_instalacion=FECHA + datetime.timedelta(days=i % 2),
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _filas(self, url, **params):
+        respuesta = self.client.get(url, params)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()['results']
+
+    def _sin_lectura_rapida(self, url, **params):
+        cache.clear()
+        with mock.patch.object(lectura_rapida, 'codificador_para', return_value=None):
+            return self._filas(url, **params)
+
+    def test_fields_y_omit(self):
+        completas = self._filas('/instalaciones/')
+        self.assertEqual([list(fila) for fila in self._filas('/instalaciones/', fields='numero_ot,direccion')],
+                         [['direccion', 'numero_ot']] * 5)
+        omitidas = self._filas('/instalaciones/', omit='direccion,observaciones')
+        self.assertEqual(list(omitidas[0]), [c for c in completas[0] if c not in ('direccion', 'observaciones')])
+        ambos = self._filas('/instalaciones/', fields='numero_ot,direccion', omit='direccion')
+        self.assertEqual(ambos[0], {'numero_ot': completas[0]['numero_ot']})
+
+    def test_nombres_desconocidos_se_ignoran(self):
+        completas = self._filas('/instalaciones/')
+        self.assertEqual(self._filas('/instalaciones/', fields='numero_ot,no_existe'),
+                         [{'numero_ot': fila['numero_ot']} for fila in completas])
+        self.assertEqual(self._filas('/instalaciones/', omit='no_existe'), completas)
+        self.assertEqual(self._filas('/instalaciones/', fields=' , '), completas)
+        # Solo nombres desconocidos: ningún campo
+        self.assertEqual(self._filas('/instalaciones/', fields='no_existe'), [{}] * 5)
+
+    def test_igual_que_sin_lectura_rapida(self):
+        for url, params in (
+            ('/instalaciones/', {'fields': 'numero_ot,fecha_instalacion,valor_dr'}),
+            ('/instalaciones/', {'omit': 'direccion', 'search': 'OT1'}),
+            ('/productos/', {'fields': 'producto_serie,id_operador,fecha_asignacion'}),
+            ('/productos/', {'omit': 'cantidad', 'include_assigned': '1'}),
+        ):
+            with self.subTest(url=url, **params):
+                self.assertEqual(self._filas(url, **params), self._sin_lectura_rapida(url, **params))
+
+    def test_la_consulta_lee_solo_las_columnas_pedidas(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self._filas('/instalaciones/', fields='numero_ot')
+        principal = next(c['sql'] for c in consultas if 'numero_ot' in c['sql'] and 'COUNT' not in c['sql'])
+        self.assertNotIn('direccion', principal)
+        self.assertNotIn('observaciones', principal)
+
+    def test_cursor_con_campos_que_no_incluyen_el_orden(self):
+        # El cursor se arma con fecha_instalacion e id aunque no se devuelvan
+        respuesta = self.client.get('/instalaciones/', {'cursor': '', 'page_size': 2, 'fields': 'numero_ot'})
+        datos = respuesta.json()
+        numeros = [fila['numero_ot'] for fila in datos['results']]
+        while datos['next']:
+            datos = self.client.get(datos['next']).json()
+            self.assertEqual([list(fila) for fila in datos['results']], [['numero_ot']] * len(datos['results']))
+            numeros.extend(fila['numero_ot'] for fila in datos['results'])
+        self.assertEqual(numeros, ['OT3', 'OT1', 'OT4', 'OT2', 'OT0'])
+
+
+def _escrituras(consultas):
+    return [c['sql'] for c in consultas if c['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE', 'COPY'))]
+
+
+class SimulacroImportacionTests(TestCase):
+    """dry_run: no escribe nada e informa las mismas filas inválidas que la importación real."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        crear_instalacion(cls, 'X', crear_producto('S0', cls.tecnico, cls.operador))
+        crear_producto('P1', cls.tecnico, cls.operador)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _contar(self):
+        return {
+            modelo.__name__: modelo.objects.count()
+            for modelo in (models.Instalaciones, models.Productos, models.ResumenInstalacionesDiario)
+        }
+
+    def _simular(self, url, cuerpo):
+        antes = self._contar()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post(url, dict(cuerpo, dry_run=True), format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(_escrituras(consultas), [])
+        self.assertEqual(self._contar(), antes)
+        return respuesta.json()
+
+    def test_instalaciones(self):
+        filas = [
+            fila_instalacion(self, 'X', 'S1'),
+            fila_instalacion(self, 'Y', 'S0'),
+            fila_instalacion(self, 'Y', 'S2', id_tecnico=999),
+            fila_instalacion(self, 'Y', 'S3', fecha_instalacion='mañana'),
+            fila_instalacion(self, 'X', 'S4'),
+            'no es un objeto',
+        ]
+        informe = self._simular('/instalaciones/bulk-import/', {'instalaciones': filas})
+        self.assertEqual((informe['total'], informe['validas'], informe['invalidas']), (6, 3, 3))
+
+        resultado = importacion.ImportadorInstalaciones().importar(filas)
+        invalidas = {fila['fila']: fila.get('errores', fila.get('error'))
+                     for fila in informe['filas'] if fila['estado'] == 'invalida'}
+        self.assertEqual(invalidas, {error['fila']: error.get('errores', error.get('error'))
+                                     for error in resultado['errores']})
+        # Las OT previstas son las que recibió cada fila
+        previstas = {fila['numero_ot'] for fila in informe['filas'] if fila['estado'] == 'valida'}
+        self.assertEqual(previstas, {'X_DUP1', 'Y', 'X_DUP2'})
+        self.assertEqual(set(models.Instalaciones.objects.exclude(numero_ot='X').values_list('numero_ot', flat=True)),
+                         previstas)
+
+    def test_productos(self):
+        filas = [
+            {'producto_serie': 'P1', 'nombre_producto': 'Router', 'categoria': 'ONT', 'cantidad': 3,
+             'id_tecnico': self.tecnico.pk, 'id_operador': self.operador.pk, 'fecha_asignacion': '2025-01-02'},
+            {'producto_serie': 'P2', 'nombre_producto': 'Router', 'categoria': 'ONT', 'cantidad': 1,
+             'id_tecnico': self.tecnico.pk, 'id_operador': self.operador.pk, 'fecha_asignacion': '2025-01-02'},
+            {'producto_serie': 'P2', 'nombre_producto': 'Router', 'categoria': 'ONT', 'cantidad': 1,
+             'id_tecnico': self.tecnico.pk, 'id_operador': self.operador.pk, 'fecha_asignacion': '2025-01-02'},
+            {'producto_serie': 'P3', 'nombre_producto': 'Router', 'categoria': 'ONT', 'cantidad': 1,
+             'id_tecnico': self.tecnico.pk, 'fecha_asignacion': '2025-01-02'},
+            {'producto_serie': 'P4', 'nombre_producto': 'Router', 'categoria': 'ONT', 'cantidad': 'muchas',
+             'id_tecnico': 999, 'id_operador': self.operador.pk, 'fecha_asignacion': '2025-01-02'},
+            ['no es un objeto'],
+        ]
+        informe = self._simular('/productos/bulk-import/', {'productos': filas})
+        resultado = importacion.ImportadorProductos().importar(filas)
+
+        def por_fila(filas_informe):
+            return [
+                (fila['fila'], fila['estado'], fila.get('errores'), fila.get('duplicado_de'))
+                for fila in filas_informe
+            ]
+        self.assertEqual(por_fila(informe['filas']), por_fila(resultado['filas']))
+        for clave in ('total', 'creados', 'actualizados', 'duplicados', 'invalidos'):
+            self.assertEqual(informe[clave], resultado[clave], clave)
+        self.assertEqual((informe['creados'], informe['actualizados'], informe['invalidos']), (1, 1, 3))
+
+
+class ImportacionProductosTests(TestCase):
+    """ImportadorProductos: upsert por serie (COPY + ON CONFLICT en PostgreSQL) y el endpoint."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+        cls.existente = crear_producto('P1', cls.tecnico, cls.operador, cantidad=1)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _fila(self, serie, **campos):
+        return {
+            'producto_serie': serie, 'nombre_producto': 'Router, "doble" banda', 'categoria': 'ONT',
+            'cantidad': 4, 'id_tecnico': self.otro_tecnico.pk, 'id_operador': self.otro_operador.pk,
+            'fecha_asignacion': '2025-02-03', **campos,
+        }
+
+    def test_creados_y_actualizados(self):
+        importador = importacion.ImportadorProductos()
+        importador.tamano_lote = 2
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = importador.importar([
+                self._fila('P2'), self._fila('P1'), self._fila('P3', nombre_producto='Línea 1\nLínea 2'), self._fila('P2'),
+                self._fila('P4', cantidad='x'),
+            ])
+        if EN_POSTGRESQL:
+            self.assertEqual(sum('COPY productos_carga' in c['sql'] for c in consultas), 2)
+        self.assertEqual(
+            [(fila['fila'], fila['estado']) for fila in resultado['filas']],
+            [(1, 'creado'), (2, 'actualizado'), (3, 'creado'), (4, 'duplicado'), (5, 'invalido')],
+        )
+        self.assertEqual((resultado['creados'], resultado['actualizados']), (2, 1))
+        self.assertEqual(resultado['filas'][1]['id_producto'], self.existente.pk)
+
+        productos = {p.producto_serie: p for p in models.Productos.objects.all()}
+        self.assertEqual(sorted(productos), ['P1', 'P2', 'P3'])
+        actualizado = productos['P1']
+        self.assertEqual(
+            (actualizado.nombre_producto, actualizado.cantidad, actualizado.id_tecnico_id,
+             actualizado.id_operador_id, actualizado.fecha_asignacion),
+            ('Router, "doble" banda', 4, self.otro_tecnico.pk, self.otro_operador.pk, datetime.date(2025, 2, 3)),
+        )
+        self.assertEqual(productos['P3'].nombre_producto, 'Línea 1\nLínea 2')
+        self.assertEqual(resultado['filas'][0]['id_producto'], productos['P2'].pk)
+
+    def test_endpoint(self):
+        respuesta = self.client.post('/productos/bulk-import/', {'productos': [self._fila('P1'), self._fila('P2')]},
+                                     format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual((respuesta.json()['creados'], respuesta.json()['actualizados']), (1, 1))
+        # Sin filas válidas: 400 con el estado de cada fila
+        respuesta = self.client.post('/productos/bulk-import/', {'productos': [self._fila('P5', cantidad='x')]},
+                                     format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['invalidos'], 1)
+
+    def test_endpoint_datos_mal_formados(self):
+        for cuerpo in ([self._fila('P2')], {'productos': []}, {'productos': {'producto_serie': 'P2'}}):
+            respuesta = self.client.post('/productos/bulk-import/', cuerpo, format='json')
+            self.assertEqual(respuesta.status_code, 400, cuerpo)
+            self.assertIn('error', respuesta.json())
+
+    def test_endpoint_errores_de_la_base(self):
+        cuerpo = {'productos': [self._fila('P2')]}
+        with mock.patch.object(importacion.ImportadorProductos, 'importar', side_effect=DataError('valor muy largo')):
+            respuesta = self.client.post('/productos/bulk-import/', cuerpo, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json(), {'error': 'Error en la importación: valor muy largo'})
+        with mock.patch.object(importacion.ImportadorProductos, 'importar', side_effect=RuntimeError('fallo')):
+            with self.assertRaises(RuntimeError):
+                self.client.post('/productos/bulk-import/', cuerpo, format='json')
+
+
+class CatalogosTests(TestCase):
+    """Caché de catálogos: entrega copias y se invalida al escribir."""
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_catalogos(cls)
+
+    def setUp(self):
+        catalogos.invalidar()
+
+    def test_obtener_devuelve_copias(self):
+        tecnico = catalogos.obtener(models.Tecnicos, self.tecnico.pk)
+        self.assertEqual(tecnico, self.tecnico)
+        self.assertIsNot(catalogos.obtener(models.Tecnicos, self.tecnico.pk), tecnico)
+        tecnico.nombre = 'Modificado'
+        models.Instalaciones(id_tecnico=tecnico)
+        self.assertEqual(catalogos.obtener(models.Tecnicos, self.tecnico.pk).nombre, 'Ana')
+
+        tabla = catalogos.tabla(models.Dr)
+        tabla[self.dr.pk].valor_dr = 0
+        tabla.clear()
+        self.assertEqual(catalogos.obtener(models.Dr, self.dr.pk).valor_dr, 5)
+
+    def test_sin_consultas_despues_de_cargar(self):
+        catalogos.obtener(models.Operadores, self.operador.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(catalogos.obtener(models.Operadores, self.otro_operador.pk).nombre_operador, 'OP2')
+        with self.assertRaises(KeyError):
+            catalogos.obtener(models.Operadores, 999)
+
+    def test_se_invalida_al_guardar(self):
+        self.assertEqual(catalogos.obtener(models.Acometidas, self.acometida.pk).precio, 10)
+        self.acometida.precio = 11
+        self.acometida.save()
+        self.assertEqual(catalogos.obtener(models.Acometidas, self.acometida.pk).precio, 11)
@@ -0,0 +1,226 @@
+"""
+Trabajos en segundo plano (tabla trabajos, migración 0009).
+
+La petición crea la fila del trabajo y responde enseguida; un pool de
+TRABAJOS_HILOS hilos del proceso web (0 = ninguno) toma los pendientes y
+ejecuta la función de TIPOS correspondiente. El comando procesar_trabajos
+atiende la misma cola desde un proceso aparte. Los pendientes se toman con
+SELECT ... FOR UPDATE SKIP LOCKED: cada trabajo lo ejecuta un solo hilo
+aunque haya varios procesos.
+
+Una función de trabajo recibe el trabajo, informa su avance con
+avance(trabajo, ...) y devuelve el resultado final (un dict).
+
+Un trabajo en proceso sin avance hace ABANDONADO_TRAS segundos se da por
+abandonado (el proceso que lo ejecutaba murió o se reinició) y vuelve a la
+cola con su avance: la función debe poder reanudarse desde
+trabajo.procesadas, o repetirse sin efectos dobles. Los abandonados se
+recuperan cada vez que se vacía la cola, y el proceso web la atiende al
+arrancar (iniciar(), desde wsgi.py).
+
+Los archivos subidos quedan en TRABAJOS_DIR, en el disco del proceso que
+los recibió: procesar_trabajos en otro contenedor necesita esa carpeta en
+un volumen compartido. Un trabajo cuyo archivo no está falla con un
+mensaje que lo indica.
+
+El comando procesar_trabajos corre además mantenimiento() como mucho una
+vez cada MANTENIMIENTO_CADA segundos, haya o no trabajos; los hilos del
+proceso web no lo corren. Sin ese comando, el mantenimiento se programa
+aparte con el comando purgar_sincronizacion (cron).
+"""
+import datetime
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import catalogos, models, sincronizacion
+
+logger = logging.getLogger(__name__)
+
+# tipo -> función que lo ejecuta
+TIPOS = {
+    'importar_instalaciones': 'configuracion.importacion.importar_archivo_instalaciones',
+    'importar_productos': 'configuracion.importacion.importar_archivo_productos',
+    'recalcular_precios': 'configuracion.precios.recalcular',
+}
+
+# Errores que se guardan en la fila de un trabajo; del resto solo queda la cantidad
+MAX_ERRORES = 1000
+
+# Segundos entre dos mantenimientos en el mismo proceso
+MANTENIMIENTO_CADA = 3600
+
+# Segundos sin avance tras los que un trabajo en proceso se da por abandonado
+ABANDONADO_TRAS = 900
+
+_pool = None
+_candado = threading.Lock()
+_ultimo_mantenimiento = None
+
+
+def directorio():
+    """Carpeta donde se guardan los archivos subidos hasta procesarlos."""
+    ruta = getattr(settings, 'TRABAJOS_DIR', os.path.join(settings.BASE_DIR, 'trabajos'))
+    os.makedirs(ruta, exist_ok=True)
+    return ruta
+
+
+def guardar_archivo(archivo):
+    """Copia un archivo subido a directorio() por partes; devuelve la ruta."""
+    extension = os.path.splitext(archivo.name)[1].lower()
+    ruta = os.path.join(directorio(), f'{uuid.uuid4().hex}{extension}')
+    with open(ruta, 'wb') as destino:
+        for parte in archivo.chunks():
+            destino.write(parte)
+    return ruta
+
+
+def crear(tipo, parametros=None, **campos):
+    """Encola un trabajo; los hilos lo toman al confirmarse la transacción."""
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de trabajo desconocido: {tipo}')
+    trabajo = models.Trabajo.objects.create(tipo=tipo, parametros=parametros or {}, **campos)
+    transaction.on_commit(despertar)
+    return trabajo
+
+
+def iniciar():
+    """Al arrancar el proceso web: atiende los pendientes y abandonados que hubiera."""
+    despertar()
+
+
+def despertar():
+    """Pide a un hilo del pool que atienda la cola."""
+    hilos = getattr(settings, 'TRABAJOS_HILOS', 2)
+    if not hilos:
+        return
+    global _pool
+    with _candado:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='trabajos')
+    _pool.submit(_atender_cola)
+
+
+def _atender_cola():
+    try:
+        while True:
+            while procesar_siguiente():
+                pass
+            # Los recuperados se atienden en esta misma vuelta
+            if not recuperar_abandonados():
+                break
+    except Exception:
+        logger.exception('Error atendiendo la cola de trabajos')
+    finally:
+        connection.close()
+
+
+def mantenimiento():
+    """
+    Tareas periódicas: descarta los borrados vencidos de la sincronización.
+    No hace nada si ya corrió en este proceso hace menos de MANTENIMIENTO_CADA
+    segundos.
+    """
+    global _ultimo_mantenimiento
+    with _candado:
+        ahora = time.monotonic()
+        if _ultimo_mantenimiento is not None and ahora - _ultimo_mantenimiento < MANTENIMIENTO_CADA:
+            return
+        _ultimo_mantenimiento = ahora
+    try:
+        purgadas = sincronizacion.purgar()
+    except Exception:
+        logger.exception('Error en el mantenimiento periódico')
+        return
+    if purgadas:
+        logger.info('Se descartaron %s borrados vencidos de la sincronización', purgadas)
+
+
+def recuperar_abandonados():
+    """Devuelve a la cola los trabajos abandonados (ver ABANDONADO_TRAS); devuelve cuántos."""
+    limite = timezone.now() - datetime.timedelta(seconds=ABANDONADO_TRAS)
+    recuperados = models.Trabajo.objects.filter(
+        estado=models.Trabajo.PROCESANDO, actualizado_en__lt=limite
+    ).update(estado=models.Trabajo.PENDIENTE)
+    if recuperados:
+        logger.warning('Se devolvieron a la cola %s trabajos abandonados', recuperados)
+    return recuperados
+
+
+def tomar_siguiente():
+    """Marca como en proceso el pendiente más antiguo y lo devuelve (o None)."""
+    with transaction.atomic():
+        trabajo = (
+            models.Trabajo.objects.select_for_update(skip_locked=True)
+            .filter(estado=models.Trabajo.PENDIENTE)
+            .order_by('id')
+            .first()
+        )
+        if trabajo is None:
+            return None
+        trabajo.estado = models.Trabajo.PROCESANDO
+        trabajo.iniciado_en = trabajo.actualizado_en = timezone.now()
+        trabajo.save(update_fields=['estado', 'iniciado_en', 'actualizado_en'])
+    return trabajo
+
+
+def procesar_siguiente():
+    """Ejecuta el próximo trabajo pendiente; False si no había ninguno."""
+    close_old_connections()
+    trabajo = tomar_siguiente()
+    if trabajo is None:
+        return False
+    ejecutar(trabajo)
+    return True
+
+
+def ejecutar(trabajo):
+    catalogos.revalidar()
+    if trabajo.archivo and not os.path.exists(trabajo.archivo):
+        _terminar(trabajo, models.Trabajo.FALLIDO, mensaje=(
+            'El archivo del trabajo no está en TRABAJOS_DIR de este proceso '
+            '(procesar_trabajos necesita la carpeta del proceso web)'
+        ))
+        return
+    try:
+        resultado = import_string(TIPOS[trabajo.tipo])(trabajo)
+    except Exception as e:
+        logger.exception('Falló el trabajo %s', trabajo.pk)
+        _terminar(trabajo, models.Trabajo.FALLIDO, mensaje=str(e))
+    else:
+        _terminar(trabajo, models.Trabajo.TERMINADO, resultado=resultado or {})
+    finally:
+        if trabajo.archivo and os.path.exists(trabajo.archivo):
+            os.remove(trabajo.archivo)
+
+
+def avance(trabajo, omitidos=0, **campos):
+    """
+    Guarda en la fila del trabajo procesadas, total, resultado y/o errores.
+    `errores` es la lista completa hasta ahora, que solo crece: se guardan
+    los primeros MAX_ERRORES (y no se reescriben si no cambiaron) y la
+    cantidad total en total_errores. Un trabajo reanudado parte de los
+    errores guardados; `omitidos` cuenta los anteriores que no se guardaron.
+    """
+    if 'errores' in campos:
+        errores = campos.pop('errores')
+        if len(trabajo.errores) < min(len(errores), MAX_ERRORES):
+            campos['errores'] = errores[:MAX_ERRORES]
+        if len(errores) + omitidos != trabajo.total_errores:
+            campos['total_errores'] = len(errores) + omitidos
+    for nombre, valor in campos.items():
+        setattr(trabajo, nombre, valor)
+    trabajo.actualizado_en = timezone.now()
+    trabajo.save(update_fields=[*campos, 'actualizado_en'])
+
+
+def _terminar(trabajo, estado, **campos):
+    avance(trabajo, estado=estado, terminado_en=timezone.now(), **campos)
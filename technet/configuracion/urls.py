@@ -4,19 +4,28 @@ from . import views
 urlpatterns = [
     path('acometidas/', views.AcometidasList.as_view()),
     path('acometidas/<int:pk>/', views.AcometidasDetail.as_view()),
+    path('catalogos/', views.catalogos_formulario),
+    path('dashboard/resumen/', views.dashboard_resumen),
     path('descuentos/', views.DescuentosList.as_view()),
     path('descuentos/<int:pk>/', views.DescuentosDetail.as_view()),
     path('dr/', views.DrList.as_view()),
     path('dr/<int:pk>/', views.DrDetail.as_view()),
     path('instalaciones/', views.InstalacionesList.as_view()),
     path('instalaciones/<int:pk>/', views.InstalacionesDetail.as_view()),
+    path('instalaciones/bulk/', views.InstalacionesBulk.as_view()),
     path('instalaciones/bulk-import/', views.instalaciones_bulk_import),
+    path('instalaciones/export/', views.InstalacionesExport.as_view()),
+    path('instalaciones/serie/', views.instalaciones_serie),
     path('operadores/', views.OperadoresList.as_view()),
     path('operadores/<int:pk>/', views.OperadoresDetail.as_view()),
     path('productos/', views.ProductosList.as_view()),
     path('productos/<int:pk>/', views.ProductosDetail.as_view()),
+    path('productos/bulk/', views.ProductosBulk.as_view()),
+    path('productos/bulk-import/', views.productos_bulk_import),
     path('tecnicos/', views.TecnicosList.as_view()),
     path('tecnicos/<int:pk>/', views.TecnicosDetail.as_view()),
     path('tipodeordenes/', views.TipoOrdenLista.as_view()),
     path('tipodeordenes/<int:pk>/', views.TipoOrdenEliminar.as_view()),
+    path('trabajos/<int:pk>/', views.TrabajosDetail.as_view()),
+    path('trabajos/importaciones/', views.importaciones_crear),
 ]
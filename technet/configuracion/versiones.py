@@ -0,0 +1,62 @@
+"""
+ETag de la API a partir de las versiones de las tablas.
+
+Los triggers de las migraciones 0007 y 0012 cambian la versión de una
+tabla con cada escritura confirmada: es el contador de versiones_tablas
+más las marcas de versiones_cambios que todavía no se plegaron en él. El
+ETag de una respuesta solo depende de las versiones de las tablas que lee,
+de la URL y del formato: se calcula con una consulta, antes de ejecutar la
+consulta principal. Sin PostgreSQL (sin triggers) no se generan ETag.
+"""
+import hashlib
+
+from django.db import connection
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+
+
+# Incrementar si cambia la forma de las respuestas con los mismos datos,
+# para que los clientes no reutilicen representaciones viejas tras un deploy
+VERSION_FORMATO = 1
+
+
+def obtener(tablas):
+    """{tabla: versión} de las tablas pedidas; 0 si la tabla no tiene contador."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT v.tabla, v.version + (SELECT count(*) FROM versiones_cambios c WHERE c.tabla = v.tabla)
+            FROM versiones_tablas v
+            WHERE v.tabla = ANY(%s)
+        """, [list(tablas)])
+        actuales = dict(cursor.fetchall())
+    return {tabla: actuales.get(tabla, 0) for tabla in tablas}
+
+
+def token(tablas, *partes):
+    """Resumen de las versiones de `tablas` (y `partes`), o None si no hay contadores."""
+    if connection.vendor != 'postgresql':
+        return None
+    clave = repr((VERSION_FORMATO, sorted(obtener(tablas).items()), partes))
+    return hashlib.md5(clave.encode('utf-8')).hexdigest()
+
+
+def etag(tablas, *partes):
+    """ETag fuerte para una respuesta que lee `tablas`, o None si no hay contadores."""
+    valor = token(tablas, *partes)
+    return None if valor is None else '"%s"' % valor
+
+
+def coincide(etag_actual, if_none_match):
+    # Comparación débil (RFC 9110): la compresión convierte el ETag en W/"..."
+    if not if_none_match:
+        return False
+    candidatos = parse_etags(if_none_match)
+    return '*' in candidatos or etag_actual in (c.removeprefix('W/') for c in candidatos)
+
+
+def marcar(response, etag_actual):
+    """Agrega el ETag y obliga a revalidar: la respuesta cambia con cada escritura."""
+    response['ETag'] = etag_actual
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Accept',))
+    return response
@@ -1,68 +1,291 @@
+import csv
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import chain
+
+from django.contrib.auth import authenticate
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DataError, IntegrityError, connection, transaction
+from django.db.models import BooleanField, Count, Exists, F, OuterRef, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.http import HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import generics
+from django.utils.dateparse import parse_date
+from rest_framework import filters, generics, status
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.decorators import api_view, parser_classes, renderer_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
-from rest_framework import filters
-from django.contrib.auth import authenticate
-from . import models
-from . import serializers
-from django.db.models import Exists, OuterRef
 
-# Configuración de paginación
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 50000  # Permitir exportar grandes cantidades de datos
+from . import (
+    escritura_instalaciones, importacion, lectura_rapida, models, planillas, precios, resumenes, serializers,
+    sincronizacion, trabajos, versiones,
+)
+from .busqueda import BusquedaIndexadaFilter
+from .pagination import StandardResultsSetPagination, StandardOrKeysetPagination
+from .renderers import RENDERERS_LISTADO
+
+class FormatosListadoMixin:
+    # JSON normal más el formato columnar y MessagePack (?format=columnar / msgpack)
+    renderer_classes = RENDERERS_LISTADO
+
+class EtagVersionMixin:
+    """
+    GET condicional: ETag fuerte calculado con la versión de las tablas que
+    lee la vista (`tablas_version`, por defecto la del modelo), la URL y el
+    formato. Si coincide con If-None-Match responde 304 sin ejecutar la
+    consulta principal ni serializar.
+    """
+    tablas_version = None
+
+    def get_tablas_version(self):
+        return self.tablas_version or (self.queryset.model._meta.db_table,)
+
+    def get(self, request, *args, **kwargs):
+        etag = versiones.etag(self.get_tablas_version(), request.get_full_path(), request.accepted_media_type)
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+        if versiones.coincide(etag, request.META.get('HTTP_IF_NONE_MATCH')):
+            response = HttpResponseNotModified()
+        else:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return versiones.marcar(response, etag)
+
+class CamposDinamicosMixin:
+    """
+    Mixin para los listados: ?fields=a,b devuelve solo esos campos y
+    ?omit=c,d los quita. La consulta se limita con only() a las columnas
+    que el serializer realmente va a leer (más la clave y el orden).
+    """
+    def _parametro_campos(self, nombre):
+        valor = self.request.query_params.get(nombre)
+        if not valor:
+            return None
+        # Solo separadores (?fields=,) cuenta como sin indicar
+        return [campo.strip() for campo in valor.split(',') if campo.strip()] or None
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and self.request.method == 'GET':
+            kwargs.setdefault('fields', self._parametro_campos('fields'))
+            kwargs.setdefault('omit', self._parametro_campos('omit'))
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method != 'GET':
+            return queryset
+        opts = queryset.model._meta
+        serializer = self.get_serializer_class()(
+            fields=self._parametro_campos('fields'),
+            omit=self._parametro_campos('omit'),
+        )
+        columnas = {opts.pk.name}
+        columnas.update(campo.lstrip('-') for campo in getattr(self, 'keyset_ordering', ()))
+        for campo in serializer.fields.values():
+            try:
+                columnas.add(opts.get_field(campo.source).name)
+            except FieldDoesNotExist:
+                pass
+        # Los serializers solo devuelven el id de las FK: no hace falta el JOIN
+        return queryset.select_related(None).only(*columnas)
+
+class LecturaRapidaMixin:
+    """
+    Mixin para los listados: lee tuplas con values_list() y las convierte
+    con el codificador compilado de lectura_rapida, sin crear una instancia
+    del modelo ni pasar por el serializer en cada fila. La respuesta es la
+    misma; si el serializer no se puede compilar se usa el list() normal.
+    """
+    def get_codificador(self):
+        serializer = self.get_serializer_class()(
+            context=self.get_serializer_context(),
+            fields=self._parametro_campos('fields'),
+            omit=self._parametro_campos('omit'),
+        )
+        return lectura_rapida.codificador_para(serializer)
+
+    def serializar_filas(self, queryset):
+        """Todas las filas del queryset, sin paginar, con el mismo formato que list()."""
+        codificador = self.get_codificador()
+        if codificador is None:
+            return self.get_serializer(queryset, many=True).data
+        return [codificador.codificar(fila) for fila in queryset.values_list(*codificador.columnas)]
+
+    def list(self, request, *args, **kwargs):
+        codificador = self.get_codificador()
+        if codificador is None:
+            return super().list(request, *args, **kwargs)
+
+        columnas = list(codificador.columnas)
+        # Las columnas del cursor se leen aunque no se devuelvan
+        for campo in getattr(self, 'keyset_ordering', ()):
+            if campo.lstrip('-') not in columnas:
+                columnas.append(campo.lstrip('-'))
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*columnas)
+
+        codificar = codificador.codificar
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([codificar(fila) for fila in page])
+        return Response([codificar(fila) for fila in queryset])
+
+class SincronizacionMixin:
+    """
+    Mixin para los listados con seguimiento de cambios: ?since=<token>
+    devuelve solo lo escrito después del token, sin paginar:
+    - `cambios`: filas creadas o modificadas que cumplen los filtros, con
+      el mismo formato que el listado;
+    - `eliminados`: claves de las filas borradas o que dejaron de cumplir
+      los filtros;
+    - `token`: el valor de ?since= para la próxima llamada.
+    ?since= vacío devuelve todas las filas como `cambios` y el primer token.
+    Un token más viejo que la retención de borrados responde 410: el
+    cliente vacía sus datos y vuelve a empezar con ?since= vacío.
+    """
+    since_query_param = 'since'
+
+    def list(self, request, *args, **kwargs):
+        if self.since_query_param not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        if connection.vendor != 'postgresql':
+            return Response(
+                {'error': 'La sincronización incremental requiere PostgreSQL'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            desde = sincronizacion.leer_token(request.query_params[self.since_query_param])
+        except ValueError:
+            return Response(
+                {'error': 'Token de sincronización inválido'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # El token se toma antes de leer: lo que la lectura no vea entra en la próxima
+        token = sincronizacion.token_actual()
+        queryset = self.filter_queryset(self.get_queryset())
+        if desde is None:
+            return Response({'token': token, 'cambios': self.serializar_filas(queryset), 'eliminados': []})
+
+        modelo = queryset.model
+        pk = modelo._meta.pk.name
+        cambios_qs = sincronizacion.cambiados(queryset, desde)
+        cambios = self.serializar_filas(cambios_qs)
+        # Filas modificadas que ya no cumplen los filtros: el cliente debe quitarlas
+        modificadas = set(sincronizacion.cambiados(modelo.objects.all(), desde).values_list(pk, flat=True))
+        visibles = set(cambios_qs.values_list(pk, flat=True)) if modificadas else set()
+        eliminados = sincronizacion.eliminados(modelo, desde) | (modificadas - visibles)
+        # Después de leer los borrados: una purga confirmada antes de esa lectura ya se ve aquí
+        if sincronizacion.vencido(modelo, desde):
+            return Response(
+                {'error': 'Token de sincronización vencido: sincronice de nuevo con ?since= vacío',
+                 'resincronizar': True},
+                status=status.HTTP_410_GONE
+            )
+        return Response({'token': token, 'cambios': cambios, 'eliminados': sorted(eliminados)})
 
 # Acometidas
-class AcometidasList(generics.ListCreateAPIView):
+class AcometidasList(EtagVersionMixin, FormatosListadoMixin, CamposDinamicosMixin, LecturaRapidaMixin, generics.ListCreateAPIView):
     queryset = models.Acometidas.objects.all()
     serializer_class = serializers.AcometidasSerializers
     pagination_class = StandardResultsSetPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['nombre_acometida']
 
-class AcometidasDetail(generics.RetrieveUpdateDestroyAPIView):
+class AcometidasDetail(EtagVersionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Acometidas.objects.all()
     serializer_class = serializers.AcometidasSerializers
 
 # Descuentos
-class DescuentosList(generics.ListCreateAPIView):
+class DescuentosList(EtagVersionMixin, FormatosListadoMixin, CamposDinamicosMixin, SincronizacionMixin, LecturaRapidaMixin, generics.ListCreateAPIView):
     queryset = models.Descuentos.objects.all()
     serializer_class = serializers.DescuentosSerializers
     pagination_class = StandardResultsSetPagination
 
-class DescuentosDetail(generics.RetrieveUpdateDestroyAPIView):
+class DescuentosDetail(EtagVersionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Descuentos.objects.all()
     serializer_class = serializers.DescuentosSerializers
 
+class RecalculoPreciosMixin:
+    """
+    Detalle de un catálogo cuyos precios se copian en instalaciones (DR,
+    tipos de orden). Si una edición cambia un precio, encola el recálculo
+    de las instalaciones (configuracion.precios) y devuelve el id del
+    trabajo en "trabajo". ?recalcular_desde= / ?recalcular_hasta=
+    (YYYY-MM-DD) lo limitan a ese rango de fechas; ?recalcular=no no
+    propaga el cambio.
+    """
+    catalogo_precios = None
+
+    def update(self, request, *args, **kwargs):
+        self.trabajo_recalculo = None
+        self.rango_recalculo = {}
+        for limite in ('desde', 'hasta'):
+            valor = request.query_params.get(f'recalcular_{limite}')
+            if not valor:
+                continue
+            try:
+                fecha = parse_date(valor)
+            except ValueError:
+                fecha = None
+            if fecha is None:
+                return Response(
+                    {'error': f'recalcular_{limite} debe ser una fecha YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            self.rango_recalculo[limite] = fecha
+        response = super().update(request, *args, **kwargs)
+        if self.trabajo_recalculo is not None:
+            response.data['trabajo'] = self.trabajo_recalculo.pk
+        return response
+
+    def perform_update(self, serializer):
+        _, _, columnas = precios.CATALOGOS[self.catalogo_precios]
+        antes = [getattr(serializer.instance, columna) for columna in columnas]
+        with transaction.atomic():
+            instancia = serializer.save()
+            recalcular = self.request.query_params.get('recalcular', '').lower() not in ('0', 'false', 'no')
+            if recalcular and [getattr(instancia, columna) for columna in columnas] != antes:
+                self.trabajo_recalculo = precios.encolar(
+                    self.catalogo_precios, instancia.pk, **self.rango_recalculo
+                )
+
 # Dr
-class DrList(generics.ListCreateAPIView):
+class DrList(EtagVersionMixin, FormatosListadoMixin, CamposDinamicosMixin, LecturaRapidaMixin, generics.ListCreateAPIView):
     queryset = models.Dr.objects.all()
     serializer_class = serializers.DrSerializers
     pagination_class = StandardResultsSetPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['nombre_dr']
 
-class DrDetail(generics.RetrieveUpdateDestroyAPIView):
+class DrDetail(EtagVersionMixin, RecalculoPreciosMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Dr.objects.all()
     serializer_class = serializers.DrSerializers
+    catalogo_precios = 'dr'
 
 #Instalaciones
-from django.db import connection
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from datetime import datetime
 
-class InstalacionesList(generics.ListCreateAPIView):
+def _decimal_str(valor):
+    # Mismo formato que los DecimalField de los serializers (2 decimales, como texto)
+    return str((valor or Decimal('0')).quantize(Decimal('0.01')))
+
+class InstalacionesFiltrosMixin:
+    """
+    Consulta y filtros compartidos por el listado y la exportación de
+    instalaciones: id_tecnico, id_operador, fecha_inicio / fecha_fin y search.
+    """
     queryset = models.Instalaciones.objects.all()
-    serializer_class = serializers.InstalacionesSerializers
-    pagination_class = StandardResultsSetPagination
-    filter_backends = [filters.SearchFilter]
+    keyset_ordering = ('-fecha_instalacion', '-id_instalacion')
+    filter_backends = [BusquedaIndexadaFilter]
     search_fields = ['numero_ot', 'direccion', 'producto_serie__producto_serie']
+    search_prefix_fields = ['numero_ot', 'producto_serie__producto_serie']
+    search_rank_fields = ['numero_ot', 'direccion', 'producto_serie_id']
     
     def get_queryset(self):
         queryset = super().get_queryset().select_related(
@@ -93,257 +316,479 @@ class InstalacionesList(generics.ListCreateAPIView):
         if fecha_fin:
             queryset = queryset.filter(fecha_instalacion__lte=fecha_fin)
         
-        # Eliminar duplicados y ordenar
-        return queryset.distinct().order_by('-fecha_instalacion')
+        # Ordenar (id_instalacion desempata para un orden estable). No hace falta
+        # distinct(): ningún filtro cruza relaciones a muchos, y si la búsqueda
+        # lo necesitara SearchFilter lo agrega por su cuenta
+        return queryset.order_by(*self.keyset_ordering)
+
+class InstalacionesList(EtagVersionMixin, FormatosListadoMixin, CamposDinamicosMixin, SincronizacionMixin, LecturaRapidaMixin, InstalacionesFiltrosMixin, generics.ListCreateAPIView):
+    serializer_class = serializers.InstalacionesSerializers
+    pagination_class = StandardOrKeysetPagination
+
+    def get_serializer_class(self):
+        # ?vista=compacta: solo las columnas de la tabla de instalaciones
+        if self.request.method == 'GET' and self.request.query_params.get('vista') == 'compacta':
+            return serializers.InstalacionesListaSerializers
+        return super().get_serializer_class()
     
     def perform_create(self, serializer):
-        # Usar SQL crudo para evitar problemas con campos generados
+        # INSERT ... RETURNING *: la respuesta sale de la fila insertada, con los
+        # campos generados por la base (total, valor_total_empresa...)
         data = serializer.validated_data
-        
-        # id_tipo_orden puede ser None (NULL)
-        tipo_orden_id = data['id_tipo_orden'].id_tipo_orden if data.get('id_tipo_orden') else None
-        valor_orden = data['id_tipo_orden'].valor_orden if data.get('id_tipo_orden') else 0
-        valor_orden_empresa = data['id_tipo_orden'].valor_orden_empresa if data.get('id_tipo_orden') else 0
-        
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO instalaciones (
-                    fecha_instalacion, id_tecnico, id_operador, direccion, numero_ot,
-                    producto_serie, id_dr, eq_reutilizado, eq_retirado, id_tipo_orden,
-                    metros_cable, id_acometida, observaciones, valor_dr, valor_orden,
-                    valor_orden_empresa, valor_dr_empresa, serie_dr, categoria
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id_instalacion
-            """, [
-                data['fecha_instalacion'],
-                data['id_tecnico'].id_unico_tecnico,
-                data['id_operador'].id_ope,
-                data['direccion'],
-                data['numero_ot'],
-                data['producto_serie'].producto_serie,
-                data['id_dr'].id_dr,
-                data.get('eq_reutilizado', ''),
-                data.get('eq_retirado', ''),
-                tipo_orden_id,
-                data['metros_cable'],
-                data['id_acometida'].id_acometida,
-                data.get('observaciones', ''),
-                data['valor_dr'],
-                valor_orden,
-                valor_orden_empresa,
-                data['valor_dr_empresa'],
-                data.get('serie_dr', ''),
-                data.get('categoria', '')
-            ])
-            new_id = cursor.fetchone()[0]
-        
-        # Retornar el objeto creado
-        return models.Instalaciones.objects.get(id_instalacion=new_id)
+        with transaction.atomic():
+            serializer.instance = escritura_instalaciones.crear(data)
+            resumenes.refrescar_dias([data['fecha_instalacion']])
 
-class InstalacionesDetail(generics.RetrieveUpdateDestroyAPIView):
+class InstalacionesDetail(EtagVersionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Instalaciones.objects.all()
     serializer_class = serializers.InstalacionesSerializers
     
     def perform_update(self, serializer):
-        # Usar SQL crudo para evitar problemas con campos generados
+        # UPDATE ... RETURNING * sobre la instancia que ya cargó get_object();
+        # con PATCH, los campos que no vienen conservan su valor
         data = serializer.validated_data
-        instance = self.get_object()
-        
-        # id_tipo_orden puede ser None (NULL)
-        tipo_orden_id = data['id_tipo_orden'].id_tipo_orden if data.get('id_tipo_orden') else None
-        valor_orden = data['id_tipo_orden'].valor_orden if data.get('id_tipo_orden') else 0
-        valor_orden_empresa = data['id_tipo_orden'].valor_orden_empresa if data.get('id_tipo_orden') else 0
-        
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                UPDATE instalaciones SET
-                    fecha_instalacion = %s,
-                    id_tecnico = %s,
-                    id_operador = %s,
-                    direccion = %s,
-                    numero_ot = %s,
-                    producto_serie = %s,
-                    id_dr = %s,
-                    eq_reutilizado = %s,
-                    eq_retirado = %s,
-                    id_tipo_orden = %s,
-                    metros_cable = %s,
-                    id_acometida = %s,
-                    observaciones = %s,
-                    valor_dr = %s,
-                    valor_orden = %s,
-                    valor_orden_empresa = %s,
-                    valor_dr_empresa = %s,
-                    serie_dr = %s,
-                    categoria = %s
-                WHERE id_instalacion = %s
-            """, [
-                data['fecha_instalacion'],
-                data['id_tecnico'].id_unico_tecnico,
-                data['id_operador'].id_ope,
-                data['direccion'],
-                data['numero_ot'],
-                data['producto_serie'].producto_serie if hasattr(data['producto_serie'], 'producto_serie') else data['producto_serie'],
-                data['id_dr'].id_dr,
-                data.get('eq_reutilizado', ''),
-                data.get('eq_retirado', ''),
-                tipo_orden_id,
-                data['metros_cable'],
-                data['id_acometida'].id_acometida,
-                data.get('observaciones', ''),
-                data['valor_dr'],
-                valor_orden,
-                valor_orden_empresa,
-                data['valor_dr_empresa'],
-                data.get('serie_dr', ''),
-                data.get('categoria', ''),
-                instance.id_instalacion
+        instance = serializer.instance
+        with transaction.atomic():
+            serializer.instance = escritura_instalaciones.actualizar(instance, data)
+            resumenes.refrescar_dias([
+                instance.fecha_instalacion,
+                data.get('fecha_instalacion', instance.fecha_instalacion),
             ])
-        
-        # Retornar el objeto actualizado
-        return models.Instalaciones.objects.get(id_instalacion=instance.id_instalacion)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            resumenes.refrescar_dias([instance.fecha_instalacion])
+
+class EdicionMasivaMixin:
+    """
+    Edición y borrado de varias filas a la vez (.../bulk/). Las filas se
+    eligen con "ids" en el cuerpo (exactamente esas, sin los filtros ni las
+    exclusiones por defecto del listado) o con los mismos filtros de la URL
+    que el listado (`parametros_filtro`); sin ninguno de los dos no se toca
+    nada. PATCH aplica "cambios", validados como una edición parcial, con
+    un solo UPDATE; DELETE borra con un solo DELETE. Responde la cantidad
+    de filas.
+    """
+    parametros_filtro = ()
+    # Claves y valores únicos: no tiene sentido asignarlos en bloque
+    campos_no_editables = ()
+
+    def _filas(self, request):
+        """(queryset de las filas elegidas, None) o (None, respuesta de error)."""
+        ids = request.data.get('ids')
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+                return None, Response(
+                    {'error': '"ids" debe ser una lista de ids'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return self.queryset.model.objects.filter(pk__in=ids), None
+        if not any(request.query_params.get(nombre) for nombre in self.parametros_filtro):
+            return None, Response(
+                {'error': f'Indique "ids" o al menos un filtro ({", ".join(self.parametros_filtro)})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.filter_queryset(self.get_queryset()), None
+
+    def patch(self, request, *args, **kwargs):
+        cambios = request.data.get('cambios')
+        if not isinstance(cambios, dict) or not cambios:
+            return Response(
+                {'error': 'Indique los campos a cambiar en "cambios"'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        no_editables = sorted(set(cambios) & set(self.campos_no_editables))
+        if no_editables:
+            return Response(
+                {'error': f'No se pueden cambiar en bloque: {", ".join(no_editables)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = self.get_serializer(data=cambios, partial=True)
+        serializer.is_valid(raise_exception=True)
+        if not serializer.validated_data:
+            return Response(
+                {'error': 'Ninguno de los campos de "cambios" se puede editar'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset, error = self._filas(request)
+        if error:
+            return error
+        try:
+            with transaction.atomic():
+                cantidad = self.actualizar(queryset, serializer.validated_data)
+        except IntegrityError as e:
+            return Response(
+                {'error': f'Los cambios violan una restricción de la base; no se actualizó ninguna fila: {e}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'actualizadas': cantidad})
+
+    def delete(self, request, *args, **kwargs):
+        queryset, error = self._filas(request)
+        if error:
+            return error
+        try:
+            with transaction.atomic():
+                cantidad = self.eliminar(queryset)
+        except IntegrityError:
+            return Response(
+                {'error': 'Algunas de las filas elegidas están referenciadas desde otras tablas; no se eliminó ninguna'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'eliminadas': cantidad})
+
+    def actualizar(self, queryset, cambios):
+        return queryset.update(**cambios)
+
+    def eliminar(self, queryset):
+        return queryset.delete()[1].get(queryset.model._meta.label, 0)
+
+class InstalacionesBulk(EdicionMasivaMixin, InstalacionesFiltrosMixin, generics.GenericAPIView):
+    serializer_class = serializers.InstalacionesSerializers
+    parametros_filtro = ('id_tecnico', 'id_operador', 'fecha_inicio', 'fecha_fin', 'search')
+    campos_no_editables = ('id_instalacion', 'numero_ot')
+
+    def actualizar(self, queryset, cambios):
+        if 'id_tipo_orden' in cambios:
+            valor_orden, valor_orden_empresa = escritura_instalaciones.valores_orden(cambios['id_tipo_orden'])
+            cambios = {**cambios, 'valor_orden': valor_orden, 'valor_orden_empresa': valor_orden_empresa}
+        fechas = resumenes.fechas_de(queryset)
+        cantidad = queryset.update(**cambios)
+        if cantidad and 'fecha_instalacion' in cambios:
+            fechas.append(cambios['fecha_instalacion'])
+        resumenes.refrescar_dias(fechas)
+        return cantidad
+
+    def eliminar(self, queryset):
+        fechas = resumenes.fechas_de(queryset)
+        cantidad = super().eliminar(queryset)
+        resumenes.refrescar_dias(fechas)
+        return cantidad
+
+def _es_dry_run(request):
+    """dry_run=true en la URL o en el cuerpo: validar sin escribir."""
+    valor = request.query_params.get('dry_run', request.data.get('dry_run', False))
+    return str(valor).lower() in ('1', 'true', 'si', 'sí')
 
 @api_view(['POST'])
 def instalaciones_bulk_import(request):
     """
     Endpoint para importar instalaciones desde Excel
     Espera un array de objetos con los datos de las instalaciones
+    Con dry_run=true solo devuelve el informe de validación por fila
     """
+    instalaciones_data = request.data.get('instalaciones', []) if isinstance(request.data, dict) else None
+
+    if not instalaciones_data:
+        return Response(
+            {'error': 'No se proporcionaron datos de instalaciones'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not isinstance(instalaciones_data, list):
+        return Response(
+            {'error': '"instalaciones" debe ser una lista de objetos'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if _es_dry_run(request):
+        return Response(importacion.ImportadorInstalaciones().validar(instalaciones_data))
+
+    # Validación e inserción por lotes (ver configuracion.importacion). Los
+    # errores de cada fila van en el resultado; aquí solo llegan los datos
+    # que la base rechaza para todo el lote. Lo demás es un error del servidor
     try:
-        instalaciones_data = request.data.get('instalaciones', [])
-        
-        if not instalaciones_data:
+        resultado = importacion.ImportadorInstalaciones().importar(instalaciones_data)
+    except (ValidationError, DjangoValidationError, IntegrityError, DataError) as e:
+        return Response(
+            {'error': f'Error en la importación: {e}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response(
+        resultado,
+        status=status.HTTP_201_CREATED if resultado['creadas'] > 0 else status.HTTP_400_BAD_REQUEST
+    )
+
+@api_view(['POST'])
+def productos_bulk_import(request):
+    """
+    Endpoint para importar productos desde Excel
+    Espera {"productos": [...]} y crea o actualiza cada producto según su
+    producto_serie; devuelve el estado de cada fila (creado, actualizado,
+    duplicado o invalido). Con dry_run=true devuelve el estado que tendría
+    cada fila sin escribir nada
+    """
+    productos_data = request.data.get('productos', []) if isinstance(request.data, dict) else None
+
+    if not productos_data:
+        return Response(
+            {'error': 'No se proporcionaron datos de productos'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not isinstance(productos_data, list):
+        return Response(
+            {'error': '"productos" debe ser una lista de objetos'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if _es_dry_run(request):
+        return Response(importacion.ImportadorProductos().validar(productos_data))
+
+    # Como en instalaciones_bulk_import: los errores de cada fila van en el
+    # resultado; lo que no sea un rechazo de los datos es un error del servidor
+    try:
+        resultado = importacion.ImportadorProductos().importar(productos_data)
+    except (ValidationError, DjangoValidationError, IntegrityError, DataError) as e:
+        return Response(
+            {'error': f'Error en la importación: {e}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response(
+        resultado,
+        status=status.HTTP_201_CREATED
+        if resultado['creados'] or resultado['actualizados'] else status.HTTP_400_BAD_REQUEST
+    )
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+def importaciones_crear(request):
+    """
+    Sube una planilla (XLSX o CSV) para importarla en segundo plano.
+    Campos: archivo, tipo (instalaciones | productos) e id_operador
+    (obligatorio para productos). Responde 202 con el trabajo; el avance se
+    consulta en trabajos/<id>/
+    """
+    archivo = request.FILES.get('archivo')
+    tipo = request.data.get('tipo')
+    if archivo is None:
+        return Response({'error': 'No se proporcionó el archivo'}, status=status.HTTP_400_BAD_REQUEST)
+    error_formato = planillas.error_formato(archivo.name)
+    if error_formato:
+        return Response({'error': error_formato}, status=status.HTTP_400_BAD_REQUEST)
+    if tipo not in ('instalaciones', 'productos'):
+        return Response({'error': 'tipo debe ser instalaciones o productos'}, status=status.HTTP_400_BAD_REQUEST)
+
+    parametros = {}
+    if tipo == 'productos':
+        id_operador = request.data.get('id_operador')
+        if not id_operador or not str(id_operador).isdigit() or \
+                not models.Operadores.objects.filter(pk=id_operador).exists():
             return Response(
-                {'error': 'No se proporcionaron datos de instalaciones'},
+                {'id_operador': 'El operador es obligatorio para importar productos.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        created_count = 0
-        errors = []
+        parametros['id_operador'] = int(id_operador)
 
-        # Cache local para reducir consultas repetidas
-        productos_cache = {}
-        tecnico_default = models.Tecnicos.objects.first()
-        existing_numero_ot = set(models.Instalaciones.objects.values_list('numero_ot', flat=True))
-        
-        for idx, inst_data in enumerate(instalaciones_data):
-            try:
-                # Manejar producto_serie - crear si no existe (con cache en memoria)
-                producto_serie_str = inst_data.get('producto_serie', 'NA')
-
-                producto = productos_cache.get(producto_serie_str)
-                if producto is None:
-                    producto = models.Productos.objects.filter(producto_serie=producto_serie_str).first()
-                    if not producto and tecnico_default:
-                        producto = models.Productos.objects.create(
-                            categoria=inst_data.get('categoria', 'NA'),
-                            nombre_producto='Producto Importado',
-                            producto_serie=producto_serie_str,
-                            cantidad=1,
-                            id_tecnico=tecnico_default,
-                            fecha_asignacion=inst_data.get('fecha_instalacion')
-                        )
-                    productos_cache[producto_serie_str] = producto
-                
-                # Actualizar inst_data con el producto_serie correcto
-                inst_data['producto_serie'] = producto_serie_str if producto else 'NA'
-                
-                # Manejar duplicados de numero_ot - agregar sufijo si ya existe (usando cache en memoria)
-                numero_ot_original = inst_data.get('numero_ot', 'NA')
-                numero_ot_final = numero_ot_original
-                contador = 1
-                
-                # Verificar si ya existe una instalación con este numero_ot
-                while numero_ot_final in existing_numero_ot:
-                    numero_ot_final = f"{numero_ot_original}_DUP{contador}"
-                    contador += 1
-                
-                inst_data['numero_ot'] = numero_ot_final
-                existing_numero_ot.add(numero_ot_final)
-                
-                # Forzar id_tipo_orden a None en importaciones desde Excel
-                inst_data['id_tipo_orden'] = None
-                inst_data['valor_orden'] = '0'
-                inst_data['valor_orden_empresa'] = '0'
-                
-                # Validar y crear cada instalación
-                serializer = serializers.InstalacionesSerializers(data=inst_data)
-                if serializer.is_valid():
-                    # Usar el mismo método de creación que InstalacionesList
-                    data = serializer.validated_data
-                    
-                    # id_tipo_orden siempre es NULL en importaciones desde Excel
-                    with connection.cursor() as cursor:
-                        cursor.execute("""
-                            INSERT INTO instalaciones (
-                                fecha_instalacion, id_tecnico, id_operador, direccion, numero_ot,
-                                producto_serie, id_dr, eq_reutilizado, eq_retirado, id_tipo_orden,
-                                metros_cable, id_acometida, observaciones, valor_dr, valor_orden,
-                                valor_orden_empresa, valor_dr_empresa, serie_dr, categoria
-                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NULL, %s, %s, %s, %s, 0, 0, %s, %s, %s)
-                            RETURNING id_instalacion
-                        """, [
-                            data['fecha_instalacion'],
-                            data['id_tecnico'].id_unico_tecnico,
-                            data['id_operador'].id_ope,
-                            data['direccion'],
-                            data['numero_ot'],
-                            producto_serie_str,
-                            data['id_dr'].id_dr,
-                            data.get('eq_reutilizado', ''),
-                            data.get('eq_retirado', ''),
-                            data['metros_cable'],
-                            data['id_acometida'].id_acometida,
-                            data.get('observaciones', ''),
-                            data['valor_dr'],
-                            data['valor_dr_empresa'],
-                            data.get('serie_dr', ''),
-                            data.get('categoria', '')
-                        ])
-                    
-                    created_count += 1
-                else:
-                    errors.append({
-                        'fila': idx + 1,
-                        'errores': serializer.errors
-                    })
-            except Exception as e:
-                errors.append({
-                    'fila': idx + 1,
-                    'error': str(e)
-                })
-        
-        return Response({
-            'creadas': created_count,
-            'errores': errors,
-            'total': len(instalaciones_data)
-        }, status=status.HTTP_201_CREATED if created_count > 0 else status.HTTP_400_BAD_REQUEST)
-        
-    except Exception as e:
+    ruta = trabajos.guardar_archivo(archivo)
+    trabajo = trabajos.crear(
+        f'importar_{tipo}', parametros, archivo=ruta, nombre_archivo=archivo.name[:255]
+    )
+    return Response(serializers.TrabajosSerializers(trabajo).data, status=status.HTTP_202_ACCEPTED)
+
+class TrabajosDetail(generics.RetrieveAPIView):
+    """
+    Estado de un trabajo. Con ?errores_desde=N devuelve solo los errores a
+    partir del N-ésimo, para consultar el avance sin repetir los ya leídos.
+    Se guardan los primeros trabajos.MAX_ERRORES; total_errores los cuenta
+    a todos.
+    """
+    queryset = models.Trabajo.objects.all()
+    serializer_class = serializers.TrabajosSerializers
+
+    def retrieve(self, request, *args, **kwargs):
+        trabajo = self.get_object()
+        datos = self.get_serializer(trabajo).data
+        desde = request.query_params.get('errores_desde', '')
+        if desde.isdigit():
+            datos['errores'] = trabajo.errores[int(desde):]
+        return Response(datos)
+
+@api_view(['GET'])
+def instalaciones_serie(request):
+    """
+    Serie temporal de instalaciones leída solo de las tablas de resumen.
+    Parámetros: intervalo (dia | semana | mes, por defecto mes),
+    fecha_inicio / fecha_fin y los filtros opcionales id_tecnico,
+    id_operador, id_acometida e id_tipo_orden.
+    """
+    intervalo = request.query_params.get('intervalo', 'mes')
+    if intervalo not in ('dia', 'semana', 'mes'):
         return Response(
-            {'error': f'Error en la importación: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            {'error': 'intervalo debe ser dia, semana o mes'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        fecha_inicio = request.query_params.get('fecha_inicio')
+        fecha_fin = request.query_params.get('fecha_fin')
+        fecha_inicio = date.fromisoformat(fecha_inicio) if fecha_inicio else None
+        fecha_fin = date.fromisoformat(fecha_fin) if fecha_fin else None
+    except ValueError:
+        return Response(
+            {'error': 'Formato de fecha inválido, use AAAA-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # El resumen mensual solo sirve si el rango cubre meses completos
+    meses_completos = (
+        (fecha_inicio is None or fecha_inicio.day == 1) and
+        (fecha_fin is None or (fecha_fin + timedelta(days=1)).day == 1)
+    )
+    if intervalo == 'mes' and meses_completos:
+        queryset = models.ResumenInstalacionesMensual.objects.all()
+        columna_fecha = 'mes'
+        periodo = F('mes')
+    else:
+        queryset = models.ResumenInstalacionesDiario.objects.all()
+        columna_fecha = 'fecha'
+        periodo = {
+            'dia': F('fecha'),
+            'semana': TruncWeek('fecha'),
+            'mes': TruncMonth('fecha'),
+        }[intervalo]
+
+    if fecha_inicio:
+        queryset = queryset.filter(**{columna_fecha + '__gte': fecha_inicio})
+    if fecha_fin:
+        queryset = queryset.filter(**{columna_fecha + '__lte': fecha_fin})
+    for dimension in resumenes.DIMENSIONES:
+        valor = request.query_params.get(dimension)
+        if valor:
+            queryset = queryset.filter(**{dimension: valor})
+
+    filas = (
+        queryset
+        .values(periodo=periodo)
+        .annotate(cantidad=Sum('cantidad'), **{m: Sum(m) for m in resumenes.MEDIDAS})
+        .order_by('periodo')
+    )
+    return Response({
+        'intervalo': intervalo,
+        'resultados': [
+            {
+                'periodo': fila['periodo'],
+                'cantidad': fila['cantidad'],
+                **{m: _decimal_str(fila[m]) for m in resumenes.MEDIDAS},
+            }
+            for fila in filas
+        ],
+    })
+
+class _Eco:
+    # Pseudo-buffer para csv.writer: devuelve la línea en lugar de guardarla
+    def write(self, valor):
+        return valor
+
+class InstalacionesExport(InstalacionesFiltrosMixin, generics.GenericAPIView):
+    """
+    Exporta las instalaciones filtradas (mismos filtros y search que el
+    listado) en streaming, como CSV (por defecto) o NDJSON con ?formato=ndjson.
+    Las filas se leen con un cursor de servidor por bloques, así que la
+    memoria del worker no depende de la cantidad exportada.
+    """
+    chunk_size = 2000
+    columnas = [
+        ('id_instalacion', 'id_instalacion'),
+        ('fecha_instalacion', 'fecha_instalacion'),
+        ('numero_ot', 'numero_ot'),
+        ('direccion', 'direccion'),
+        ('id_tecnico', 'id_tecnico__id_tecnico'),
+        ('tecnico', 'id_tecnico__nombre'),
+        ('tecnico_apellido', 'id_tecnico__apellido'),
+        ('operador', 'id_operador__nombre_operador'),
+        ('producto_serie', 'producto_serie'),
+        ('dr', 'id_dr__nombre_dr'),
+        ('serie_dr', 'serie_dr'),
+        ('acometida', 'id_acometida__nombre_acometida'),
+        ('tipo_orden', 'id_tipo_orden__nombre_orden'),
+        ('metros_cable', 'metros_cable'),
+        ('eq_reutilizado', 'eq_reutilizado'),
+        ('eq_retirado', 'eq_retirado'),
+        ('categoria', 'categoria'),
+        ('observaciones', 'observaciones'),
+        ('valor_dr', 'valor_dr'),
+        ('valor_dr_empresa', 'valor_dr_empresa'),
+        ('valor_orden', 'valor_orden'),
+        ('valor_orden_empresa', 'valor_orden_empresa'),
+        ('valor_añadido', 'valor_añadido'),
+        ('valor_opcional_empresa', 'valor_opcional_empresa'),
+        ('instalacion_compartida', 'instalacion_compartida'),
+        ('total', 'total'),
+        ('valor_total_empresa', 'valor_total_empresa'),
+    ]
+
+    def get(self, request, *args, **kwargs):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'ndjson'):
+            return Response(
+                {'error': 'formato debe ser csv o ndjson'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        encabezados = [nombre for nombre, _ in self.columnas]
+        filas = self.filter_queryset(self.get_queryset()).values_list(
+            *[campo for _, campo in self.columnas]
+        ).iterator(chunk_size=self.chunk_size)
+
+        if formato == 'csv':
+            writer = csv.writer(_Eco())
+            contenido = chain(
+                ['\ufeff' + writer.writerow(encabezados)],  # BOM para que Excel detecte UTF-8
+                (writer.writerow(fila) for fila in filas),
+            )
+            content_type = 'text/csv; charset=utf-8'
+        else:
+            contenido = (
+                json.dumps(dict(zip(encabezados, fila)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+                for fila in filas
+            )
+            content_type = 'application/x-ndjson; charset=utf-8'
+
+        response = StreamingHttpResponse(contenido, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="instalaciones_{date.today():%Y%m%d}.{formato}"'
         )
+        return response
 
 #Operadores
-class OperadoresList(generics.ListCreateAPIView):
+class OperadoresList(EtagVersionMixin, FormatosListadoMixin, CamposDinamicosMixin, LecturaRapidaMixin, generics.ListCreateAPIView):
     queryset = models.Operadores.objects.all()
     serializer_class = serializers.OperadoresSerializers
     pagination_class = StandardResultsSetPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['nombre_operador']
 
-class OperadoresDetail(generics.RetrieveUpdateDestroyAPIView):
+class OperadoresDetail(EtagVersionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Operadores.objects.all()
     serializer_class = serializers.OperadoresSerializers
 
 #Productos
-class ProductosList(generics.ListCreateAPIView):
+def productos_libres(queryset):
+    """
+    Productos cuya serie no está en ninguna instalación. En PostgreSQL, la
+    columna productos.asignado, mantenida por trigger (migración 0011) y
+    cubierta por los índices parciales productos_libres_*; en otras bases
+    (sin la columna), la búsqueda de la serie en instalaciones.
+    """
+    if connection.vendor != 'postgresql':
+        asignadas = models.Instalaciones.objects.filter(producto_serie=OuterRef('producto_serie'))
+        return queryset.filter(~Exists(asignadas))
+    return queryset.alias(
+        asignado=RawSQL('"productos"."asignado"', [], output_field=BooleanField())
+    ).filter(asignado=False)
+
+class ProductosFiltrosMixin:
+    """
+    Consulta y filtros compartidos por el listado y la edición masiva de
+    productos: id_tecnico, id_operador, search y, salvo con
+    include_assigned, sin las series ya asignadas a una instalación.
+    """
     queryset = models.Productos.objects.all()
-    serializer_class = serializers.ProductosSerializers
-    pagination_class = StandardResultsSetPagination
-    filter_backends = [filters.SearchFilter]
+    keyset_ordering = ('-fecha_asignacion', '-id_producto')
+    filter_backends = [BusquedaIndexadaFilter]
     search_fields = ['nombre_producto', 'producto_serie', 'categoria']
+    search_prefix_fields = ['producto_serie']
     
     def get_queryset(self):
         queryset = super().get_queryset().select_related('id_tecnico')
@@ -352,57 +797,201 @@ class ProductosList(generics.ListCreateAPIView):
         id_tecnico = self.request.query_params.get('id_tecnico', None)
         if id_tecnico:
             queryset = queryset.filter(id_tecnico=id_tecnico)
+
+        id_operador = self.request.query_params.get('id_operador', None)
+        if id_operador:
+            queryset = queryset.filter(id_operador=id_operador)
         
         # Excluir productos cuya serie ya esté asignada en alguna instalación
         include_assigned = self.request.query_params.get('include_assigned')
         if not include_assigned:
-            assigned_subq = models.Instalaciones.objects.filter(
-                producto_serie=OuterRef('producto_serie')
-            )
-            queryset = queryset.annotate(is_assigned=Exists(assigned_subq)).filter(is_assigned=False)
+            queryset = productos_libres(queryset)
         
-        return queryset.order_by('-fecha_asignacion')
+        return queryset.order_by(*self.keyset_ordering)
+
+class ProductosList(EtagVersionMixin, FormatosListadoMixin, CamposDinamicosMixin, SincronizacionMixin, LecturaRapidaMixin, ProductosFiltrosMixin, generics.ListCreateAPIView):
+    serializer_class = serializers.ProductosSerializers
+    pagination_class = StandardOrKeysetPagination
+
+class ProductosBulk(EdicionMasivaMixin, ProductosFiltrosMixin, generics.GenericAPIView):
+    serializer_class = serializers.ProductosSerializers
+    parametros_filtro = ('id_tecnico', 'id_operador', 'search')
+    campos_no_editables = ('id_producto', 'producto_serie')
 
-class ProductosDetail(generics.RetrieveUpdateDestroyAPIView):
+class ProductosDetail(EtagVersionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Productos.objects.all()
     serializer_class = serializers.ProductosSerializers
 
 #Tecnicos
-class TecnicosList(generics.ListCreateAPIView):
+class TecnicosList(EtagVersionMixin, FormatosListadoMixin, CamposDinamicosMixin, LecturaRapidaMixin, generics.ListCreateAPIView):
     queryset = models.Tecnicos.objects.all()
     serializer_class = serializers.TecnicosSerializers
     pagination_class = StandardResultsSetPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['nombre', 'apellido', 'id_tecnico']
 
-class TecnicosDetail(generics.RetrieveUpdateDestroyAPIView):
+class TecnicosDetail(EtagVersionMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Tecnicos.objects.all()
     serializer_class = serializers.TecnicosSerializers
 
 #Tipos de ordenes
-class TipoOrdenLista(generics.ListCreateAPIView):
+class TipoOrdenLista(EtagVersionMixin, FormatosListadoMixin, CamposDinamicosMixin, LecturaRapidaMixin, generics.ListCreateAPIView):
     queryset = models.Tipodeordenes.objects.all()
     serializer_class = serializers.TipoOrdenSerializers
     pagination_class = StandardResultsSetPagination
     filter_backends = [filters.SearchFilter]
     search_fields = ['nombre_tipo_orden']
 
-class TipoOrdenEliminar(generics.RetrieveUpdateDestroyAPIView):
+class TipoOrdenEliminar(EtagVersionMixin, RecalculoPreciosMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Tipodeordenes.objects.all()
     serializer_class = serializers.TipoOrdenSerializers
+    catalogo_precios = 'tipo_orden'
+
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        # Con muchas instalaciones, quitarles el tipo por lotes en segundo plano
+        # y borrarlo al final, en vez de bloquearlas todas en la petición
+        if models.Instalaciones.objects.filter(id_tipo_orden=instance.id_tipo_orden)[precios.LOTE:].exists():
+            trabajo = precios.encolar('tipo_orden', instance.id_tipo_orden, eliminar=True)
+            return Response({'trabajo': trabajo.pk}, status=status.HTTP_202_ACCEPTED)
+        self.perform_destroy(instance)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     def perform_destroy(self, instance):
         # Antes de eliminar el tipo de orden, poner en NULL las instalaciones que lo referencian
         # y resetear valor_orden / valor_orden_empresa a 0
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                UPDATE instalaciones
-                SET id_tipo_orden = NULL,
-                    valor_orden = 0,
-                    valor_orden_empresa = 0
-                WHERE id_tipo_orden = %s
-            """, [instance.id_tipo_orden])
-        instance.delete()
+        with transaction.atomic():
+            fechas = resumenes.fechas_de(
+                models.Instalaciones.objects.filter(id_tipo_orden=instance.id_tipo_orden)
+            )
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE instalaciones
+                    SET id_tipo_orden = NULL,
+                        valor_orden = 0,
+                        valor_orden_empresa = 0
+                    WHERE id_tipo_orden = %s
+                """, [instance.id_tipo_orden])
+            instance.delete()
+            resumenes.refrescar_dias(fechas)
+
+#Dashboard
+@api_view(['GET'])
+def dashboard_resumen(request):
+    """
+    Resumen del dashboard calculado en la base de datos.
+    Parámetros opcionales: fecha_inicio / fecha_fin (por defecto el mes actual)
+    e id_operador. Devuelve los totales, los ingresos por técnico del periodo
+    y las instalaciones más recientes.
+    """
+    hoy = date.today()
+    try:
+        fecha_inicio = date.fromisoformat(request.query_params['fecha_inicio']) \
+            if request.query_params.get('fecha_inicio') else hoy.replace(day=1)
+        fecha_fin = date.fromisoformat(request.query_params['fecha_fin']) \
+            if request.query_params.get('fecha_fin') else \
+            (fecha_inicio.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    except ValueError:
+        return Response(
+            {'error': 'Formato de fecha inválido, use AAAA-MM-DD'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    instalaciones = models.Instalaciones.objects.all()
+    productos = models.Productos.objects.all()
+    id_operador = request.query_params.get('id_operador')
+    if id_operador:
+        instalaciones = instalaciones.filter(id_operador=id_operador)
+        productos = productos.filter(id_operador=id_operador)
+
+    # Stock disponible: productos cuya serie no está asignada a una instalación
+    total_productos = productos_libres(productos).aggregate(
+        total=Sum('cantidad')
+    )['total'] or 0
+
+    del_periodo = instalaciones.filter(
+        fecha_instalacion__gte=fecha_inicio,
+        fecha_instalacion__lte=fecha_fin,
+    )
+    ingresos_mes = del_periodo.aggregate(total=Sum('valor_total_empresa'))['total']
+
+    por_tecnico = (
+        del_periodo
+        .values(
+            'id_tecnico',
+            'id_tecnico__nombre',
+            'id_tecnico__apellido',
+            'id_tecnico__id_tecnico',
+        )
+        .annotate(ingresos=Sum('total'), instalaciones=Count('id_instalacion'))
+        .order_by('-ingresos')
+    )
+
+    recientes = instalaciones.order_by('-fecha_instalacion', '-id_instalacion').values(
+        'id_instalacion', 'numero_ot', 'direccion', 'fecha_instalacion', 'total', 'id_tecnico'
+    )[:5]
+
+    return Response({
+        'fecha_inicio': fecha_inicio,
+        'fecha_fin': fecha_fin,
+        'total_instalaciones': instalaciones.count(),
+        'total_tecnicos': models.Tecnicos.objects.count(),
+        'total_productos': total_productos,
+        'ingresos_mes': _decimal_str(ingresos_mes),
+        'ingresos_por_tecnico': [
+            {
+                'id_unico_tecnico': fila['id_tecnico'],
+                'nombre': fila['id_tecnico__nombre'],
+                'apellido': fila['id_tecnico__apellido'],
+                'id_tecnico': fila['id_tecnico__id_tecnico'],
+                'ingresos': _decimal_str(fila['ingresos']),
+                'instalaciones': fila['instalaciones'],
+            }
+            for fila in por_tecnico
+        ],
+        'instalaciones_recientes': [
+            dict(fila, total=_decimal_str(fila['total']) if fila['total'] is not None else None)
+            for fila in recientes
+        ],
+    })
+
+# Catálogos del formulario de instalaciones
+CATALOGOS_FORMULARIO = (
+    ('tecnicos', models.Tecnicos, serializers.TecnicosSerializers),
+    ('operadores', models.Operadores, serializers.OperadoresSerializers),
+    ('tipodeordenes', models.Tipodeordenes, serializers.TipoOrdenSerializers),
+    ('dr', models.Dr, serializers.DrSerializers),
+    ('acometidas', models.Acometidas, serializers.AcometidasSerializers),
+)
+
+@api_view(['GET'])
+@renderer_classes(RENDERERS_LISTADO)
+def catalogos_formulario(request):
+    """
+    Técnicos, operadores, tipos de orden, DR y acometidas en una sola
+    respuesta (una consulta por tabla, sin paginar ni contar), con las
+    mismas filas que sus listados. `version` cambia con cualquier escritura
+    en esas tablas: con If-None-Match o ?version= igual a la actual se
+    responde 304 sin leer los catálogos.
+    """
+    version = versiones.token([modelo._meta.db_table for _, modelo, _ in CATALOGOS_FORMULARIO])
+    if version is not None:
+        etag = f'"{version}.{request.accepted_renderer.format}"'
+        if versiones.coincide(etag, request.META.get('HTTP_IF_NONE_MATCH')) or \
+                request.query_params.get('version') == version:
+            return versiones.marcar(HttpResponseNotModified(), etag)
+
+    datos = {'version': version}
+    for nombre, modelo, serializer_class in CATALOGOS_FORMULARIO:
+        queryset = modelo.objects.order_by(modelo._meta.pk.name)
+        codificador = lectura_rapida.codificador_para(serializer_class())
+        if codificador is None:
+            datos[nombre] = serializer_class(queryset, many=True).data
+        else:
+            datos[nombre] = [codificador.codificar(fila) for fila in queryset.values_list(*codificador.columnas)]
+
+    response = Response(datos)
+    return versiones.marcar(response, etag) if version is not None else response
 
 # Vista de Login personalizada
 class CustomAuthToken(ObtainAuthToken):
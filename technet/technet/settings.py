@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from decouple import config, Csv
 import dj_database_url
 
@@ -123,6 +124,7 @@ DJOSER = {
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'configuracion.middleware.CompresionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -236,7 +238,29 @@ if not DEBUG:
     SECURE_HSTS_INCLUDE_SUBDOMAINS = True
     SECURE_HSTS_PRELOAD = True
 
+# Compresión gzip / brotli de las respuestas de la API (bytes mínimos)
+COMPRESION_UMBRAL = config('COMPRESION_UMBRAL', default=1024, cast=int)
+
+# Segundos que se reutiliza la caché en memoria de catálogos (0 = sin vencimiento)
+CATALOGOS_CACHE_TTL = config('CATALOGOS_CACHE_TTL', default=300, cast=int)
+
+# Días que se guardan los borrados para ?since=; un token más viejo obliga
+# a sincronizar desde cero
+SINCRONIZACION_RETENCION_DIAS = config('SINCRONIZACION_RETENCION_DIAS', default=30, cast=int)
+
+# Trabajos en segundo plano: hilos por proceso web (0 = solo el comando
+# procesar_trabajos) y carpeta de los archivos subidos hasta procesarlos
+# (procesar_trabajos en otro contenedor necesita esta carpeta compartida)
+TRABAJOS_HILOS = config('TRABAJOS_HILOS', default=2, cast=int)
+TRABAJOS_DIR = config('TRABAJOS_DIR', default=os.path.join(BASE_DIR, 'trabajos'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# manage.py test: las migraciones de configuracion son SQL de PostgreSQL
+# sobre tablas existentes; en la base de pruebas las tablas (managed=False)
+# las crea configuracion.tests
+if sys.argv[1:2] == ['test']:
+    MIGRATION_MODULES = {'configuracion': None}
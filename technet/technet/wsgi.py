@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'technet.settings')
 
 application = get_wsgi_application()
+
+# Trabajos en segundo plano que quedaron pendientes o abandonados al reiniciar
+from configuracion import trabajos  # noqa: E402
+
+trabajos.iniciar()